@@ -1,7 +1,13 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
 from django import forms
 
-from .models import AnoLetivo, Turma, Aluno, _anos_letivos_permitidos
+from .models import AnoLetivo, Turma, Aluno
+from .services.importacao_alunos import importar_alunos, ler_ficheiro
+from .services.transicao_ano import transitar_turmas
+from .utils.ano_letivo import choices_anos_letivos
 
 
 # =========================
@@ -19,8 +25,7 @@ class AnoLetivoAdminForm(forms.ModelForm):
         if not nome_field:
             return
 
-        opcoes = [(v, v) for v in _anos_letivos_permitidos(3)]
-        nome_field.widget = forms.Select(choices=opcoes)
+        nome_field.widget = forms.Select(choices=choices_anos_letivos(3))
 
         if self.instance and self.instance.pk:
             nome_field.disabled = True
@@ -175,12 +180,113 @@ class TurmaAdmin(admin.ModelAdmin):
     list_filter = ("tipo_contexto", "ciclo", "ano_letivo")
     search_fields = ("nome",)
     autocomplete_fields = ("ano_letivo", "professor")
+    actions = ("transitar", "transitar_com_avaliacoes")
+
+    # ---------- TRANSIÇÃO DE ANO LETIVO (ver services/transicao_ano.py) ----------
+    def has_transicao_permission(self, request):
+        return request.user.has_perms(["nucleo.add_turma", "nucleo.add_aluno"])
+
+    def _transitar(self, request, queryset, clonar_avaliacoes: bool) -> None:
+        try:
+            resultado = transitar_turmas(queryset, clonar_avaliacoes=clonar_avaliacoes)
+        except ValueError as exc:
+            self.message_user(request, str(exc), messages.ERROR)
+            return
+
+        self.message_user(
+            request,
+            f"Turmas criadas: {len(resultado.turmas)}; alunos: {resultado.alunos}.",
+            messages.SUCCESS,
+        )
+        if resultado.finalistas:
+            nomes = ", ".join(turma.nome for turma in resultado.finalistas)
+            self.message_user(request, f"Último ano do ciclo (não transitam): {nomes}.", messages.INFO)
+        if resultado.existentes:
+            nomes = ", ".join(turma.nome for turma in resultado.existentes)
+            self.message_user(request, f"Turma sucessora já existente: {nomes}.", messages.WARNING)
+
+    @admin.action(description="Transitar para o ano letivo seguinte (turmas e alunos)", permissions=["transicao"])
+    def transitar(self, request, queryset):
+        self._transitar(request, queryset, clonar_avaliacoes=False)
+
+    @admin.action(
+        description="Transitar para o ano letivo seguinte (turmas, alunos e avaliações)",
+        permissions=["transicao"],
+    )
+    def transitar_com_avaliacoes(self, request, queryset):
+        self._transitar(request, queryset, clonar_avaliacoes=True)
+
+
+# =========================
+# IMPORTAÇÃO DE ALUNOS (CSV / XLSX)
+# =========================
+class ImportarAlunosForm(forms.Form):
+    ficheiro = forms.FileField(
+        label="Ficheiro (.csv ou .xlsx)",
+        help_text="Colunas: ano_letivo, turma, numero, nome_completo (1.ª linha = cabeçalho).",
+    )
+    ano_letivo = forms.ModelChoiceField(
+        queryset=AnoLetivo.objects.order_by("-nome"),
+        required=False,
+        label="Ano letivo por omissão",
+        help_text="Usado nas linhas sem ano letivo.",
+    )
+    simular = forms.BooleanField(required=False, label="Só validar (não gravar)")
 
 
 @admin.register(Aluno)
 class AlunoAdmin(admin.ModelAdmin):
     list_display = ("nome_completo", "numero", "turma")
     list_filter = ("turma",)
+    list_select_related = ("turma__ano_letivo",)
     search_fields = ("nome_completo", "numero")
     autocomplete_fields = ("turma",)
+    change_list_template = "admin/nucleo/aluno/change_list.html"
+
+    MAX_ERROS_LISTADOS = 200
+
+    def get_urls(self):
+        urls = [
+            path("importar/", self.admin_site.admin_view(self.importar_view), name="nucleo_aluno_importar"),
+        ]
+        return urls + super().get_urls()
+
+    def importar_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        resultado = None
+        form = ImportarAlunosForm(request.POST or None, request.FILES or None)
+        if request.method == "POST" and form.is_valid():
+            ficheiro = form.cleaned_data["ficheiro"]
+            ano_letivo = form.cleaned_data["ano_letivo"]
+            try:
+                resultado = importar_alunos(
+                    ler_ficheiro(ficheiro, ficheiro.name),
+                    ano_letivo=ano_letivo.nome if ano_letivo else None,
+                    simular=form.cleaned_data["simular"],
+                )
+            except UnicodeDecodeError:
+                form.add_error("ficheiro", "O CSV tem de estar em UTF-8.")
+            except (ValueError, ImportError) as exc:
+                form.add_error("ficheiro", str(exc))
+            else:
+                nivel = messages.WARNING if resultado.erros else messages.SUCCESS
+                acao = "válidos (nada gravado)" if form.cleaned_data["simular"] else "importados"
+                self.message_user(
+                    request,
+                    f"Linhas lidas: {resultado.lidas}; alunos {acao}: {resultado.criados}; "
+                    f"erros: {len(resultado.erros)}.",
+                    nivel,
+                )
+
+        contexto = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Importar alunos",
+            "form": form,
+            "resultado": resultado,
+            "erros": resultado.erros[: self.MAX_ERROS_LISTADOS] if resultado else [],
+        }
+        return TemplateResponse(request, "admin/nucleo/aluno/importar.html", contexto)
 
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.nucleo.services.importacao_alunos import BLOCO_PADRAO, importar_alunos, ler_ficheiro
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa alunos de um ficheiro CSV ou XLSX (colunas: ano_letivo, turma, numero, nome_completo), "
+        "em blocos, reportando os erros linha a linha sem interromper a importação."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("ficheiro", help="Caminho do ficheiro .csv ou .xlsx")
+        parser.add_argument(
+            "--ano-letivo",
+            dest="ano_letivo",
+            default=None,
+            help="Ex.: 2025/2026 (para linhas sem coluna/valor de ano letivo).",
+        )
+        parser.add_argument("--bloco", type=int, default=BLOCO_PADRAO, help="Linhas por bloco (bulk_create).")
+        parser.add_argument("--encoding", default="utf-8-sig", help="Codificação do CSV.")
+        parser.add_argument("--max-erros", dest="max_erros", type=int, default=50, help="Erros a listar.")
+        parser.add_argument("--dry-run", dest="dry_run", action="store_true", help="Valida sem gravar.")
+
+    def handle(self, *args, **options):
+        caminho = Path(options["ficheiro"])
+        if not caminho.is_file():
+            raise CommandError(f"Ficheiro não encontrado: {caminho}")
+        if options["bloco"] < 1:
+            raise CommandError("--bloco deve ser >= 1.")
+
+        inicio = time.perf_counter()
+        with caminho.open("rb") as ficheiro:
+            try:
+                linhas = ler_ficheiro(ficheiro, caminho.name, encoding=options["encoding"])
+                resultado = importar_alunos(
+                    linhas,
+                    ano_letivo=options["ano_letivo"],
+                    bloco=options["bloco"],
+                    simular=options["dry_run"],
+                )
+            except (ValueError, ImportError) as exc:  # inclui UnicodeDecodeError
+                raise CommandError(str(exc)) from exc
+        duracao = time.perf_counter() - inicio
+
+        for linha, mensagem in resultado.erros[: options["max_erros"]]:
+            self.stdout.write(self.style.ERROR(f"  linha {linha}: {mensagem}"))
+        if len(resultado.erros) > options["max_erros"]:
+            self.stdout.write(self.style.ERROR(f"  ... e mais {len(resultado.erros) - options['max_erros']} erro(s)"))
+
+        acao = "válidos (dry-run, nada gravado)" if options["dry_run"] else "importados"
+        self.stdout.write(self.style.SUCCESS(
+            f"Linhas lidas: {resultado.lidas}; alunos {acao}: {resultado.criados}; "
+            f"erros: {len(resultado.erros)}; {duracao:.2f}s"
+        ))
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from apps.nucleo.admin import AnoLetivoAdminForm
+from apps.nucleo.models import AnoLetivo
+from apps.nucleo.utils.ano_letivo import (
+    ano_letivo_permitido,
+    anos_letivos_permitidos,
+    choices_anos_letivos,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo por chamada dos helpers de ano letivo (memorizados), da validação "
+        "de AnoLetivo e do formulário do Admin. Não acede à base de dados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--numero", type=int, default=100_000, help="Chamadas por repetição (default: 100000).")
+        parser.add_argument("--repeticoes", type=int, default=5, help="Repetições; conta a melhor (default: 5).")
+
+    def handle(self, *args, **options):
+        numero = max(1, options["numero"])
+        repeticoes = max(1, options["repeticoes"])
+
+        nome = anos_letivos_permitidos(3)[1]
+        ano = AnoLetivo(nome=nome)
+        medicoes = [
+            ("anos_letivos_permitidos(3)", lambda: anos_letivos_permitidos(3), numero),
+            ("ano_letivo_permitido(nome)", lambda: ano_letivo_permitido(nome), numero),
+            ("choices_anos_letivos(3)", lambda: choices_anos_letivos(3), numero),
+            ("AnoLetivo.clean()", ano.clean, numero),
+            ("AnoLetivoAdminForm()", AnoLetivoAdminForm, max(1, numero // 20)),  # instancia os widgets
+        ]
+
+        for rotulo, funcao, n in medicoes:
+            segundos = min(timeit.repeat(funcao, number=n, repeat=repeticoes)) / n
+            self.stdout.write(f"  {rotulo:30s} {segundos * 1e6:9.3f} µs ({n} chamadas)")
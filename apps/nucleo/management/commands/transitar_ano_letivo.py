@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.nucleo.models import Turma
+from apps.nucleo.services.transicao_ano import ano_letivo_seguinte, transitar_turmas
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria no ano letivo seguinte a turma sucessora de cada turma (7A -> 8A, mesmo ciclo e professor) "
+        "e copia os alunos; opcionalmente copia também o plano de avaliações TIC."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("ano_letivo", help="Ano letivo de origem. Ex.: 2025/2026")
+        parser.add_argument("--turma_id", type=int, action="append", default=None, help="Só esta turma (repetível).")
+        parser.add_argument(
+            "--clonar-avaliacoes",
+            dest="clonar_avaliacoes",
+            action="store_true",
+            help="Copia as avaliações (nome, período, peso) para as turmas novas.",
+        )
+        parser.add_argument("--dry-run", dest="dry_run", action="store_true", help="Mostra o plano sem gravar.")
+
+    def handle(self, *args, **options):
+        origem = options["ano_letivo"]
+        turmas = Turma.objects.filter(ano_letivo__nome=origem)
+        if options["turma_id"]:
+            turmas = turmas.filter(pk__in=options["turma_id"])
+        if not turmas.exists():
+            raise CommandError(f"Nenhuma turma encontrada em {origem}.")
+
+        try:
+            destino = ano_letivo_seguinte(origem)
+            resultado = transitar_turmas(
+                turmas,
+                clonar_avaliacoes=options["clonar_avaliacoes"],
+                simular=options["dry_run"],
+            )
+        except ValidationError as exc:  # formato do ano letivo
+            raise CommandError(" ".join(exc.messages)) from exc
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        for origem_turma, nova in resultado.turmas:
+            self.stdout.write(f"  {origem_turma.nome} -> {nova.nome} ({nova.ano_escolaridade}.º ano)")
+        for turma in resultado.finalistas:
+            self.stdout.write(f"  {turma.nome}: último ano do ciclo, não transita")
+        for turma in resultado.existentes:
+            self.stdout.write(f"  {turma.nome}: a turma sucessora já existe em {destino}")
+
+        acao = "a criar (dry-run, nada gravado)" if options["dry_run"] else "criadas"
+        self.stdout.write(self.style.SUCCESS(
+            f"{origem} -> {destino}: turmas {acao}: {len(resultado.turmas)}; alunos: {resultado.alunos}."
+        ))
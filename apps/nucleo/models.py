@@ -1,42 +1,23 @@
 from __future__ import annotations
 
-from datetime import date
-
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 
+from apps.nucleo.utils.ano_letivo import ano_letivo_permitido, anos_letivos_permitidos
+
 
 # =========================================================
 # Helpers: Ano letivo atual (Portugal) + próximos 3
+# (memorizados em apps/nucleo/utils/ano_letivo.py)
 # =========================================================
 
-def _ano_letivo_atual(today: date | None = None) -> tuple[int, int]:
-    """
-    Regra (Portugal): o ano letivo inicia em setembro.
-    - Se month >= 9: start = ano corrente
-    - Se month < 9: start = ano corrente - 1
-    """
-    today = today or date.today()
-    if today.month >= 9:
-        start = today.year
-    else:
-        start = today.year - 1
-    return start, start + 1
-
-
-def _anos_letivos_permitidos(qtd_futuros: int = 3) -> list[str]:
+def _anos_letivos_permitidos(qtd_futuros: int = 3) -> tuple[str, ...]:
     """
-    Retorna lista com o ano letivo atual + próximos 3, no formato AAAA/AAAA.
-    Ex.: ['2025/2026', '2026/2027', '2027/2028', '2028/2029']
+    Ano letivo atual + próximos 3, no formato AAAA/AAAA.
+    Ex.: ('2025/2026', '2026/2027', '2027/2028', '2028/2029')
     """
-    start, _ = _ano_letivo_atual()
-    out: list[str] = []
-    for i in range(0, qtd_futuros + 1):
-        a = start + i
-        b = a + 1
-        out.append(f"{a:04d}/{b:04d}")
-    return out
+    return anos_letivos_permitidos(qtd_futuros)
 
 
 def _validar_formato_ano_letivo(valor: str) -> None:
@@ -94,12 +75,11 @@ class AnoLetivo(models.Model):
         if self.nome:
             _validar_formato_ano_letivo(self.nome)
 
-        permitidos = set(_anos_letivos_permitidos(3))
-        if self.nome not in permitidos:
+        if not ano_letivo_permitido(self.nome, 3):
             raise ValidationError({
                 "nome": (
                     "Ano letivo não permitido. "
-                    f"Selecione apenas: {', '.join(sorted(permitidos))}."
+                    f"Selecione apenas: {', '.join(_anos_letivos_permitidos(3))}."
                 )
             })
 
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import IO, Iterable
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from apps.nucleo.models import Aluno, Turma
+from apps.nucleo.signals import alunos_importados
+from apps.nucleo.utils import tabelas
+from apps.nucleo.utils.tabelas import Linhas
+
+
+# -------------------------
+# Importação de alunos em massa (CSV / XLSX)
+# -------------------------
+# As linhas são lidas em streaming e tratadas em blocos:
+#   - turmas resolvidas por (ano letivo, nome) com UMA query por bloco, só
+#     para os pares ainda não vistos (cache em memória durante a importação)
+#   - unicidade do número por turma (uniq_aluno_numero_por_turma_quando_preenchido)
+#     validada em memória: números existentes carregados uma vez por turma
+#   - alunos válidos gravados com bulk_create, um bloco por transação
+#   - erros registados por linha, sem interromper a importação
+#
+# Leitura em apps/nucleo/utils/tabelas.py.
+# Colunas (cabeçalho na 1.ª linha): ano_letivo, turma, numero, nome_completo.
+# ano_letivo pode faltar se for indicado um ano letivo por omissão.
+
+BLOCO_PADRAO = 1000
+COLUNAS_OBRIGATORIAS = ("turma", "nome_completo")
+
+NOME_MAX = Aluno._meta.get_field("nome_completo").max_length
+
+
+@dataclass
+class ResultadoImportacao:
+    lidas: int = 0
+    criados: int = 0
+    erros: list[tuple[int, str]] = field(default_factory=list)  # (linha, mensagem)
+    turmas: set[int] = field(default_factory=set)
+
+
+def ler_ficheiro(ficheiro: IO[bytes], nome: str, encoding: str = "utf-8-sig") -> Linhas:
+    """
+    Linhas de um ficheiro de alunos (.csv ou .xlsx), em streaming.
+    """
+    return tabelas.ler_ficheiro(ficheiro, nome, obrigatorias=COLUNAS_OBRIGATORIAS, encoding=encoding)
+
+
+# -------------------------
+# Importação
+# -------------------------
+class _Importador:
+    def __init__(self, ano_letivo: str | None, simular: bool):
+        self.ano_letivo = ano_letivo
+        self.simular = simular
+        self.turmas: dict[tuple[str, str], Turma | None] = {}  # (ano letivo, nome) -> turma
+        self.numeros: dict[int, set[int]] = {}  # turma_id -> números já usados
+
+    def _resolver_turmas(self, chaves: set[tuple[str, str]]) -> None:
+        novas = chaves - self.turmas.keys()
+        if not novas:
+            return
+
+        filtro = Q()
+        for ano, nome in novas:
+            filtro |= Q(ano_letivo__nome=ano, nome=nome)
+        encontradas = {
+            (turma.ano_letivo.nome, turma.nome): turma
+            for turma in Turma.objects.select_related("ano_letivo").filter(filtro)
+        }
+        for chave in novas:
+            self.turmas[chave] = encontradas.get(chave)
+
+        # Números já usados nas turmas vistas pela primeira vez.
+        self._carregar_numeros({turma.pk for turma in encontradas.values()} - self.numeros.keys())
+
+    def _carregar_numeros(self, ids: set[int]) -> None:
+        for turma_id in ids:
+            self.numeros[turma_id] = set()
+        for turma_id, numero in (
+            Aluno.objects.filter(turma_id__in=ids, numero__isnull=False).values_list("turma_id", "numero")
+        ):
+            self.numeros[turma_id].add(numero)
+
+    def _chave(self, linha: dict[str, str]) -> tuple[str, str]:
+        return linha.get("ano_letivo") or self.ano_letivo or "", linha.get("turma", "")
+
+    def _validar(self, linha: dict[str, str]) -> Aluno:
+        """
+        Aluno (não gravado) da linha; ValueError com a mensagem se inválida.
+        """
+        ano, nome_turma = self._chave(linha)
+        if not nome_turma:
+            raise ValueError("Turma em falta.")
+        if not ano:
+            raise ValueError("Ano letivo em falta.")
+        turma = self.turmas[(ano, nome_turma)]
+        if turma is None:
+            raise ValueError(f"Turma {nome_turma} ({ano}) não existe.")
+
+        nome = linha.get("nome_completo", "")
+        if not nome:
+            raise ValueError("Nome em falta.")
+        if len(nome) > NOME_MAX:
+            raise ValueError(f"Nome com mais de {NOME_MAX} caracteres.")
+
+        numero = None
+        texto_numero = linha.get("numero", "")
+        if texto_numero:
+            if not texto_numero.isdigit() or int(texto_numero) < 1:
+                raise ValueError(f"Número inválido: {texto_numero}.")
+            numero = int(texto_numero)
+            if numero in self.numeros[turma.pk]:
+                raise ValueError(f"O número {numero} já existe na turma {turma}.")
+
+        return Aluno(turma=turma, numero=numero, nome_completo=nome)
+
+    def processar_bloco(self, bloco: list[tuple[int, dict[str, str]]], resultado: ResultadoImportacao) -> None:
+        resultado.lidas += len(bloco)
+        self._resolver_turmas({self._chave(linha) for _, linha in bloco})
+
+        alunos: list[tuple[int, Aluno]] = []
+        for numero_linha, linha in bloco:
+            try:
+                aluno = self._validar(linha)
+            except ValueError as exc:
+                resultado.erros.append((numero_linha, str(exc)))
+                continue
+            if aluno.numero is not None:
+                self.numeros[aluno.turma_id].add(aluno.numero)  # duplicados no próprio ficheiro
+            alunos.append((numero_linha, aluno))
+
+        if self.simular or not alunos:
+            resultado.criados += len(alunos)
+            return
+
+        try:
+            with transaction.atomic():
+                Aluno.objects.bulk_create([aluno for _, aluno in alunos])
+        except IntegrityError:
+            # Conflito com alunos gravados por outro processo durante a importação.
+            resultado.erros.extend(
+                (numero_linha, "Conflito ao gravar o bloco (número repetido?); volte a importar estas linhas.")
+                for numero_linha, _ in alunos
+            )
+            # Os números do bloco não ficaram gravados: relê os destas turmas
+            # (já com os do outro processo) para não rejeitar linhas seguintes.
+            self._carregar_numeros({aluno.turma_id for _, aluno in alunos})
+            return
+
+        resultado.criados += len(alunos)
+        resultado.turmas.update(aluno.turma_id for _, aluno in alunos)
+
+
+def importar_alunos(
+    linhas: Iterable[tuple[int, dict[str, str]]],
+    ano_letivo: str | None = None,
+    bloco: int = BLOCO_PADRAO,
+    simular: bool = False,
+) -> ResultadoImportacao:
+    """
+    Importa as linhas (ver ler_ficheiro) em blocos de `bloco` linhas, com
+    memória limitada ao bloco e aos números das turmas envolvidas.
+    ano_letivo: usado nas linhas sem coluna/valor de ano letivo (ex.: "2025/2026").
+    simular=True valida tudo sem gravar.
+    """
+    importador = _Importador(ano_letivo, simular)
+    resultado = ResultadoImportacao()
+
+    linhas = iter(linhas)
+    while parte := list(islice(linhas, bloco)):
+        importador.processar_bloco(parte, resultado)
+
+    if resultado.turmas:
+        alunos_importados.send(sender=Aluno, turma_ids=resultado.turmas)
+    return resultado
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import QuerySet
+
+from apps.nucleo.models import AnoLetivo, Aluno, Turma, _validar_formato_ano_letivo
+from apps.nucleo.signals import turmas_transitadas
+
+
+# -------------------------
+# Transição de ano letivo (turmas e alunos)
+# -------------------------
+# Cada turma passa à turma sucessora no ano letivo seguinte:
+#   - ano de escolaridade + 1, dentro do ciclo (Turma._anos_validos_por_ciclo):
+#     7A (7.º, 3C) -> 8A (8.º, 3C); as turmas do último ano do ciclo
+#     (6.º, 9.º, 12.º) não transitam (ficam em "finalistas")
+#   - nome: o número inicial é o ano de escolaridade, que é atualizado
+#     ("7A" -> "8A", "10B" -> "11B"); nomes sem esse prefixo mantêm-se
+#   - mesmo tipo de contexto, ciclo e professor
+#   - alunos copiados (número e nome) para a turma nova
+# Tudo numa transação, com um número fixo de queries por escola (turmas e
+# alunos com bulk_create). Turmas sucessoras que já existam no ano de
+# destino ficam de fora ("existentes"), por isso repetir a transição não
+# duplica nada.
+# No fim é enviado o signal turmas_transitadas (a app TIC clona o plano de
+# avaliações quando pedido).
+
+_PREFIXO_ANO = re.compile(r"^(\d+)(.*)$")
+
+
+@dataclass
+class ResultadoTransicao:
+    turmas: list[tuple[Turma, Turma]] = field(default_factory=list)  # (origem, nova)
+    alunos: int = 0
+    finalistas: list[Turma] = field(default_factory=list)
+    existentes: list[Turma] = field(default_factory=list)
+
+
+def ano_letivo_seguinte(nome: str) -> str:
+    """
+    "2025/2026" -> "2026/2027".
+    """
+    _validar_formato_ano_letivo(nome)
+    inicio = int(nome[:4]) + 1
+    return f"{inicio:04d}/{inicio + 1:04d}"
+
+
+def turma_sucessora(turma: Turma) -> Turma | None:
+    """
+    Turma (não gravada) que sucede `turma` no ano letivo seguinte, sem
+    ano letivo atribuído; None se a turma está no último ano do ciclo.
+    """
+    ano = turma.ano_escolaridade
+    if ano is None or ano + 1 not in Turma._anos_validos_por_ciclo(turma.ciclo):
+        return None
+
+    nome = turma.nome
+    prefixo = _PREFIXO_ANO.match(nome)
+    if prefixo and int(prefixo.group(1)) == ano:
+        nome = f"{ano + 1}{prefixo.group(2)}"
+
+    return Turma(
+        nome=nome,
+        tipo_contexto=turma.tipo_contexto,
+        ciclo=turma.ciclo,
+        ano_escolaridade=ano + 1,
+        professor_id=turma.professor_id,
+    )
+
+
+def _anos_destino(nomes: set[str]) -> dict[str, AnoLetivo]:
+    """
+    Ano letivo seguinte de cada ano de origem (criado se ainda não existir).
+    """
+    destinos = {nome: ano_letivo_seguinte(nome) for nome in nomes}
+    anos = {ano.nome: ano for ano in AnoLetivo.objects.filter(nome__in=destinos.values())}
+    for nome in set(destinos.values()) - anos.keys():
+        try:
+            anos[nome] = AnoLetivo.objects.create(nome=nome)
+        except ValidationError as exc:
+            raise ValueError(f"Ano letivo {nome}: {' '.join(exc.messages)}") from exc
+    return {origem: anos[destino] for origem, destino in destinos.items()}
+
+
+@transaction.atomic
+def transitar_turmas(
+    turmas: QuerySet[Turma],
+    clonar_avaliacoes: bool = False,
+    simular: bool = False,
+) -> ResultadoTransicao:
+    """
+    Cria, no ano letivo seguinte, a turma sucessora de cada turma indicada,
+    com os mesmos alunos. clonar_avaliacoes=True copia também o plano de
+    avaliações (nomes, períodos e pesos, sem notas).
+    simular=True calcula o resultado sem gravar.
+    ValueError se o ano letivo de destino não for permitido.
+    """
+    resultado = ResultadoTransicao()
+    origens = list(turmas.select_related("ano_letivo").order_by("ano_letivo__nome", "nome"))
+    if not origens:
+        return resultado
+
+    anos = _anos_destino({turma.ano_letivo.nome for turma in origens})
+    ocupados = set(
+        Turma.objects
+        .filter(ano_letivo__in=anos.values())
+        .values_list("ano_letivo_id", "nome")
+    )
+
+    for origem in origens:
+        nova = turma_sucessora(origem)
+        if nova is None:
+            resultado.finalistas.append(origem)
+            continue
+        nova.ano_letivo = anos[origem.ano_letivo.nome]
+        if (nova.ano_letivo_id, nova.nome) in ocupados:
+            resultado.existentes.append(origem)
+            continue
+        ocupados.add((nova.ano_letivo_id, nova.nome))
+        resultado.turmas.append((origem, nova))
+
+    if not resultado.turmas:
+        return resultado
+
+    origem_ids = [origem.pk for origem, _ in resultado.turmas]
+    alunos = list(
+        Aluno.objects
+        .filter(turma_id__in=origem_ids)
+        .order_by("turma_id", "numero", "nome_completo")
+        .values_list("turma_id", "numero", "nome_completo")
+    )
+    resultado.alunos = len(alunos)
+    if simular:
+        transaction.set_rollback(True)  # anos letivos de destino criados acima
+        return resultado
+
+    Turma.objects.bulk_create([nova for _, nova in resultado.turmas])
+    nova_de = {origem.pk: nova.pk for origem, nova in resultado.turmas}
+    Aluno.objects.bulk_create(
+        Aluno(turma_id=nova_de[turma_id], numero=numero, nome_completo=nome)
+        for turma_id, numero, nome in alunos
+    )
+
+    turmas_transitadas.send(sender=Turma, pares=list(nova_de.items()), clonar_avaliacoes=clonar_avaliacoes)
+    return resultado
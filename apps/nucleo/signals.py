@@ -0,0 +1,11 @@
+from django.dispatch import Signal
+
+
+# Enviado depois de uma importação em massa de alunos (bulk_create não emite
+# post_save). Argumentos: turma_ids (turmas que receberam alunos).
+alunos_importados = Signal()
+
+# Enviado depois da transição de turmas para o ano letivo seguinte
+# (services/transicao_ano.py). Argumentos: pares (lista de (turma de origem
+# id, turma nova id)), clonar_avaliacoes (bool).
+turmas_transitadas = Signal()
@@ -1,3 +1,132 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import date
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+
+from apps.nucleo.models import Aluno, AnoLetivo, Turma
+from apps.nucleo.services.importacao_alunos import importar_alunos, ler_ficheiro
+from apps.nucleo.utils.ano_letivo import (
+    ano_letivo_atual,
+    ano_letivo_permitido,
+    anos_letivos_permitidos,
+    choices_anos_letivos,
+)
+
+
+class AnoLetivoMemorizadoTests(SimpleTestCase):
+    def test_muda_na_passagem_para_setembro(self):
+        agosto, setembro = date(2026, 8, 31), date(2026, 9, 1)
+
+        self.assertEqual(ano_letivo_atual(agosto), (2025, 2026))
+        self.assertEqual(ano_letivo_atual(setembro), (2026, 2027))
+        self.assertEqual(
+            anos_letivos_permitidos(3, today=agosto), ("2025/2026", "2026/2027", "2027/2028", "2028/2029")
+        )
+        self.assertEqual(
+            anos_letivos_permitidos(3, today=setembro), ("2026/2027", "2027/2028", "2028/2029", "2029/2030")
+        )
+        self.assertEqual(choices_anos_letivos(3, today=agosto)[0], ("2025/2026", "2025/2026"))
+        self.assertEqual(choices_anos_letivos(3, today=setembro)[0], ("2026/2027", "2026/2027"))
+
+        self.assertTrue(ano_letivo_permitido("2025/2026", today=agosto))
+        self.assertFalse(ano_letivo_permitido("2025/2026", today=setembro))
+        self.assertFalse(ano_letivo_permitido("2029/2030", today=agosto))
+        self.assertTrue(ano_letivo_permitido("2029/2030", today=setembro))
+
+        # Depois de memorizado o ano seguinte, agosto continua a dar o anterior.
+        self.assertEqual(anos_letivos_permitidos(3, today=agosto)[0], "2025/2026")
+
+    def test_medir_ano_letivo(self):
+        saida = StringIO()
+        call_command("medir_ano_letivo", numero=10, repeticoes=1, stdout=saida)
+        self.assertIn("AnoLetivo.clean()", saida.getvalue())
+
+
+def _linhas_csv(texto: str):
+    return ler_ficheiro(BytesIO(texto.encode()), "alunos.csv")
+
+
+class ImportacaoAlunosTests(TestCase):
+    def setUp(self):
+        self.ano = AnoLetivo.objects.create()
+        professor = get_user_model().objects.create(username="prof")
+        self.turma = Turma.objects.create(
+            ano_letivo=self.ano, nome="7A", ciclo="3C", ano_escolaridade=7, professor=professor
+        )
+        Aluno.objects.create(turma=self.turma, numero=1, nome_completo="Já Existe")
+
+    def _csv(self, *linhas: str) -> str:
+        return "\n".join(("ano_letivo;turma;numero;nome_completo", *linhas)) + "\n"
+
+    def test_erros_por_linha_nao_interrompem(self):
+        ano = self.ano.nome
+        resultado = importar_alunos(_linhas_csv(self._csv(
+            f"{ano};7A;2;Ana",
+            f"{ano};9Z;3;Turma Inexistente",
+            f"{ano};7A;x;Número Inválido",
+            f"{ano};7A;1;Número Ocupado",
+            f"{ano};7A;4;",
+            f"{ano};7A;;Sem Número",
+        )))
+        self.assertEqual((resultado.lidas, resultado.criados), (6, 2))
+        self.assertEqual([linha for linha, _ in resultado.erros], [3, 4, 5, 6])
+        self.assertIn("não existe", resultado.erros[0][1])
+        self.assertIn("já existe", resultado.erros[2][1])
+        self.assertEqual(resultado.turmas, {self.turma.pk})
+        self.assertEqual(
+            set(self.turma.alunos.values_list("nome_completo", flat=True)), {"Já Existe", "Ana", "Sem Número"}
+        )
+
+    def test_numero_repetido_no_proprio_ficheiro(self):
+        ano = self.ano.nome
+        resultado = importar_alunos(
+            _linhas_csv(self._csv(f"{ano};7A;5;Primeiro", f"{ano};7A;5;Segundo", f"{ano};7A;6;Terceiro")),
+            bloco=2,
+        )
+        self.assertEqual(resultado.criados, 2)
+        self.assertEqual(resultado.erros, [(3, f"O número 5 já existe na turma {self.turma}.")])
+
+    def test_simular_nao_grava(self):
+        resultado = importar_alunos(
+            _linhas_csv(self._csv(";7A;2;Ana", ";7A;2;Bruno")), ano_letivo=self.ano.nome, simular=True
+        )
+        self.assertEqual((resultado.criados, len(resultado.erros)), (1, 1))
+        self.assertEqual(self.turma.alunos.count(), 1)
+
+    def test_conflito_ao_gravar_liberta_os_numeros_do_bloco(self):
+        ano = self.ano.nome
+
+        def linhas():
+            yield 2, {"ano_letivo": ano, "turma": "7A", "numero": "2", "nome_completo": "Dois"}
+            yield 3, {"ano_letivo": ano, "turma": "7A", "numero": "3", "nome_completo": "Três"}
+            # Outro processo grava o n.º 5 depois de o 1.º bloco ser gravado.
+            Aluno.objects.create(turma=self.turma, numero=5, nome_completo="Outro Processo")
+            yield 4, {"ano_letivo": ano, "turma": "7A", "numero": "5", "nome_completo": "Conflito"}
+            yield 5, {"ano_letivo": ano, "turma": "7A", "numero": "6", "nome_completo": "Rejeitado com o bloco"}
+            yield 6, {"ano_letivo": ano, "turma": "7A", "numero": "6", "nome_completo": "Seis"}
+            yield 7, {"ano_letivo": ano, "turma": "7A", "numero": "5", "nome_completo": "Cinco"}
+
+        resultado = importar_alunos(linhas(), bloco=2)
+        self.assertEqual(resultado.criados, 3)
+        self.assertEqual([linha for linha, _ in resultado.erros], [4, 5, 7])
+        self.assertIn("Conflito ao gravar", resultado.erros[0][1])
+        self.assertIn("já existe", resultado.erros[2][1])
+        self.assertTrue(self.turma.alunos.filter(numero=6, nome_completo="Seis").exists())
+
+    def test_comando(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as ficheiro:
+            ficheiro.write(self._csv(";7A;2;Ana", ";7A;1;Repetido"))
+        self.addCleanup(os.remove, ficheiro.name)
+
+        saida = StringIO()
+        call_command("importar_alunos", ficheiro.name, ano_letivo=self.ano.nome, stdout=saida)
+        self.assertIn("linha 3:", saida.getvalue())
+        self.assertIn("Linhas lidas: 2; alunos importados: 1; erros: 1", saida.getvalue())
+        self.assertTrue(self.turma.alunos.filter(nome_completo="Ana").exists())
+
+        with self.assertRaisesMessage(CommandError, "Ficheiro não encontrado"):
+            call_command("importar_alunos", ficheiro.name + ".nao", stdout=StringIO())
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ORDER_VAR, ChangeList
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+
+# =========================================================
+# Paginação para changelists grandes no Admin
+# =========================================================
+# - Contagem estimada (PostgreSQL: estatística do planner) ou em cache,
+#   em vez de um COUNT(*) exato a cada página.
+# - Paginação keyset ("seek"): cada página filtra pelas chaves de ordenação
+#   da última linha vista (WHERE (a, b, pk) > (...)) em vez de OFFSET, por
+#   isso o custo não cresce com o número da página.
+
+CURSOR_APOS = "apos"
+CURSOR_ANTES = "antes"
+
+CONTAGEM_CACHE_SEGUNDOS = 300
+CONTAGEM_MINIMA_ESTIMADA = 10_000  # abaixo disto a estimativa do PostgreSQL não compensa
+
+
+def contagem_estimada(qs: QuerySet) -> tuple[int, bool]:
+    """
+    Retorna (contagem, aproximada).
+
+    - PostgreSQL, sem filtros: reltuples de pg_class (sem varrer a tabela).
+    - Caso contrário: COUNT(*) guardado em cache por CONTAGEM_CACHE_SEGUNDOS
+      (chave = SQL do queryset); um valor vindo da cache é "aproximado".
+    """
+    conexao = connections[qs.db]
+    if conexao.vendor == "postgresql" and not qs.query.where:
+        with conexao.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [qs.model._meta.db_table],
+            )
+            linha = cursor.fetchone()
+        if linha and linha[0] >= CONTAGEM_MINIMA_ESTIMADA:
+            return int(linha[0]), True
+
+    sql, params = qs.order_by().query.sql_with_params()
+    chave = "admin:contagem:" + hashlib.md5(f"{qs.db}|{sql}|{params!r}".encode()).hexdigest()
+    contagem = cache.get(chave)
+    if contagem is not None:
+        return contagem, True
+
+    contagem = qs.count()
+    cache.set(chave, contagem, CONTAGEM_CACHE_SEGUNDOS)
+    return contagem, False
+
+
+class PaginatorContagemEstimada(Paginator):
+    """
+    Paginator do Admin que usa contagem_estimada() em vez de COUNT(*).
+    """
+
+    @cached_property
+    def _contagem(self) -> tuple[int, bool]:
+        return contagem_estimada(self.object_list)
+
+    @cached_property
+    def count(self) -> int:
+        return self._contagem[0]
+
+    @property
+    def aproximada(self) -> bool:
+        return self._contagem[1]
+
+
+# ---------------------------------------------------------
+# Cursor (valores das chaves de ordenação da linha de fronteira)
+# ---------------------------------------------------------
+def _codificar_cursor(valores: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(valores, default=str).encode()).decode().rstrip("=")
+
+
+def _descodificar_cursor(cursor: str, n_chaves: int) -> list:
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as exc:
+        raise IncorrectLookupParameters("Cursor de paginação inválido.") from exc
+    if not isinstance(valores, list) or len(valores) != n_chaves:
+        raise IncorrectLookupParameters("Cursor de paginação inválido.")
+    return valores
+
+
+def _valor_da_chave(obj, caminho: str):
+    for parte in caminho.split("__"):
+        obj = getattr(obj, parte)
+    return obj
+
+
+def filtro_keyset(chaves: tuple[str, ...], valores: list, depois: bool = True) -> Q:
+    """
+    Linhas depois (ou antes) de `valores` na ordenação `chaves`:
+        (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND pk > z) ...
+    Chaves com "-" são descendentes. As chaves não podem ser nulas.
+    """
+    filtro = Q()
+    iguais = Q()
+    for chave, valor in zip(chaves, valores):
+        campo = chave.lstrip("-")
+        crescente = not chave.startswith("-")
+        operador = "gt" if crescente == depois else "lt"
+        filtro |= iguais & Q(**{f"{campo}__{operador}": valor})
+        iguais &= Q(**{campo: valor})
+    return filtro
+
+
+class ChangeListKeyset(ChangeList):
+    """
+    ChangeList com paginação keyset quando a lista está na ordenação por
+    omissão (ModelAdmin.ordering, que deve terminar numa chave única, ex. "pk").
+    Se o utilizador ordenar por outra coluna, volta à paginação normal
+    (OFFSET), mas sempre com a contagem estimada do paginator.
+
+    Parâmetros: ?apos=<cursor> (página seguinte) e ?antes=<cursor> (anterior).
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor_apos = request.GET.get(CURSOR_APOS)
+        self.cursor_antes = request.GET.get(CURSOR_ANTES)
+        super().__init__(request, *args, **kwargs)
+
+    # Os cursores não são filtros de campos (evita o "?e=1" do Admin).
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_APOS, None)
+        lookup_params.pop(CURSOR_ANTES, None)
+        return lookup_params
+
+    # Mudar filtros/ordenação/pesquisa recomeça da primeira página.
+    def get_query_string(self, new_params=None, remove=None):
+        new_params = dict(new_params or {})
+        new_params.setdefault(CURSOR_APOS, None)
+        new_params.setdefault(CURSOR_ANTES, None)
+        return super().get_query_string(new_params, remove)
+
+    @property
+    def chaves_keyset(self) -> tuple[str, ...]:
+        return tuple(self.model_admin.ordering or ())
+
+    @property
+    def keyset_ativo(self) -> bool:
+        return bool(self.chaves_keyset) and ORDER_VAR not in self.params and not self.list_editable
+
+    def get_results(self, request):
+        if not self.keyset_ativo:
+            super().get_results(request)
+            self.contagem_aproximada = getattr(self.paginator, "aproximada", False)
+            self.keyset = None
+            return
+
+        chaves = self.chaves_keyset
+        paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+
+        qs = self.queryset
+        para_tras = bool(self.cursor_antes) and not self.cursor_apos
+        if self.cursor_apos:
+            qs = qs.filter(filtro_keyset(chaves, _descodificar_cursor(self.cursor_apos, len(chaves))))
+        elif para_tras:
+            qs = qs.filter(
+                filtro_keyset(chaves, _descodificar_cursor(self.cursor_antes, len(chaves)), depois=False)
+            ).reverse()
+
+        pagina = list(qs[: self.list_per_page + 1])
+        ha_mais = len(pagina) > self.list_per_page
+        pagina = pagina[: self.list_per_page]
+        if para_tras:
+            pagina.reverse()
+
+        tem_anterior = ha_mais if para_tras else bool(self.cursor_apos)
+        tem_seguinte = True if para_tras else ha_mais
+
+        def url(parametro, obj):
+            valores = [_valor_da_chave(obj, chave.lstrip("-")) for chave in chaves]
+            return self.get_query_string({parametro: _codificar_cursor(valores)})
+
+        self.keyset = {
+            "primeira": self.get_query_string() if tem_anterior else None,
+            "anterior": url(CURSOR_ANTES, pagina[0]) if tem_anterior and pagina else None,
+            "seguinte": url(CURSOR_APOS, pagina[-1]) if tem_seguinte and pagina else None,
+        }
+
+        self.result_count = paginator.count
+        self.contagem_aproximada = getattr(paginator, "aproximada", False)
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = pagina
+        self.can_show_all = False
+        self.multi_page = tem_anterior or tem_seguinte
+        self.paginator = paginator
@@ -1,5 +1,12 @@
 from __future__ import annotations
 from datetime import date
+from functools import lru_cache
+
+# Os anos letivos permitidos só mudam em setembro: as listas ficam em
+# memória por ano de início (lru_cache) e a chave muda sozinha na
+# passagem de ano letivo. Fonte única para models, formulários do Admin
+# e qualquer API.
+
 
 def ano_letivo_atual(today: date | None = None) -> tuple[int, int]:
     """
@@ -15,19 +22,40 @@ def ano_letivo_atual(today: date | None = None) -> tuple[int, int]:
     return start, start + 1
 
 
-def choices_anos_letivos(qtd_futuros: int = 3):
+@lru_cache(maxsize=16)
+def _anos_letivos_desde(start: int, qtd_futuros: int) -> tuple[str, ...]:
+    return tuple(f"{a:04d}/{a + 1:04d}" for a in range(start, start + qtd_futuros + 1))
+
+
+@lru_cache(maxsize=16)
+def _conjunto_anos_letivos(start: int, qtd_futuros: int) -> frozenset[str]:
+    return frozenset(_anos_letivos_desde(start, qtd_futuros))
+
+
+@lru_cache(maxsize=16)
+def _choices_desde(start: int, qtd_futuros: int) -> tuple[tuple[str, str], ...]:
+    return tuple((s, s) for s in _anos_letivos_desde(start, qtd_futuros))
+
+
+def anos_letivos_permitidos(qtd_futuros: int = 3, today: date | None = None) -> tuple[str, ...]:
     """
-    Retorna choices no formato:
-    [('2025/2026','2025/2026'), ('2026/2027','2026/2027'), ...]
-    Inclui o atual + qtd_futuros.
+    Ano letivo atual + qtd_futuros, no formato AAAA/AAAA.
+    Ex.: ('2025/2026', '2026/2027', '2027/2028', '2028/2029')
     """
-    start, _ = ano_letivo_atual()
-    choices = []
-    for i in range(0, qtd_futuros + 1):  # 0 = atual, +3 futuros
-        a = start + i
-        b = a + 1
-        s = f"{a:04d}/{b:04d}"
-        choices.append((s, s))
-    return choices
+    start, _ = ano_letivo_atual(today)
+    return _anos_letivos_desde(start, qtd_futuros)
+
+
+def ano_letivo_permitido(nome: str, qtd_futuros: int = 3, today: date | None = None) -> bool:
+    start, _ = ano_letivo_atual(today)
+    return nome in _conjunto_anos_letivos(start, qtd_futuros)
 
 
+def choices_anos_letivos(qtd_futuros: int = 3, today: date | None = None) -> tuple[tuple[str, str], ...]:
+    """
+    Retorna choices no formato:
+    (('2025/2026','2025/2026'), ('2026/2027','2026/2027'), ...)
+    Inclui o atual + qtd_futuros.
+    """
+    start, _ = ano_letivo_atual(today)
+    return _choices_desde(start, qtd_futuros)
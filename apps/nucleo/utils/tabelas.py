@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import csv
+import io
+import unicodedata
+from itertools import chain, zip_longest
+from typing import IO, Iterable, Iterator
+
+try:  # dependência opcional (só para ficheiros .xlsx)
+    import openpyxl
+except ImportError:  # pragma: no cover
+    openpyxl = None
+
+
+# =========================================================
+# Leitura de ficheiros tabulares (CSV / XLSX) em streaming
+# =========================================================
+# Produz (nº da linha, {coluna: texto}) sem carregar o ficheiro em memória.
+# Os nomes das colunas são normalizados (minúsculas, sem acentos, espaços
+# -> "_") e alguns sinónimos comuns são convertidos (ex.: "Nome" -> nome_completo).
+
+SINONIMOS_COLUNAS = {
+    "ano": "ano_letivo",
+    "nome": "nome_completo",
+    "aluno": "nome_completo",
+    "n": "numero",
+    "n.o": "numero",
+}
+
+Linhas = Iterator[tuple[int, dict[str, str]]]
+
+
+def normalizar_coluna(nome) -> str:
+    nome = unicodedata.normalize("NFKD", str(nome or "")).encode("ascii", "ignore").decode()
+    nome = "_".join(nome.strip().lower().split())
+    return SINONIMOS_COLUNAS.get(nome, nome)
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)  # números vindos do Excel (ex.: 12.0)
+    return str(valor).strip()
+
+
+def _com_cabecalho(linhas: Iterator[Iterable], obrigatorias: tuple[str, ...], alguma_de: tuple[str, ...]) -> Linhas:
+    """
+    Usa a 1.ª linha como cabeçalho e produz (nº da linha, {coluna: texto}),
+    com todas as colunas do cabeçalho em cada linha. As linhas de dados
+    começam no nº 2, como numa folha de cálculo.
+    """
+    cabecalho = [normalizar_coluna(c) for c in next(linhas, [])]
+    em_falta = [c for c in obrigatorias if c not in cabecalho]
+    if em_falta:
+        raise ValueError(f"Colunas em falta no cabeçalho: {', '.join(em_falta)}.")
+    if alguma_de and not any(c in cabecalho for c in alguma_de):
+        raise ValueError(f"O cabeçalho tem de ter uma das colunas: {', '.join(alguma_de)}.")
+
+    for numero, valores in enumerate(linhas, start=2):
+        valores = list(valores)[: len(cabecalho)]
+        linha = {coluna: _texto(valor) for coluna, valor in zip_longest(cabecalho, valores)}
+        if any(linha.values()):  # ignora linhas vazias
+            yield numero, linha
+
+
+def ler_csv(
+    ficheiro: IO[bytes],
+    obrigatorias: tuple[str, ...] = (),
+    alguma_de: tuple[str, ...] = (),
+    encoding: str = "utf-8-sig",
+) -> Linhas:
+    """
+    Linhas de um CSV (separador ";" "," ou tab, detetado no cabeçalho).
+    """
+    texto = io.TextIOWrapper(ficheiro, encoding=encoding, newline="")
+    primeira = texto.readline()
+    try:
+        dialeto = csv.Sniffer().sniff(primeira, delimiters=";,\t")
+    except csv.Error:
+        dialeto = csv.excel
+    return _com_cabecalho(csv.reader(chain([primeira], texto), dialeto), obrigatorias, alguma_de)
+
+
+def ler_xlsx(ficheiro: IO[bytes], obrigatorias: tuple[str, ...] = (), alguma_de: tuple[str, ...] = ()) -> Linhas:
+    """
+    Linhas da primeira folha de um .xlsx (openpyxl em modo read_only).
+    """
+    if openpyxl is None:
+        raise ImportError("A leitura de .xlsx requer openpyxl (pip install openpyxl).")
+    livro = openpyxl.load_workbook(ficheiro, read_only=True, data_only=True)
+    return _com_cabecalho(livro.active.iter_rows(values_only=True), obrigatorias, alguma_de)
+
+
+def ler_ficheiro(
+    ficheiro: IO[bytes],
+    nome: str,
+    obrigatorias: tuple[str, ...] = (),
+    alguma_de: tuple[str, ...] = (),
+    encoding: str = "utf-8-sig",
+) -> Linhas:
+    """
+    CSV ou XLSX conforme a extensão de `nome`.
+    Cabeçalho inválido: ValueError (ao ler a primeira linha).
+    """
+    if nome.lower().endswith(".xlsx"):
+        return ler_xlsx(ficheiro, obrigatorias, alguma_de)
+    if nome.lower().endswith((".csv", ".txt")):
+        return ler_csv(ficheiro, obrigatorias, alguma_de, encoding=encoding)
+    raise ValueError("Formato não suportado: use .csv ou .xlsx.")
@@ -1,19 +1,89 @@
 # apps/tic/admin.py
-from decimal import Decimal, ROUND_HALF_UP
-
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db.models import Exists, OuterRef
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404, redirect
+from django.template.response import TemplateResponse
+from django.template.loader import render_to_string
+from django.urls import path, reverse, reverse_lazy
 from django.utils.html import format_html
 from django import forms
 
 from apps.nucleo.models import Turma, Aluno
+from apps.nucleo.utils.admin_paginacao import ChangeListKeyset, PaginatorContagemEstimada
 from apps.tic.models import (
     BoletimPeriodoTIC,
     AtitudesPeriodoTIC,
+    BoletimAnualTIC,
+    EstatisticaTurmaPeriodoTIC,
     AvaliacaoCognitivaTIC,
     NotaAvaliacaoCognitivaTIC,
     Periodo,  # ✅ usa as choices do model
+    RecalculoPendente,
+)
+from apps.tic.services.alunos_turma import opcoes_alunos_turma
+from apps.tic.services.fecho import fechar_periodo, reabrir_periodo
+from apps.tic.services.lancamento import (
+    gravar_atitudes_turma,
+    gravar_notas_avaliacao,
+    validar_grelha,
+    validar_grelha_atitudes,
 )
-from apps.tic.services.tic_calculator import garantir_e_recalcular_boletim
+from apps.tic.services.tic_calculator import CAMPOS_ATITUDES
+from apps.tic.services.tic_rules import regras_da_turma
+
+
+# Rótulos das dimensões de atitudes (ordem de CAMPOS_ATITUDES)
+ROTULOS_ATITUDES = (
+    "Responsabilidade e integridade",
+    "Excelência e exigência",
+    "Curiosidade, reflexão e inovação",
+    "Cidadania e participação",
+    "Liberdade",
+)
+
+
+# =========================
+# PERÍODO FECHADO (notas e atitudes não se apagam)
+# =========================
+class ApagarSoPeriodoAbertoMixin:
+    """
+    Sem permissão de apagar um objeto de um período fechado (a ação
+    "Apagar selecionados" também verifica objeto a objeto). O pre_delete em
+    signals.py impede-o também fora do Admin.
+
+    turma_lookup / periodo_lookup: caminhos, a partir do modelo, da turma
+    e do período do objeto.
+    """
+
+    turma_lookup: str
+    periodo_lookup: str
+
+    def em_periodo_fechado(self, queryset):
+        return queryset.filter(
+            Exists(
+                BoletimPeriodoTIC.objects.filter(
+                    turma_id=OuterRef(self.turma_lookup),
+                    periodo=OuterRef(self.periodo_lookup),
+                    estado=BoletimPeriodoTIC.Estado.FECHADO,
+                )
+            )
+        )
+
+    def has_delete_permission(self, request, obj=None):
+        if obj is not None and self.em_periodo_fechado(self.model.objects.filter(pk=obj.pk)).exists():
+            return False
+        return super().has_delete_permission(request, obj)
+
+
+# =========================
+# FILTRO TURMA (sem N+1: Turma.__str__ usa o ano letivo)
+# =========================
+class TurmaListFilter(admin.RelatedFieldListFilter):
+    def field_choices(self, field, request, model_admin):
+        turmas = Turma.objects.select_related("ano_letivo").order_by("ano_letivo__nome", "nome")
+        return [(t.pk, str(t)) for t in turmas]
 
 
 # =========================
@@ -30,15 +100,28 @@ class BoletimPeriodoTICAdmin(admin.ModelAdmin):
         "nivel_sge",
         "mencao_qualitativa",
     )
-    list_filter = ("turma", "periodo", "estado")
+    list_filter = (("turma", TurmaListFilter), "periodo", "estado")
     search_fields = ("aluno__nome_completo", "turma__nome")
 
+    # ✅ Changelist com nº fixo de queries por página:
+    #    - turma (+ ano letivo, usado no __str__) e aluno no mesmo SELECT
+    #    - paginação keyset pela ordenação abaixo (termina em pk: ordem total)
+    #    - contagem estimada/em cache em vez de COUNT(*) exato
+    list_select_related = ("turma__ano_letivo", "aluno")
+    ordering = ("turma__nome", "periodo", "aluno__nome_completo", "pk")
+    paginator = PaginatorContagemEstimada
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return ChangeListKeyset
+
     # ✅ Só estes podem ser alterados
     fields = (
         "turma",
         "aluno",
         "periodo",
         "estado",
+        "fechado_em",
         "autoavaliacao_nivel",
         "observacao",
         # ✅ calculados (consulta)
@@ -52,10 +135,14 @@ class BoletimPeriodoTICAdmin(admin.ModelAdmin):
         "tabela_avaliacoes",
     )
 
+    # estado: muda só pelo fecho/reabertura do período (Estatísticas > ações),
+    # que congela o resultado.
     readonly_fields = (
         "turma",
         "aluno",
         "periodo",
+        "estado",
+        "fechado_em",
         "nota_cognitiva_80",
         "nota_atitudes_20",
         "nota_final_100",
@@ -65,6 +152,12 @@ class BoletimPeriodoTICAdmin(admin.ModelAdmin):
         "tabela_avaliacoes",
     )
 
+    # boletim fechado: só consulta
+    def get_readonly_fields(self, request, obj=None):
+        if obj is not None and obj.estado == BoletimPeriodoTIC.Estado.FECHADO:
+            return self.fields
+        return self.readonly_fields
+
     # não criar manualmente: o sistema cria automaticamente
     def has_add_permission(self, request):
         return False
@@ -73,111 +166,96 @@ class BoletimPeriodoTICAdmin(admin.ModelAdmin):
     def has_delete_permission(self, request, obj=None):
         return False
 
-    # ---------- helpers ----------
-    @staticmethod
-    def _q2(x: Decimal) -> Decimal:
-        return x.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    def get_queryset(self, request):
+        # turma/aluno aparecem na lista e na página de detalhe (readonly)
+        return super().get_queryset(request).select_related("turma__ano_letivo", "aluno")
 
-    # ---------- TABELA ATITUDES ----------
+    # ---------- TABELAS (a partir do snapshot detalhe_calculo) ----------
+    # Sem queries: o calculador grava o snapshot a cada recálculo e o HTML
+    # fica em cache (fragmento) enquanto atualizado_em não mudar.
     def tabela_atitudes(self, obj: BoletimPeriodoTIC):
-        a = getattr(obj, "atitudes", None)  # related_name="atitudes" no OneToOne
-        if not a:
-            return "Sem atitudes registadas."
-
-        total = a.total_atitudes_20()
-        return format_html(
-            """
-            <table style="border-collapse:collapse; width:100%;">
-              <tr><th style="text-align:left;">Item</th><th style="text-align:right;">Valor</th></tr>
-              <tr><td>Responsabilidade e integridade</td><td style="text-align:right;">{}</td></tr>
-              <tr><td>Excelência e exigência</td><td style="text-align:right;">{}</td></tr>
-              <tr><td>Curiosidade, reflexão e inovação</td><td style="text-align:right;">{}</td></tr>
-              <tr><td>Cidadania e participação</td><td style="text-align:right;">{}</td></tr>
-              <tr><td>Liberdade</td><td style="text-align:right;">{}</td></tr>
-              <tr><td><b>Total (0..20)</b></td><td style="text-align:right;"><b>{}</b></td></tr>
-            </table>
-            """,
-            self._q2(Decimal(str(a.responsabilidade_integridade or 0))),
-            self._q2(Decimal(str(a.excelencia_exigencia or 0))),
-            self._q2(Decimal(str(a.curiosidade_reflexao_inovacao or 0))),
-            self._q2(Decimal(str(a.cidadania_participacao or 0))),
-            self._q2(Decimal(str(a.liberdade or 0))),
-            self._q2(Decimal(str(total or 0))),
+        detalhe = obj.detalhe_calculo or {}
+        valores = detalhe.get("atitudes")
+        return render_to_string(
+            "tic/admin/boletim_tabela_atitudes.html",
+            {
+                "boletim": obj,
+                "itens": list(zip(ROTULOS_ATITUDES, valores)) if valores else None,
+                "total": detalhe.get("total_atitudes"),
+            },
         )
 
     tabela_atitudes.short_description = "Atitudes (detalhe e total)"
 
-    # ---------- TABELA AVALIAÇÕES + NOTAS + MÉDIA ----------
     def tabela_avaliacoes(self, obj: BoletimPeriodoTIC):
-        qs = (
-            NotaAvaliacaoCognitivaTIC.objects
-            .select_related("avaliacao")
-            .filter(
-                aluno=obj.aluno,
-                avaliacao__turma=obj.turma,
-                avaliacao__periodo=obj.periodo,
-            )
-            .order_by("avaliacao__nome")
+        detalhe = obj.detalhe_calculo or {}
+        return render_to_string(
+            "tic/admin/boletim_tabela_avaliacoes.html",
+            {
+                "boletim": obj,
+                "avaliacoes": detalhe.get("avaliacoes"),
+                "media": detalhe.get("media"),
+            },
         )
 
-        if not qs.exists():
-            return "Sem notas cognitivas registadas."
-
-        total_peso = Decimal("0")
-        soma_ponderada = Decimal("0")
-        rows = []
-
-        for n in qs:
-            peso = Decimal(str(n.avaliacao.peso_percentual or 0))
-            nota = Decimal(str(n.nota_0a100 or 0))
-
-            total_peso += peso
-            soma_ponderada += (nota * peso)
-
-            rows.append(
-                f"<tr>"
-                f"<td>{n.avaliacao.nome}</td>"
-                f"<td style='text-align:right;'>{peso:.2f}</td>"
-                f"<td style='text-align:right;'>{nota:.2f}</td>"
-                f"</tr>"
-            )
+    tabela_avaliacoes.short_description = "Avaliações cognitivas (peso, nota, média)"
 
-        # ✅ média ponderada (0..100)
-        media_0_100 = self._q2((soma_ponderada / total_peso)) if total_peso > 0 else Decimal("0.00")
 
-        # ✅ Linha final: mostrar APENAS a média (como pediste)
-        rows.append(
-            f"<tr style='border-top:2px solid #999;'>"
-            f"<td><b>Resumo</b></td>"
-            f"<td></td>"
-            f"<td style='text-align:right;'><b>Média: {media_0_100:.2f}</b></td>"
-            f"</tr>"
+# =========================
+# ATITUDES (com total 0..20)
+# =========================
+class AlunoPorTurmaSelect(forms.Select):
+    """
+    Select de alunos carregado por AJAX (select2), filtrado pela turma
+    escolhida no campo `campo_turma`. Só renderiza a opção selecionada, por
+    isso o HTML não cresce com o número de alunos da escola.
+    """
+
+    def __init__(self, url, campo_turma="turma", attrs=None):
+        super().__init__(attrs)
+        self.url = url
+        self.campo_turma = campo_turma
+
+    @property
+    def media(self):
+        return forms.Media(
+            js=(
+                "admin/js/vendor/jquery/jquery.js",
+                "admin/js/vendor/select2/select2.full.js",
+                "admin/js/jquery.init.js",
+                "tic/js/aluno_por_turma.js",
+            ),
+            css={"screen": ("admin/css/vendor/select2/select2.css", "admin/css/autocomplete.css")},
         )
 
-        return format_html(
-            """
-            <table style="border-collapse:collapse; width:100%;">
-              <tr>
-                <th style="text-align:left;">Avaliação</th>
-                <th style="text-align:right;">Peso (%)</th>
-                <th style="text-align:right;">Nota (0..100)</th>
-              </tr>
-              {}
-            </table>
-            """,
-            format_html("".join(rows)),
-        )
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        attrs["class"] = (attrs.get("class", "") + " tic-aluno-por-turma").strip()
+        attrs["data-url"] = str(self.url)
+        attrs["data-campo-turma"] = f"id_{self.campo_turma}"
+        return attrs
 
-    tabela_avaliacoes.short_description = "Avaliações cognitivas (peso, nota, média)"
+    def optgroups(self, name, value, attrs=None):
+        opcoes = [self.create_option(name, "", "", False, 0)]
+        selecionados = [v for v in value if v not in ("", None)]
+        if selecionados:
+            for aluno in self.choices.queryset.filter(pk__in=selecionados):
+                opcoes.append(self.create_option(name, aluno.pk, str(aluno), True, len(opcoes)))
+        return [(None, opcoes, 0)]
 
 
-# =========================
-# ATITUDES (com total 0..20)
-# =========================
 class AtitudesPeriodoTICAdminForm(forms.ModelForm):
     # campos “auxiliares” para escolher o contexto do boletim
-    turma = forms.ModelChoiceField(queryset=Turma.objects.all(), required=True)
-    aluno = forms.ModelChoiceField(queryset=Aluno.objects.all(), required=True)
+    # (a lista de alunos vem por AJAX, só da turma escolhida; valida-se só o id submetido)
+    turma = forms.ModelChoiceField(
+        queryset=Turma.objects.select_related("ano_letivo").order_by("ano_letivo__nome", "nome"),
+        required=True,
+    )
+    aluno = forms.ModelChoiceField(
+        queryset=Aluno.objects.all(),
+        required=True,
+        widget=AlunoPorTurmaSelect(url=reverse_lazy("admin:tic_atitudesperiodotic_alunos")),
+    )
     periodo = forms.ChoiceField(choices=Periodo.choices, required=True)
 
     class Meta:
@@ -193,13 +271,32 @@ class AtitudesPeriodoTICAdminForm(forms.ModelForm):
             "liberdade",
         )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            boletim = self.instance.boletim
+            self.initial.setdefault("turma", boletim.turma_id)
+            self.initial.setdefault("aluno", boletim.aluno_id)
+            self.initial.setdefault("periodo", boletim.periodo)
+
+    def clean(self):
+        cleaned = super().clean()
+        turma = cleaned.get("turma")
+        aluno = cleaned.get("aluno")
+        if turma and aluno and aluno.turma_id != turma.pk:
+            self.add_error("aluno", "O aluno não pertence à turma escolhida.")
+        return cleaned
+
 
 @admin.register(AtitudesPeriodoTIC)
-class AtitudesPeriodoTICAdmin(admin.ModelAdmin):
+class AtitudesPeriodoTICAdmin(ApagarSoPeriodoAbertoMixin, admin.ModelAdmin):
     form = AtitudesPeriodoTICAdminForm
 
     list_display = ("id", "boletim", "total_atitudes")
     readonly_fields = ("total_atitudes",)
+    change_list_template = "admin/tic/atitudesperiodotic/change_list.html"
+    turma_lookup = "boletim__turma_id"
+    periodo_lookup = "boletim__periodo"
 
     def total_atitudes(self, obj):
         return obj.total_atitudes_20()
@@ -211,18 +308,128 @@ class AtitudesPeriodoTICAdmin(admin.ModelAdmin):
         aluno = form.cleaned_data["aluno"]
         periodo = int(form.cleaned_data["periodo"])
 
-        # 1) garante boletim (cria se não existir) + recalcula
-        garantir_e_recalcular_boletim(turma_id=turma.id, aluno_id=aluno.id, periodo=periodo)
-
-        # 2) liga o OneToOne corretamente
-        boletim = BoletimPeriodoTIC.objects.get(turma=turma, aluno=aluno, periodo=periodo)
+        # 1) garante boletim (cria se não existir) e liga o OneToOne
+        boletim, _ = BoletimPeriodoTIC.objects.get_or_create(turma=turma, aluno=aluno, periodo=periodo)
         obj.boletim = boletim
 
-        # 3) grava atitudes
+        # 2) grava atitudes; o recálculo do boletim fica a cargo dos signals
+        #    (após o commit, ou no tic_worker em modo fila)
         super().save_model(request, obj, form, change)
 
-        # 4) recalcula boletim agora com atitudes gravadas
-        garantir_e_recalcular_boletim(turma_id=turma.id, aluno_id=aluno.id, periodo=periodo)
+    # ---------- GRELHA DE ATITUDES (toda a turma num período, um só POST) ----------
+    # Validação em memória contra os tetos das regras da turma; boletins em
+    # falta e atitudes gravados em massa e um único recálculo da turma/período
+    # (ver services/lancamento.py).
+    PERMISSOES_GRELHA = (
+        "tic.add_atitudesperiodotic",
+        "tic.change_atitudesperiodotic",
+        "tic.delete_atitudesperiodotic",
+    )
+
+    ALUNOS_POR_PAGINA = 20
+
+    def get_urls(self):
+        urls = [
+            path(
+                "grelha/",
+                self.admin_site.admin_view(self.grelha_atitudes_view),
+                name="tic_atitudesperiodotic_grelha",
+            ),
+            path(
+                "alunos/",
+                self.admin_site.admin_view(self.alunos_turma_view),
+                name="tic_atitudesperiodotic_alunos",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    # ---------- AUTOCOMPLETE DE ALUNOS (formato select2) ----------
+    # ?turma=<id>&term=<texto>&page=<n>; a lista da turma vem da cache.
+    def alunos_turma_view(self, request):
+        if not (self.has_add_permission(request) or self.has_change_permission(request)):
+            raise PermissionDenied
+
+        turma_id = request.GET.get("turma", "")
+        if not turma_id.isdigit():
+            return JsonResponse({"results": [], "pagination": {"more": False}})
+
+        termo = request.GET.get("term", "").strip().casefold()
+        pagina = request.GET.get("page", "1")
+        pagina = int(pagina) if pagina.isdigit() and int(pagina) > 0 else 1
+
+        opcoes = [
+            {"id": aluno_id, "text": texto}
+            for aluno_id, texto in opcoes_alunos_turma(int(turma_id))
+            if termo in texto.casefold()
+        ]
+        inicio = (pagina - 1) * self.ALUNOS_POR_PAGINA
+        fim = inicio + self.ALUNOS_POR_PAGINA
+        return JsonResponse({"results": opcoes[inicio:fim], "pagination": {"more": fim < len(opcoes)}})
+
+    def grelha_atitudes_view(self, request):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        pode_gravar = request.user.has_perms(self.PERMISSOES_GRELHA)
+
+        turmas = list(Turma.objects.select_related("ano_letivo").order_by("ano_letivo__nome", "nome"))
+        turma = next((t for t in turmas if str(t.pk) == request.GET.get("turma")), None)
+        periodo = request.GET.get("periodo")
+        periodo = int(periodo) if periodo in {str(p) for p in Periodo.values} else None
+
+        contexto = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Atitudes por turma",
+            "turmas": turmas,
+            "periodos": Periodo.choices,
+            "turma": turma,
+            "periodo": periodo,
+            "pode_gravar": pode_gravar,
+        }
+        if turma is None or periodo is None:
+            return TemplateResponse(request, "admin/tic/atitudesperiodotic/grelha.html", contexto)
+
+        fechado = BoletimPeriodoTIC.objects.periodo_fechado(turma.pk, periodo)
+        pode_gravar = pode_gravar and not fechado
+        contexto.update({"fechado": fechado, "pode_gravar": pode_gravar})
+
+        tetos = regras_da_turma(turma).tetos_atitudes
+        alunos = list(Aluno.objects.filter(turma=turma).order_by("numero", "nome_completo"))
+        erros: dict[int, str] = {}
+
+        if request.method != "POST":
+            gravadas = {
+                aluno_id: valores
+                for aluno_id, *valores in AtitudesPeriodoTIC.objects
+                .filter(boletim__turma=turma, boletim__periodo=periodo)
+                .values_list("boletim__aluno_id", *CAMPOS_ATITUDES)
+            }
+            valores = {aluno.pk: gravadas.get(aluno.pk, [None] * len(CAMPOS_ATITUDES)) for aluno in alunos}
+        else:
+            if not pode_gravar:
+                raise PermissionDenied
+            valores = {
+                aluno.pk: tuple(
+                    request.POST.get(f"atitudes_{aluno.pk}_{i}", "") for i in range(len(CAMPOS_ATITUDES))
+                )
+                for aluno in alunos
+            }
+            atitudes, erros = validar_grelha_atitudes(valores, tetos)
+            if not erros:
+                n_gravadas, n_apagadas = gravar_atitudes_turma(turma, periodo, atitudes)
+                self.message_user(
+                    request,
+                    f"Atitudes gravadas: {n_gravadas}; apagadas: {n_apagadas}.",
+                    messages.SUCCESS,
+                )
+                return redirect(request.get_full_path())
+            self.message_user(request, "Corrija as linhas assinaladas; nada foi gravado.", messages.ERROR)
+
+        contexto.update({
+            "dimensoes": list(zip(ROTULOS_ATITUDES, tetos)),
+            "linhas": [(aluno, valores[aluno.pk], erros.get(aluno.pk)) for aluno in alunos],
+        })
+        return TemplateResponse(request, "admin/tic/atitudesperiodotic/grelha.html", contexto)
 
 
 # =========================
@@ -230,20 +437,207 @@ class AtitudesPeriodoTICAdmin(admin.ModelAdmin):
 # =========================
 @admin.register(AvaliacaoCognitivaTIC)
 class AvaliacaoCognitivaTICAdmin(admin.ModelAdmin):
-    list_display = ("turma", "periodo", "nome", "peso_percentual")
+    list_display = ("turma", "periodo", "nome", "peso_percentual", "link_grelha_notas")
     list_filter = ("turma", "periodo")
+    list_select_related = ("turma__ano_letivo",)
     search_fields = ("nome",)
     autocomplete_fields = ("turma",)
+    change_form_template = "admin/tic/avaliacaocognitivatic/change_form.html"
+
+    PERMISSOES_GRELHA = (
+        "tic.add_notaavaliacaocognitivatic",
+        "tic.change_notaavaliacaocognitivatic",
+        "tic.delete_notaavaliacaocognitivatic",
+    )
+
+    def get_urls(self):
+        urls = [
+            path(
+                "<path:object_id>/notas/",
+                self.admin_site.admin_view(self.grelha_notas_view),
+                name="tic_avaliacaocognitivatic_grelha_notas",
+            ),
+        ]
+        return urls + super().get_urls()
+
+    def link_grelha_notas(self, obj: AvaliacaoCognitivaTIC):
+        url = reverse("admin:tic_avaliacaocognitivatic_grelha_notas", args=[obj.pk])
+        return format_html('<a href="{}">Lançar notas</a>', url)
+
+    link_grelha_notas.short_description = "Notas"
+
+    # ---------- GRELHA DE NOTAS (todos os alunos da turma, um só POST) ----------
+    # Validação em memória; se tudo estiver certo, upsert em massa e um único
+    # recálculo da turma/período (ver services/lancamento.py).
+    def grelha_notas_view(self, request, object_id):
+        avaliacao = get_object_or_404(
+            AvaliacaoCognitivaTIC.objects.select_related("turma__ano_letivo"), pk=object_id
+        )
+        if not self.has_view_permission(request, avaliacao):
+            raise PermissionDenied
+        fechado = BoletimPeriodoTIC.objects.periodo_fechado(avaliacao.turma_id, avaliacao.periodo)
+        pode_gravar = request.user.has_perms(self.PERMISSOES_GRELHA) and not fechado
+
+        alunos = list(Aluno.objects.filter(turma_id=avaliacao.turma_id).order_by("numero", "nome_completo"))
+        erros: dict[int, str] = {}
+
+        if request.method != "POST":
+            gravadas = dict(avaliacao.notas.values_list("aluno_id", "nota_0a100"))
+            valores = {aluno.pk: gravadas.get(aluno.pk) for aluno in alunos}
+        else:
+            if not pode_gravar:
+                raise PermissionDenied
+            valores = {aluno.pk: request.POST.get(f"nota_{aluno.pk}", "") for aluno in alunos}
+            notas, erros = validar_grelha(valores)
+            if not erros:
+                n_gravadas, n_apagadas = gravar_notas_avaliacao(avaliacao, notas)
+                self.message_user(
+                    request,
+                    f"Notas gravadas: {n_gravadas}; apagadas: {n_apagadas}.",
+                    messages.SUCCESS,
+                )
+                return redirect(request.path)
+            self.message_user(request, "Corrija as notas assinaladas; nada foi gravado.", messages.ERROR)
+
+        contexto = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": f"Notas: {avaliacao}",
+            "avaliacao": avaliacao,
+            "linhas": [(aluno, valores.get(aluno.pk), erros.get(aluno.pk)) for aluno in alunos],
+            "pode_gravar": pode_gravar,
+            "fechado": fechado,
+        }
+        return TemplateResponse(request, "admin/tic/avaliacaocognitivatic/grelha_notas.html", contexto)
 
 
 # =========================
 # NOTAS DAS AVALIAÇÕES
 # =========================
 @admin.register(NotaAvaliacaoCognitivaTIC)
-class NotaAvaliacaoCognitivaTICAdmin(admin.ModelAdmin):
+class NotaAvaliacaoCognitivaTICAdmin(ApagarSoPeriodoAbertoMixin, admin.ModelAdmin):
     list_display = ("avaliacao", "aluno", "nota_0a100", "criado_em")
     list_filter = ("avaliacao__turma", "avaliacao__periodo")
     search_fields = ("aluno__nome_completo", "avaliacao__nome")
     autocomplete_fields = ("avaliacao", "aluno")
+    turma_lookup = "avaliacao__turma_id"
+    periodo_lookup = "avaliacao__periodo"
+
+
+# =========================
+# FILA DE RECÁLCULO (somente consulta)
+# =========================
+@admin.register(RecalculoPendente)
+class RecalculoPendenteAdmin(admin.ModelAdmin):
+    list_display = ("turma", "aluno", "periodo", "primeiro_pedido_em", "reservado_por", "tentativas", "falhou_em")
+    list_filter = ("periodo", ("falhou_em", admin.EmptyFieldListFilter))
+    list_select_related = ("turma__ano_letivo", "aluno")
 
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# =========================
+# ESTATÍSTICAS TURMA/PERÍODO (somente consulta)
+# =========================
+@admin.register(EstatisticaTurmaPeriodoTIC)
+class EstatisticaTurmaPeriodoTICAdmin(admin.ModelAdmin):
+    list_display = (
+        "turma",
+        "periodo",
+        "n",
+        "media_turma",
+        "mediana",
+        "desvio_padrao",
+        "minimo",
+        "maximo",
+        "histograma_nivel",
+        "histograma_mencao",
+        "atualizado_em",
+        "link_pauta",
+    )
+    list_filter = ("periodo", "turma__ano_letivo")
+    list_select_related = ("turma__ano_letivo",)
+    actions = ("fechar_periodos", "reabrir_periodos")
+
+    # "media" colide com ModelAdmin.media (JS/CSS), por isso não pode ir diretamente no list_display.
+    def media_turma(self, obj: EstatisticaTurmaPeriodoTIC):
+        return obj.media
+
+    media_turma.short_description = "Média"
+
+    def link_pauta(self, obj: EstatisticaTurmaPeriodoTIC):
+        url = reverse("tic:pauta", args=[obj.turma_id, obj.periodo])
+        return format_html('<a href="{0}">HTML</a> | <a href="{0}?formato=csv">CSV</a> | <a href="{0}?formato=xlsx">XLSX</a>', url)
+
+    link_pauta.short_description = "Pauta"
+
+    # ---------- FECHO DE PERÍODO (ver services/fecho.py) ----------
+    def has_fecho_permission(self, request):
+        return request.user.has_perm("tic.change_boletimperiodotic")
 
+    def _por_periodo(self, queryset):
+        turmas_por_periodo: dict[int, set[int]] = {}
+        for turma_id, periodo in queryset.values_list("turma_id", "periodo"):
+            turmas_por_periodo.setdefault(periodo, set()).add(turma_id)
+        return turmas_por_periodo.items()
+
+    @admin.action(description="Fechar período (congela os boletins)", permissions=["fecho"])
+    def fechar_periodos(self, request, queryset):
+        fechados = sum(
+            fechar_periodo(Turma.objects.filter(pk__in=turma_ids), periodo)
+            for periodo, turma_ids in self._por_periodo(queryset)
+        )
+        self.message_user(request, f"Boletins fechados: {fechados}.", messages.SUCCESS)
+
+    @admin.action(description="Reabrir período", permissions=["fecho"])
+    def reabrir_periodos(self, request, queryset):
+        reabertos = sum(
+            reabrir_periodo(Turma.objects.filter(pk__in=turma_ids), periodo)
+            for periodo, turma_ids in self._por_periodo(queryset)
+        )
+        self.message_user(request, f"Boletins reabertos: {reabertos}.", messages.SUCCESS)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# =========================
+# BOLETIM ANUAL (somente consulta)
+# =========================
+@admin.register(BoletimAnualTIC)
+class BoletimAnualTICAdmin(admin.ModelAdmin):
+    list_display = (
+        "turma",
+        "aluno",
+        "nota_p1",
+        "nota_p2",
+        "nota_p3",
+        "nota_anual_100",
+        "nivel_sge",
+        "mencao_qualitativa",
+    )
+    list_filter = ("turma__ano_letivo", "turma")
+    list_select_related = ("turma__ano_letivo", "aluno")
+    search_fields = ("aluno__nome_completo", "turma__nome")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
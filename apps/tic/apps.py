@@ -1,12 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 class TicConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.tic"
 
     def ready(self):
-        # Importa signals no arranque do Django
+        # Importa signals e checks no arranque do Django
+        import apps.tic.checks  # noqa
         import apps.tic.signals  # noqa
+        from apps.tic.services.cache_resultados import renovar_namespace
+
+        # Base nova, migrada ou esvaziada (flush): a cache de resultados recomeça
+        post_migrate.connect(renovar_namespace, sender=self)
 
 
 
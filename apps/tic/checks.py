@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.core.checks import Error, register
+from django.core.exceptions import ImproperlyConfigured
+
+from apps.tic.services.cache_resultados import ALIAS, cache_partilhada
+from apps.tic.services.tic_rules import regras_de_settings
+
+
+@register()
+def verificar_cache_modo_fila(app_configs, **kwargs):
+    """
+    Em modo fila o recálculo corre noutro processo (tic_worker): a cache de
+    resultados tem de ser partilhada, senão o servidor nunca vê as versões
+    novas.
+    """
+    if getattr(settings, "TIC_RECALCULO_EM_FILA", False) and not cache_partilhada():
+        return [
+            Error(
+                f'TIC_RECALCULO_EM_FILA = True com a cache "{ALIAS}" em LocMemCache (por processo).',
+                hint=f'Use um backend partilhado em CACHES["{ALIAS}"] (FileBasedCache, Redis ou base de dados).',
+                id="tic.E001",
+            )
+        ]
+    return []
+
+
+@register()
+def verificar_regras(app_configs, **kwargs):
+    """
+    TIC_REGRAS tem de compilar (campos conhecidos, limites por ordem,
+    valores com até 2 casas decimais), senão o primeiro cálculo falha.
+    """
+    try:
+        regras_de_settings()
+    except ImproperlyConfigured as exc:
+        return [Error(str(exc), hint="Ver os campos de RegrasTIC (apps/tic/services/tic_rules.py).", id="tic.E002")]
+    return []
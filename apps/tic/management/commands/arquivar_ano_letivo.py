@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.tic.services.arquivo import (
+    TABELAS,
+    abrir_arquivo,
+    arquivado,
+    arquivar_ano_letivo,
+    numpy_disponivel,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Arquiva um ano letivo fechado (turmas, alunos, avaliações, notas e boletins) num arquivo "
+        "colunar (.npy + manifesto com sha256), confere-o com a BD e apaga as linhas arquivadas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("ano_letivo", help="Ex.: 2024/2025")
+        parser.add_argument("--pasta", default=None, help="Pasta base dos arquivos (omissão: TIC_ARQUIVO_DIR).")
+        parser.add_argument("--manter", action="store_true", help="Escreve e confere o arquivo, sem apagar da BD.")
+        parser.add_argument("--verificar", action="store_true", help="Só confere um arquivo existente (sha256).")
+        parser.add_argument("--vacuum", action="store_true", help="SQLite: VACUUM no fim (recupera o espaço).")
+
+    def handle(self, *args, **options):
+        if not numpy_disponivel():
+            raise CommandError("O arquivo requer NumPy (pip install numpy).")
+
+        ano_letivo = options["ano_letivo"]
+        if options["verificar"]:
+            self._verificar(ano_letivo, options["pasta"])
+            return
+
+        inicio = time.perf_counter()
+        try:
+            resultado = arquivar_ano_letivo(ano_letivo, pasta_base=options["pasta"], apagar=not options["manter"])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        if resultado.retomado:
+            self.stdout.write(f"Arquivo existente conferido: {resultado.pasta}")
+        for tabela, linhas in resultado.linhas.items():
+            self.stdout.write(f"  {tabela}: {linhas} linhas")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ano letivo {resultado.ano_letivo} arquivado em {resultado.pasta} "
+                f"({resultado.tamanho_bytes / 1024:.0f} KB); {resultado.apagadas} linhas apagadas da BD "
+                f"em {time.perf_counter() - inicio:.2f}s"
+            )
+        )
+
+        if options["vacuum"] and connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute("VACUUM")
+            self.stdout.write("VACUUM concluído.")
+
+    def _verificar(self, ano_letivo: str, pasta: str | None) -> None:
+        if not arquivado(ano_letivo, pasta):
+            raise CommandError(f"O ano letivo {ano_letivo} não está arquivado.")
+
+        arquivo = abrir_arquivo(ano_letivo, pasta)
+        problemas = arquivo.verificar()
+        if problemas:
+            raise CommandError("Arquivo inválido:\n" + "\n".join(problemas))
+        if arquivo.controlo() != arquivo.manifesto["controlo"]:
+            raise CommandError("Arquivo inválido: contagens ou somas de controlo diferentes do manifesto.")
+
+        for tabela in TABELAS:
+            self.stdout.write(f"  {tabela}: {arquivo.linhas(tabela)} linhas")
+        self.stdout.write(self.style.SUCCESS(f"Arquivo {arquivo.pasta} íntegro."))
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.tic.models import BoletimPeriodoTIC, Periodo
+from apps.tic.services.exportacao import CHUNK_PADRAO, FORMATOS, exportar_boletins
+
+
+class Command(BaseCommand):
+    help = (
+        "Exporta os boletins TIC (turma, aluno, período, notas, menção e nível) em CSV ou JSON, "
+        "em streaming (memória constante), para um ficheiro ou para o stdout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--formato", choices=sorted(FORMATOS), default="csv")
+        parser.add_argument("--saida", default="-", help="Ficheiro de saída ('-' = stdout).")
+        parser.add_argument("--ano-letivo", dest="ano_letivo", default=None, help="Ex.: 2025/2026")
+        parser.add_argument("--turma_id", type=int, default=None)
+        parser.add_argument("--periodo", type=int, default=None, choices=Periodo.values)
+        parser.add_argument("--estado", default=None, choices=BoletimPeriodoTIC.Estado.values)
+        parser.add_argument("--chunk", type=int, default=CHUNK_PADRAO, help="Linhas lidas da BD por bloco.")
+
+    def handle(self, *args, **options):
+        if options["chunk"] < 1:
+            raise CommandError("--chunk deve ser >= 1.")
+
+        partes = exportar_boletins(
+            options["formato"],
+            chunk=options["chunk"],
+            ano_letivo=options["ano_letivo"],
+            turma_id=options["turma_id"],
+            periodo=options["periodo"],
+            estado=options["estado"],
+        )
+
+        inicio = time.perf_counter()
+        if options["saida"] == "-":
+            for parte in partes:
+                self.stdout.write(parte, ending="")
+            return
+
+        caminho = Path(options["saida"])
+        with caminho.open("w", encoding="utf-8", newline="") as saida:
+            saida.writelines(partes)
+        self.stderr.write(self.style.SUCCESS(f"Exportado para {caminho} em {time.perf_counter() - inicio:.2f}s"))
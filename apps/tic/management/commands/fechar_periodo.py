@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.nucleo.models import Turma
+from apps.tic.models import Periodo
+from apps.tic.services.fecho import fechar_periodo, reabrir_periodo
+
+
+class Command(BaseCommand):
+    help = (
+        "Fecha (ou reabre) um período de uma turma ou de todas as turmas de um ano letivo: "
+        "congela os boletins, que deixam de ser recalculados e de aceitar alterações."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--periodo", type=int, required=True, choices=Periodo.values)
+        parser.add_argument("--turma_id", type=int, default=None)
+        parser.add_argument("--ano-letivo", dest="ano_letivo", default=None, help="Ex.: 2025/2026")
+        parser.add_argument("--reabrir", action="store_true", help="Reabre o período (e agenda o recálculo).")
+
+    def handle(self, *args, **options):
+        if options["turma_id"]:
+            turmas = Turma.objects.filter(pk=options["turma_id"])
+        elif options["ano_letivo"]:
+            turmas = Turma.objects.filter(ano_letivo__nome=options["ano_letivo"])
+        else:
+            raise CommandError("Indique --turma_id ou --ano-letivo.")
+        if not turmas.exists():
+            raise CommandError("Nenhuma turma encontrada.")
+
+        rotulo = Periodo(options["periodo"]).label
+        if options["reabrir"]:
+            n = reabrir_periodo(turmas, options["periodo"])
+            self.stdout.write(self.style.SUCCESS(f"{rotulo}: {n} boletins reabertos."))
+        else:
+            n = fechar_periodo(turmas, options["periodo"])
+            self.stdout.write(self.style.SUCCESS(f"{rotulo}: {n} boletins fechados."))
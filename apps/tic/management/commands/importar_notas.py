@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.nucleo.models import Turma
+from apps.tic.models import Periodo
+from apps.tic.services.importacao_notas import BLOCO_PADRAO, importar_notas, ler_ficheiro
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa as notas de uma turma/período a partir de uma folha CSV ou XLSX: uma linha por aluno "
+        "(colunas numero e/ou nome_completo) e uma coluna por avaliação (nome da avaliação). "
+        "Notas iguais às gravadas são ignoradas; no fim, a turma/período é recalculada uma vez."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("ficheiro", help="Caminho do ficheiro .csv ou .xlsx")
+        parser.add_argument("--periodo", type=int, required=True, choices=Periodo.values)
+        parser.add_argument("--turma_id", type=int, default=None)
+        parser.add_argument("--turma", default=None, help="Nome da turma (com --ano-letivo). Ex.: 7A")
+        parser.add_argument("--ano-letivo", dest="ano_letivo", default=None, help="Ex.: 2025/2026")
+        parser.add_argument("--bloco", type=int, default=BLOCO_PADRAO, help="Notas por bloco (upsert).")
+        parser.add_argument("--encoding", default="utf-8-sig", help="Codificação do CSV.")
+        parser.add_argument("--max-erros", dest="max_erros", type=int, default=50, help="Erros a listar.")
+        parser.add_argument("--dry-run", dest="dry_run", action="store_true", help="Valida sem gravar.")
+
+    def _turma(self, options) -> Turma:
+        turmas = Turma.objects.select_related("ano_letivo")
+        if options["turma_id"]:
+            filtro = {"pk": options["turma_id"]}
+        elif options["turma"] and options["ano_letivo"]:
+            filtro = {"nome": options["turma"], "ano_letivo__nome": options["ano_letivo"]}
+        else:
+            raise CommandError("Indique --turma_id, ou --turma e --ano-letivo.")
+        try:
+            return turmas.get(**filtro)
+        except Turma.DoesNotExist:
+            raise CommandError("Turma não encontrada.") from None
+
+    def handle(self, *args, **options):
+        caminho = Path(options["ficheiro"])
+        if not caminho.is_file():
+            raise CommandError(f"Ficheiro não encontrado: {caminho}")
+        if options["bloco"] < 1:
+            raise CommandError("--bloco deve ser >= 1.")
+        turma = self._turma(options)
+
+        inicio = time.perf_counter()
+        with caminho.open("rb") as ficheiro:
+            try:
+                resultado = importar_notas(
+                    turma,
+                    options["periodo"],
+                    ler_ficheiro(ficheiro, caminho.name, encoding=options["encoding"]),
+                    bloco=options["bloco"],
+                    simular=options["dry_run"],
+                )
+            except (ValueError, ImportError) as exc:  # inclui UnicodeDecodeError
+                raise CommandError(str(exc)) from exc
+        duracao = time.perf_counter() - inicio
+
+        if resultado.colunas_ignoradas:
+            self.stdout.write(self.style.WARNING(
+                f"Colunas sem avaliação correspondente (ignoradas): {', '.join(resultado.colunas_ignoradas)}"
+            ))
+        for linha, mensagem in resultado.erros[: options["max_erros"]]:
+            self.stdout.write(self.style.ERROR(f"  linha {linha}: {mensagem}"))
+        if len(resultado.erros) > options["max_erros"]:
+            self.stdout.write(self.style.ERROR(f"  ... e mais {len(resultado.erros) - options['max_erros']} erro(s)"))
+
+        acao = "a gravar (dry-run, nada gravado)" if options["dry_run"] else "gravadas"
+        self.stdout.write(self.style.SUCCESS(
+            f"{turma} | {Periodo(options['periodo']).label}: linhas lidas: {resultado.lidas}; "
+            f"notas {acao}: {resultado.gravadas}; inalteradas: {resultado.inalteradas}; "
+            f"erros: {len(resultado.erros)}; {duracao:.2f}s"
+        ))
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import csv
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.nucleo.models import AnoLetivo
+from apps.tic.services.anual import gerar_pauta_anual
+
+CABECALHO = (
+    "ano_letivo",
+    "turma",
+    "numero",
+    "aluno",
+    "nota_p1",
+    "nota_p2",
+    "nota_p3",
+    "nota_anual_100",
+    "mencao_qualitativa",
+    "nivel_sge",
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Pauta anual TIC (notas de P1, P2 e P3, nota anual ponderada, menção e nível) "
+        "em CSV, de toda a escola ou de um ano letivo, para um ficheiro ou para o stdout."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ano-letivo", dest="ano_letivo", default=None, help="Ex.: 2025/2026")
+        parser.add_argument("--saida", default="-", help="Ficheiro de saída ('-' = stdout).")
+        parser.add_argument(
+            "--reconstruir",
+            action="store_true",
+            help="Refaz os boletins anuais a partir dos boletins de período antes de exportar.",
+        )
+
+    def handle(self, *args, **options):
+        ano_letivo_id = None
+        if options["ano_letivo"]:
+            ano_letivo = AnoLetivo.objects.filter(nome=options["ano_letivo"]).first()
+            if ano_letivo is None:
+                raise CommandError(f"Ano letivo {options['ano_letivo']} não existe.")
+            ano_letivo_id = ano_letivo.pk
+
+        pauta = gerar_pauta_anual(ano_letivo_id, reconstruir=options["reconstruir"])
+
+        def escrever(saida) -> int:
+            escritor = csv.writer(saida)
+            escritor.writerow(CABECALHO)
+            n = 0
+            for anual in pauta.iterator():
+                escritor.writerow((
+                    anual.turma.ano_letivo.nome,
+                    anual.turma.nome,
+                    anual.aluno.numero,
+                    anual.aluno.nome_completo,
+                    anual.nota_p1,
+                    anual.nota_p2,
+                    anual.nota_p3,
+                    anual.nota_anual_100,
+                    anual.mencao_qualitativa,
+                    anual.nivel_sge,
+                ))
+                n += 1
+            return n
+
+        if options["saida"] == "-":
+            escrever(self.stdout)
+            return
+
+        caminho = Path(options["saida"])
+        with caminho.open("w", encoding="utf-8", newline="") as saida:
+            n = escrever(saida)
+        self.stderr.write(self.style.SUCCESS(f"Pauta anual: {n} aluno(s) em {caminho}"))
@@ -1,32 +1,243 @@
-from django.core.management.base import BaseCommand
+from __future__ import annotations
 
-from apps.tic.models import BoletimPeriodoTIC
-from apps.tic.services.tic_calculator import recalcular_e_gravar_periodo
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count
+
+from apps.nucleo.models import Turma
+from apps.tic.models import BoletimPeriodoTIC, Periodo
+from apps.tic.services.anual import recalcular_anuais, verificar_anuais
+from apps.tic.services.estatisticas import reconstruir_estatisticas, verificar_estatisticas
+from apps.tic.services.tic_calculator import recalcular_boletins, verificar_boletins
+from apps.tic.services.tic_vetorizado import numpy_disponivel, recalcular_boletins_vetorizado
+
+
+CHECKPOINT_PADRAO = Path(settings.BASE_DIR) / "recalcular_tic.checkpoint.json"
+
+MOTORES = {
+    "decimal": recalcular_boletins,
+    "numpy": recalcular_boletins_vetorizado,
+}
+
+
+# -------------------------
+# Trabalho por turma (corre no processo principal ou num worker)
+# -------------------------
+def _inicializar_worker() -> None:
+    """
+    Em plataformas com 'spawn' (ex.: Windows) o processo filho arranca sem Django.
+    """
+    import django
+
+    django.setup()
+
+
+def _recalcular_turma(turma_id: int, filtros: dict, chunk: int, motor: str = "decimal") -> tuple[int, int, float]:
+    """
+    Recalcula os boletins de uma turma em blocos de chave primária e
+    reconstrói as estatísticas e os boletins anuais da turma (corrige
+    também os que divergem sem que nenhum boletim de período tenha mudado).
+    Retorna (turma_id, boletins processados, segundos).
+    """
+    inicio = time.perf_counter()
+    recalcular = MOTORES[motor]
+    qs = BoletimPeriodoTIC.objects.filter(turma_id=turma_id, **filtros).abertos().order_by("pk")
+
+    total = 0
+    ultimo_pk = 0
+    while True:
+        ids = list(qs.filter(pk__gt=ultimo_pk).values_list("pk", flat=True)[:chunk])
+        if not ids:
+            break
+        total += recalcular(BoletimPeriodoTIC.objects.filter(pk__in=ids))
+        ultimo_pk = ids[-1]
+
+    reconstruir_estatisticas(BoletimPeriodoTIC.objects.filter(turma_id=turma_id, **filtros))
+    recalcular_anuais(Turma.objects.filter(pk=turma_id))
+    return turma_id, total, time.perf_counter() - inicio
+
+
+# -------------------------
+# Checkpoint (retomar execuções interrompidas)
+# -------------------------
+def _ler_checkpoint(caminho: Path, ambito: dict) -> set[int]:
+    if not caminho.exists():
+        return set()
+    try:
+        dados = json.loads(caminho.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return set()
+    if dados.get("ambito") != ambito:
+        return set()
+    return set(dados.get("turmas_concluidas", []))
+
+
+def _gravar_checkpoint(caminho: Path, ambito: dict, concluidas: set[int]) -> None:
+    tmp = caminho.with_suffix(caminho.suffix + ".tmp")
+    tmp.write_text(
+        json.dumps({"ambito": ambito, "turmas_concluidas": sorted(concluidas)}),
+        encoding="utf-8",
+    )
+    os.replace(tmp, caminho)  # escrita atómica
 
 
 class Command(BaseCommand):
-    help = "Recalcula e grava as notas finais TIC para boletins (por turma/periodo opcional)."
+    help = (
+        "Recalcula e grava as notas finais TIC dos boletins, em lote, por turma. "
+        "Suporta vários processos (--workers) e retoma a partir de um checkpoint."
+    )
 
     def add_arguments(self, parser):
+        parser.add_argument("--ano-letivo", dest="ano_letivo", default=None, help="Ex.: 2025/2026")
         parser.add_argument("--turma_id", type=int, default=None)
-        parser.add_argument("--periodo", type=int, default=None)
+        parser.add_argument("--periodo", type=int, default=None, choices=Periodo.values)
+        parser.add_argument("--workers", type=int, default=1, help="Número de processos (por turma).")
+        parser.add_argument("--chunk", type=int, default=500, help="Boletins por bloco de chave primária.")
+        parser.add_argument(
+            "--motor",
+            choices=sorted(MOTORES),
+            default="decimal",
+            help="decimal (referência) ou numpy (vetorizado, para execuções em massa).",
+        )
+        parser.add_argument("--checkpoint", default=str(CHECKPOINT_PADRAO))
+        parser.add_argument("--recomecar", action="store_true", help="Ignora o checkpoint existente.")
+        parser.add_argument("--dry-run", dest="dry_run", action="store_true", help="Mostra o âmbito sem gravar.")
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Compara os valores gravados (incrementais) com um recálculo completo, sem gravar.",
+        )
 
     def handle(self, *args, **options):
-        turma_id = options["turma_id"]
-        periodo = options["periodo"]
+        workers = options["workers"]
+        chunk = options["chunk"]
+        if workers < 1:
+            raise CommandError("--workers deve ser >= 1.")
+        if workers > 1 and connection.vendor == "sqlite":
+            # Um só escritor de cada vez: os outros processos falhariam com "database is locked".
+            raise CommandError("--workers > 1 não é suportado com SQLite; use --workers 1.")
+        if chunk < 1:
+            raise CommandError("--chunk deve ser >= 1.")
+        motor = options["motor"]
+        if motor == "numpy" and not numpy_disponivel():
+            raise CommandError("O motor numpy requer NumPy instalado (pip install numpy).")
 
         qs = BoletimPeriodoTIC.objects.all()
-        if turma_id:
-            qs = qs.filter(turma_id=turma_id)
-        if periodo:
-            qs = qs.filter(periodo=periodo)
+        filtros = {}
+        if options["ano_letivo"]:
+            qs = qs.filter(turma__ano_letivo__nome=options["ano_letivo"])
+        if options["turma_id"]:
+            qs = qs.filter(turma_id=options["turma_id"])
+        if options["periodo"]:
+            filtros["periodo"] = options["periodo"]
+            qs = qs.filter(**filtros)
+        if not options["verificar"]:
+            qs = qs.abertos()  # boletins FECHADO estão congelados: não se recalculam
+
+        contagem_por_turma = dict(
+            qs.order_by().values_list("turma_id").annotate(n=Count("pk"))
+        )
+        nomes = {t.pk: str(t) for t in Turma.objects.select_related("ano_letivo").filter(pk__in=contagem_por_turma)}
+        total = sum(contagem_por_turma.values())
+        self.stdout.write(self.style.NOTICE(
+            f"Boletins encontrados: {total} em {len(contagem_por_turma)} turma(s)"
+        ))
+
+        if options["dry_run"]:
+            for turma_id, n in sorted(contagem_por_turma.items()):
+                self.stdout.write(f"  {nomes.get(turma_id, turma_id)}: {n} boletins")
+            self.stdout.write(self.style.WARNING("Dry-run: nada foi gravado."))
+            return
 
-        total = qs.count()
-        self.stdout.write(self.style.NOTICE(f"Boletins encontrados: {total}"))
+        if options["verificar"]:
+            self._verificar(sorted(contagem_por_turma), filtros, nomes)
+            return
 
+        caminho = Path(options["checkpoint"])
+        ambito = {
+            "ano_letivo": options["ano_letivo"],
+            "turma_id": options["turma_id"],
+            "periodo": options["periodo"],
+        }
+        concluidas = set() if options["recomecar"] else _ler_checkpoint(caminho, ambito)
+        concluidas &= set(contagem_por_turma)
+        if concluidas:
+            self.stdout.write(self.style.NOTICE(
+                f"A retomar: {len(concluidas)} turma(s) já concluída(s) no checkpoint."
+            ))
+
+        pendentes = [t for t in sorted(contagem_por_turma) if t not in concluidas]
+        total_pendente = sum(contagem_por_turma[t] for t in pendentes)
+
+        inicio = time.perf_counter()
         ok = 0
-        for boletim in qs:
-            recalcular_e_gravar_periodo(boletim)
-            ok += 1
 
-        self.stdout.write(self.style.SUCCESS(f"Recalculo finalizado: {ok}/{total}"))
+        def registar(turma_id: int, n: int, segundos: float) -> None:
+            nonlocal ok
+            ok += n
+            concluidas.add(turma_id)
+            _gravar_checkpoint(caminho, ambito, concluidas)
+            self.stdout.write(f"  {nomes.get(turma_id, turma_id)}: {n} boletins em {segundos:.2f}s")
+
+        if workers == 1:
+            for turma_id in pendentes:
+                registar(*_recalcular_turma(turma_id, filtros, chunk, motor))
+        else:
+            # As ligações não podem ser partilhadas entre processos.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_inicializar_worker) as pool:
+                futuros = [pool.submit(_recalcular_turma, t, filtros, chunk, motor) for t in pendentes]
+                for futuro in as_completed(futuros):
+                    registar(*futuro.result())
+
+        duracao = time.perf_counter() - inicio
+        taxa = ok / duracao if duracao > 0 else 0.0
+
+        # Execução completa: o checkpoint deixa de ser necessário.
+        if caminho.exists():
+            caminho.unlink()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recalculo finalizado: {ok}/{total_pendente} em {duracao:.2f}s ({taxa:.1f} boletins/s)"
+        ))
+
+    def _verificar(self, turma_ids: list[int], filtros: dict, nomes: dict) -> None:
+        total = 0
+        for turma_id in turma_ids:
+            divergencias = verificar_boletins(
+                BoletimPeriodoTIC.objects.filter(turma_id=turma_id, **filtros)
+            )
+            total += len(divergencias)
+            for boletim_id, campo, gravado, esperado in divergencias:
+                self.stdout.write(self.style.ERROR(
+                    f"  {nomes.get(turma_id, turma_id)} | boletim {boletim_id} | "
+                    f"{campo}: gravado={gravado} esperado={esperado}"
+                ))
+
+            divergencias_estatistica = verificar_estatisticas(
+                BoletimPeriodoTIC.objects.filter(turma_id=turma_id, **filtros)
+            )
+            total += len(divergencias_estatistica)
+            for _, periodo, campo in divergencias_estatistica:
+                self.stdout.write(self.style.ERROR(
+                    f"  {nomes.get(turma_id, turma_id)} | estatísticas do {periodo}.º período | {campo}"
+                ))
+
+            divergencias_anuais = verificar_anuais(Turma.objects.filter(pk=turma_id))
+            total += len(divergencias_anuais)
+            for _, aluno_id, campo, gravado, esperado in divergencias_anuais:
+                self.stdout.write(self.style.ERROR(
+                    f"  {nomes.get(turma_id, turma_id)} | anual do aluno {aluno_id} | "
+                    f"{campo}: gravado={gravado} esperado={esperado}"
+                ))
+
+        if total:
+            raise CommandError(f"{total} divergência(s) encontrada(s). Execute recalcular_tic para corrigir.")
+        self.stdout.write(self.style.SUCCESS("Verificação concluída: valores gravados coincidem com o recálculo."))
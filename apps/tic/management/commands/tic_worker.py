@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import time
+import traceback
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.tic.services.cache_resultados import ALIAS, cache_partilhada
+from apps.tic.services.fila_recalculo import estado_fila, novo_token, processar_lote
+
+
+class Command(BaseCommand):
+    help = (
+        "Processa a fila de recálculo TIC (RecalculoPendente) em lotes. "
+        "Use com TIC_RECALCULO_EM_FILA = True."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=200, help="Pedidos por lote.")
+        parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos de espera com a fila vazia.")
+        parser.add_argument("--uma-vez", dest="uma_vez", action="store_true", help="Esvazia a fila e termina.")
+        parser.add_argument("--estado", action="store_true", help="Mostra pendentes e atraso, e termina.")
+
+    def handle(self, *args, **options):
+        if options["lote"] < 1:
+            raise CommandError("--lote deve ser >= 1.")
+
+        if options["estado"]:
+            self._mostrar_estado()
+            return
+
+        if not cache_partilhada():
+            raise CommandError(
+                f'A cache "{ALIAS}" é LocMemCache (por processo): os servidores não veriam os '
+                "recálculos do worker. Configure um backend partilhado em CACHES."
+            )
+
+        token = novo_token()
+        self.stdout.write(self.style.NOTICE(f"Worker {token[:8]} iniciado."))
+        self._mostrar_estado()
+
+        total = 0
+        try:
+            while True:
+                inicio = time.perf_counter()
+                try:
+                    n = processar_lote(token, options["lote"])
+                except Exception:
+                    # O lote já voltou à fila (com backoff); o worker continua.
+                    self.stderr.write(self.style.ERROR(f"Erro no lote:\n{traceback.format_exc()}"))
+                    time.sleep(options["intervalo"])
+                    continue
+                if n:
+                    total += n
+                    duracao = time.perf_counter() - inicio
+                    self.stdout.write(f"  {n} boletins recalculados em {duracao:.2f}s")
+                    continue
+
+                if options["uma_vez"]:
+                    break
+                time.sleep(options["intervalo"])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING("Interrompido."))
+
+        self._mostrar_estado()
+        self.stdout.write(self.style.SUCCESS(f"Total processado: {total}"))
+
+    def _mostrar_estado(self) -> None:
+        estado = estado_fila()
+        atraso = estado["atraso"]
+        atraso_txt = f"{atraso.total_seconds():.1f}s" if atraso is not None else "—"
+        self.stdout.write(
+            f"Pendentes: {estado['pendentes']} | falhados: {estado['falhados']} | "
+            f"atraso do mais antigo: {atraso_txt}"
+        )
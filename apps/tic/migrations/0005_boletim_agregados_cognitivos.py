@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:39
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+def preencher_agregados(apps, schema_editor):
+    """
+    Preenche soma_ponderada / total_peso dos boletins existentes a partir das notas.
+    """
+    BoletimPeriodoTIC = apps.get_model("tic", "BoletimPeriodoTIC")
+    NotaAvaliacaoCognitivaTIC = apps.get_model("tic", "NotaAvaliacaoCognitivaTIC")
+
+    somas = defaultdict(lambda: [Decimal("0"), Decimal("0")])
+    notas = NotaAvaliacaoCognitivaTIC.objects.values_list(
+        "avaliacao__turma_id", "aluno_id", "avaliacao__periodo", "nota_0a100", "avaliacao__peso_percentual"
+    )
+    for turma_id, aluno_id, periodo, nota, peso in notas.iterator():
+        acumulado = somas[(turma_id, aluno_id, periodo)]
+        acumulado[0] += Decimal(str(nota)) * Decimal(str(peso))
+        acumulado[1] += Decimal(str(peso))
+
+    boletins = []
+    for boletim in BoletimPeriodoTIC.objects.only("id", "turma_id", "aluno_id", "periodo").iterator():
+        soma, total = somas.get((boletim.turma_id, boletim.aluno_id, boletim.periodo), (Decimal("0"), Decimal("0")))
+        if total:
+            boletim.soma_ponderada = soma
+            boletim.total_peso = total
+            boletins.append(boletim)
+    BoletimPeriodoTIC.objects.bulk_update(boletins, ["soma_ponderada", "total_peso"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tic', '0004_alter_avaliacaocognitivatic_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boletimperiodotic',
+            name='soma_ponderada',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0'), max_digits=14, verbose_name='Soma ponderada (Σ nota × peso)'),
+        ),
+        migrations.AddField(
+            model_name='boletimperiodotic',
+            name='total_peso',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=10, verbose_name='Total de pesos (Σ peso)'),
+        ),
+        migrations.RunPython(preencher_agregados, migrations.RunPython.noop),
+    ]
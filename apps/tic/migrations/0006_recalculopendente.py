@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nucleo', '0003_alter_aluno_unique_together_alter_aluno_numero_and_more'),
+        ('tic', '0005_boletim_agregados_cognitivos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecalculoPendente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.PositiveSmallIntegerField(choices=[(1, '1.º Período'), (2, '2.º Período'), (3, '3.º Período')], verbose_name='Período')),
+                ('primeiro_pedido_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Primeiro pedido em')),
+                ('solicitado_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Último pedido em')),
+                ('disponivel_em', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponível a partir de')),
+                ('reservado_por', models.CharField(blank=True, max_length=64, null=True, verbose_name='Reservado por')),
+                ('reservado_em', models.DateTimeField(blank=True, null=True, verbose_name='Reservado em')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='nucleo.aluno', verbose_name='Aluno')),
+                ('turma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='nucleo.turma', verbose_name='Turma')),
+            ],
+            options={
+                'verbose_name': 'Recálculo pendente',
+                'verbose_name_plural': 'Recálculos pendentes',
+                'ordering': ['primeiro_pedido_em'],
+                'indexes': [models.Index(fields=['reservado_por', 'disponivel_em'], name='tic_recalcu_reserva_ce6e76_idx')],
+                'unique_together': {('turma', 'aluno', 'periodo')},
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:48
+
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def preencher_estatisticas(apps, schema_editor):
+    """
+    Cria as estatísticas das turmas/períodos a partir dos boletins já calculados.
+    """
+    BoletimPeriodoTIC = apps.get_model("tic", "BoletimPeriodoTIC")
+    EstatisticaTurmaPeriodoTIC = apps.get_model("tic", "EstatisticaTurmaPeriodoTIC")
+
+    totais = defaultdict(lambda: {
+        "n": 0, "soma": 0, "quadrados": 0,
+        "notas": Counter(), "niveis": Counter(), "mencoes": Counter(),
+    })
+    boletins = BoletimPeriodoTIC.objects.filter(nota_final_100__isnull=False).values_list(
+        "turma_id", "periodo", "nota_final_100", "nivel_sge", "mencao_qualitativa"
+    )
+    for turma_id, periodo, nota, nivel, mencao in boletins.iterator():
+        nota_c = int(Decimal(str(nota)).scaleb(2))
+        t = totais[(turma_id, periodo)]
+        t["n"] += 1
+        t["soma"] += nota_c
+        t["quadrados"] += nota_c * nota_c
+        t["notas"][str(nota_c)] += 1
+        t["niveis"][str(nivel)] += 1
+        t["mencoes"][mencao] += 1
+
+    EstatisticaTurmaPeriodoTIC.objects.bulk_create(
+        [
+            EstatisticaTurmaPeriodoTIC(
+                turma_id=turma_id,
+                periodo=periodo,
+                n=t["n"],
+                soma_c=t["soma"],
+                soma_quadrados_c=t["quadrados"],
+                distribuicao_notas=dict(t["notas"]),
+                histograma_nivel=dict(t["niveis"]),
+                histograma_mencao=dict(t["mencoes"]),
+            )
+            for (turma_id, periodo), t in totais.items()
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nucleo', '0003_alter_aluno_unique_together_alter_aluno_numero_and_more'),
+        ('tic', '0006_recalculopendente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaTurmaPeriodoTIC',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.PositiveSmallIntegerField(choices=[(1, '1.º Período'), (2, '2.º Período'), (3, '3.º Período')], verbose_name='Período')),
+                ('n', models.PositiveIntegerField(default=0, verbose_name='Boletins calculados')),
+                ('soma_c', models.BigIntegerField(default=0, verbose_name='Σ nota final (cêntimos)')),
+                ('soma_quadrados_c', models.BigIntegerField(default=0, verbose_name='Σ nota final² (cêntimos²)')),
+                ('distribuicao_notas', models.JSONField(default=dict, verbose_name='Distribuição das notas')),
+                ('histograma_nivel', models.JSONField(default=dict, verbose_name='Boletins por nível SGE')),
+                ('histograma_mencao', models.JSONField(default=dict, verbose_name='Boletins por menção')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('turma', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estatisticas_tic', to='nucleo.turma', verbose_name='Turma')),
+            ],
+            options={
+                'verbose_name': 'Estatística TIC (turma/período)',
+                'verbose_name_plural': 'Estatísticas TIC (turmas/períodos)',
+                'ordering': ['turma__nome', 'periodo'],
+                'unique_together': {('turma', 'periodo')},
+            },
+        ),
+        migrations.RunPython(preencher_estatisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:50
+
+from decimal import Decimal, ROUND_HALF_UP
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from apps.tic.services.tic_rules import obter_regras
+
+
+def preencher_anuais(apps, schema_editor):
+    """
+    Cria os boletins anuais a partir das notas finais dos boletins de período.
+    """
+    BoletimPeriodoTIC = apps.get_model("tic", "BoletimPeriodoTIC")
+    BoletimAnualTIC = apps.get_model("tic", "BoletimAnualTIC")
+
+    anuais = {}
+    linhas = BoletimPeriodoTIC.objects.values_list(
+        "turma_id", "aluno_id", "periodo", "nota_final_100", "turma__tipo_contexto", "turma__ciclo"
+    )
+    for turma_id, aluno_id, periodo, nota, tipo_contexto, ciclo in linhas.iterator():
+        anual = anuais.get((turma_id, aluno_id))
+        if anual is None:
+            anual = anuais[(turma_id, aluno_id)] = BoletimAnualTIC(turma_id=turma_id, aluno_id=aluno_id)
+            anual._regras = obter_regras(tipo_contexto, ciclo)
+        setattr(anual, f"nota_p{periodo}", nota)
+
+    for anual in anuais.values():
+        regras = anual._regras
+        pares = [
+            (Decimal(str(nota)), peso)
+            for nota, peso in zip((anual.nota_p1, anual.nota_p2, anual.nota_p3), regras.pesos_periodos)
+            if nota is not None and peso > 0
+        ]
+        if pares:
+            nota_anual = (
+                sum((n * p for n, p in pares), Decimal("0")) / sum((p for _, p in pares), Decimal("0"))
+            ).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+            anual.nota_anual_100 = nota_anual
+            anual.mencao_qualitativa = regras.mencao(nota_anual)
+            anual.nivel_sge = regras.nivel(nota_anual)
+
+    BoletimAnualTIC.objects.bulk_create(anuais.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nucleo', '0003_alter_aluno_unique_together_alter_aluno_numero_and_more'),
+        ('tic', '0007_estatisticaturmaperiodotic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BoletimAnualTIC',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nota_p1', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True, verbose_name='Nota 1.º período')),
+                ('nota_p2', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True, verbose_name='Nota 2.º período')),
+                ('nota_p3', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True, verbose_name='Nota 3.º período')),
+                ('nota_anual_100', models.DecimalField(blank=True, decimal_places=2, max_digits=6, null=True, verbose_name='Nota anual (0 a 100)')),
+                ('mencao_qualitativa', models.CharField(blank=True, max_length=20, null=True, verbose_name='Menção qualitativa')),
+                ('nivel_sge', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Nível SGE (1 a 5)')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='boletins_anuais_tic', to='nucleo.aluno', verbose_name='Aluno')),
+                ('turma', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='boletins_anuais_tic', to='nucleo.turma', verbose_name='Turma')),
+            ],
+            options={
+                'verbose_name': 'Boletim TIC (anual)',
+                'verbose_name_plural': 'Boletins TIC (anuais)',
+                'ordering': ['turma__nome', 'aluno__nome_completo'],
+                'unique_together': {('turma', 'aluno')},
+            },
+        ),
+        migrations.RunPython(preencher_anuais, migrations.RunPython.noop),
+    ]
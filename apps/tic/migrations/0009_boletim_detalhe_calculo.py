@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:55
+
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+
+CAMPOS_ATITUDES = (
+    "responsabilidade_integridade",
+    "excelencia_exigencia",
+    "curiosidade_reflexao_inovacao",
+    "cidadania_participacao",
+    "liberdade",
+)
+
+
+def _fmt2(x) -> str:
+    return f"{Decimal(str(x or 0)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP):.2f}"
+
+
+def preencher_detalhe(apps, schema_editor):
+    """
+    Cria o snapshot dos boletins já calculados (mesmo formato de
+    tic_calculator.montar_detalhe).
+    """
+    BoletimPeriodoTIC = apps.get_model("tic", "BoletimPeriodoTIC")
+    NotaAvaliacaoCognitivaTIC = apps.get_model("tic", "NotaAvaliacaoCognitivaTIC")
+    AtitudesPeriodoTIC = apps.get_model("tic", "AtitudesPeriodoTIC")
+
+    notas = defaultdict(list)
+    for turma_id, aluno_id, periodo, nome, nota, peso in NotaAvaliacaoCognitivaTIC.objects.values_list(
+        "avaliacao__turma_id", "aluno_id", "avaliacao__periodo", "avaliacao__nome", "nota_0a100", "avaliacao__peso_percentual"
+    ).iterator():
+        notas[(turma_id, aluno_id, periodo)].append([nome, _fmt2(peso), _fmt2(nota)])
+
+    atitudes = {
+        boletim_id: valores
+        for boletim_id, *valores in AtitudesPeriodoTIC.objects.values_list("boletim_id", *CAMPOS_ATITUDES).iterator()
+    }
+
+    boletins = []
+    for boletim in BoletimPeriodoTIC.objects.filter(nota_final_100__isnull=False).iterator():
+        valores = atitudes.get(boletim.pk)
+        boletim.detalhe_calculo = {
+            "avaliacoes": sorted(notas.get((boletim.turma_id, boletim.aluno_id, boletim.periodo), [])),
+            "media": _fmt2(boletim.media_cognitiva_100),
+            "atitudes": [_fmt2(v) for v in valores] if valores is not None else None,
+            "total_atitudes": _fmt2(sum(Decimal(str(v)) for v in valores)) if valores is not None else None,
+        }
+        boletins.append(boletim)
+    BoletimPeriodoTIC.objects.bulk_update(boletins, ["detalhe_calculo"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tic', '0008_boletimanualtic'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='boletimperiodotic',
+            name='detalhe_calculo',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Detalhe do cálculo'),
+        ),
+        migrations.RunPython(preencher_detalhe, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nucleo', '0003_alter_aluno_unique_together_alter_aluno_numero_and_more'),
+        ('tic', '0009_boletim_detalhe_calculo'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='boletimperiodotic',
+            name='tic_boletim_turma_i_5b8e05_idx',
+        ),
+        migrations.AddField(
+            model_name='boletimperiodotic',
+            name='fechado_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Fechado em'),
+        ),
+        migrations.AddIndex(
+            model_name='boletimperiodotic',
+            index=models.Index(fields=['turma', 'periodo', 'estado'], name='tic_boletim_turma_i_def656_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tic', '0010_boletim_fecho'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recalculopendente',
+            name='erro',
+            field=models.TextField(blank=True, default='', verbose_name='Último erro'),
+        ),
+        migrations.AddField(
+            model_name='recalculopendente',
+            name='falhou_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Falhou em'),
+        ),
+    ]
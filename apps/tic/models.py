@@ -1,9 +1,10 @@
 from __future__ import annotations
 
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_UP
 
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.utils import timezone
 
 from apps.nucleo.models import Turma, Aluno
 
@@ -20,6 +21,32 @@ class Periodo(models.IntegerChoices):
 # -----------------------------
 # Boletim por período
 # -----------------------------
+class BoletimPeriodoTICQuerySet(models.QuerySet):
+    def with_resultados(self):
+        """
+        Anota os resultados TIC calculados em SQL (calc_nota_final_100,
+        calc_nivel_sge, calc_mencao_qualitativa, ...), numa única query e
+        sem depender dos campos gravados estarem atualizados.
+        """
+        from apps.tic.services.tic_sql import anotar_resultados
+
+        return anotar_resultados(self)
+
+    def abertos(self):
+        return self.filter(estado=BoletimPeriodoTIC.Estado.ABERTO)
+
+    def periodo_fechado(self, turma_id: int, periodo: int) -> bool:
+        """
+        True se a turma/período foi fechada (índice turma, período, estado).
+        """
+        return self.filter(turma_id=turma_id, periodo=periodo, estado=BoletimPeriodoTIC.Estado.FECHADO).exists()
+
+
+def _validar_periodo_aberto(turma_id: int | None, periodo: int | None) -> None:
+    if turma_id and periodo and BoletimPeriodoTIC.objects.periodo_fechado(turma_id, periodo):
+        raise ValidationError(f"O {Periodo(periodo).label} desta turma está fechado: não são permitidas alterações.")
+
+
 class BoletimPeriodoTIC(models.Model):
     class Estado(models.TextChoices):
         ABERTO = "ABERTO", "Aberto"
@@ -49,6 +76,7 @@ class BoletimPeriodoTIC(models.Model):
         choices=Estado.choices,
         default=Estado.ABERTO,
     )
+    fechado_em = models.DateTimeField("Fechado em", null=True, blank=True, editable=False)
 
     # Autoavaliação do aluno (1 a 5) por período
     autoavaliacao_nivel = models.PositiveSmallIntegerField(
@@ -60,6 +88,22 @@ class BoletimPeriodoTIC(models.Model):
     # -----------------------------
     # Resultados calculados (somente consulta no admin)
     # -----------------------------
+    # Agregados cognitivos (mantidos incrementalmente a cada nota):
+    #   soma_ponderada = Σ (nota × peso), total_peso = Σ peso
+    soma_ponderada = models.DecimalField(
+        "Soma ponderada (Σ nota × peso)",
+        max_digits=14,
+        decimal_places=4,
+        default=Decimal("0"),
+    )
+
+    total_peso = models.DecimalField(
+        "Total de pesos (Σ peso)",
+        max_digits=10,
+        decimal_places=2,
+        default=Decimal("0"),
+    )
+
     media_cognitiva_100 = models.DecimalField(
         "Média cognitiva (0 a 100)",
         max_digits=6,
@@ -105,6 +149,10 @@ class BoletimPeriodoTIC(models.Model):
         blank=True,
     )
 
+    # Snapshot do último cálculo (avaliações com peso/nota, média e atitudes),
+    # usado pela página do boletim sem voltar a consultar notas e atitudes.
+    detalhe_calculo = models.JSONField("Detalhe do cálculo", default=dict, blank=True, editable=False)
+
     observacao = models.TextField(
         "Observação",
         null=True,
@@ -114,12 +162,16 @@ class BoletimPeriodoTIC(models.Model):
     criado_em = models.DateTimeField("Criado em", auto_now_add=True)
     atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
 
+    objects = BoletimPeriodoTICQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Boletim TIC (período)"
         verbose_name_plural = "Boletins TIC (períodos)"
         unique_together = [("turma", "aluno", "periodo")]
         indexes = [
-            models.Index(fields=["turma", "periodo"]),
+            # estado no índice: "este período está fechado?" e os recálculos
+            # (só boletins ABERTO) resolvem-se sem ler a tabela.
+            models.Index(fields=["turma", "periodo", "estado"]),
             models.Index(fields=["aluno", "periodo"]),
         ]
         ordering = ["turma__nome", "periodo", "aluno__nome_completo"]
@@ -228,6 +280,9 @@ class AtitudesPeriodoTIC(models.Model):
         if total < Decimal("0.00") or total > Decimal("20.00"):
             raise ValidationError("A soma total de atitudes deve estar entre 0 e 20.")
 
+        if self.boletim_id and self.boletim.estado == BoletimPeriodoTIC.Estado.FECHADO:
+            raise ValidationError("O boletim está fechado: não são permitidas alterações.")
+
     def save(self, *args, **kwargs):
         self.full_clean()
         return super().save(*args, **kwargs)
@@ -282,6 +337,8 @@ class AvaliacaoCognitivaTIC(models.Model):
         if self.peso_percentual <= Decimal("0.00") or self.peso_percentual > Decimal("100.00"):
             raise ValidationError({"peso_percentual": "Peso deve estar entre 0 e 100 (excluindo 0)."})
 
+        _validar_periodo_aberto(self.turma_id, self.periodo)
+
 
     def __str__(self):
         return f"{self.turma} | {Periodo(self.periodo).label} | {self.nome} ({self.peso_percentual}%)"
@@ -329,7 +386,206 @@ class NotaAvaliacaoCognitivaTIC(models.Model):
             if aluno_turma_id is not None and aluno_turma_id != self.avaliacao.turma_id:
                 raise ValidationError("O aluno não pertence à turma desta avaliação.")
 
+        if self.avaliacao_id:
+            _validar_periodo_aberto(self.avaliacao.turma_id, self.avaliacao.periodo)
+
     def __str__(self):
         return f"{self.aluno} - {self.avaliacao} = {self.nota_0a100}"
 
 
+
+
+# -----------------------------
+# Boletim anual (P1 + P2 + P3)
+# -----------------------------
+class BoletimAnualTIC(models.Model):
+    """
+    Classificação anual do aluno na turma (a turma define o ano letivo).
+    Guarda a nota final de cada período e a combinação ponderada
+    (RegrasTIC.pesos_periodos) dos períodos já calculados.
+    Mantido incrementalmente sempre que um boletim de período muda.
+    """
+
+    turma = models.ForeignKey(
+        Turma,
+        on_delete=models.PROTECT,
+        related_name="boletins_anuais_tic",
+        verbose_name="Turma",
+    )
+    aluno = models.ForeignKey(
+        Aluno,
+        on_delete=models.PROTECT,
+        related_name="boletins_anuais_tic",
+        verbose_name="Aluno",
+    )
+
+    nota_p1 = models.DecimalField("Nota 1.º período", max_digits=6, decimal_places=2, null=True, blank=True)
+    nota_p2 = models.DecimalField("Nota 2.º período", max_digits=6, decimal_places=2, null=True, blank=True)
+    nota_p3 = models.DecimalField("Nota 3.º período", max_digits=6, decimal_places=2, null=True, blank=True)
+
+    nota_anual_100 = models.DecimalField(
+        "Nota anual (0 a 100)",
+        max_digits=6,
+        decimal_places=2,
+        null=True,
+        blank=True,
+    )
+    mencao_qualitativa = models.CharField("Menção qualitativa", max_length=20, null=True, blank=True)
+    nivel_sge = models.PositiveSmallIntegerField("Nível SGE (1 a 5)", null=True, blank=True)
+
+    criado_em = models.DateTimeField("Criado em", auto_now_add=True)
+    atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
+
+    class Meta:
+        verbose_name = "Boletim TIC (anual)"
+        verbose_name_plural = "Boletins TIC (anuais)"
+        unique_together = [("turma", "aluno")]
+        ordering = ["turma__nome", "aluno__nome_completo"]
+
+    def __str__(self) -> str:
+        return f"{self.turma} - Anual - {self.aluno}"
+
+
+# -----------------------------
+# Fila de recálculo (processada pelo comando tic_worker)
+# -----------------------------
+class RecalculoPendente(models.Model):
+    """
+    Boletim (turma, aluno, período) à espera de recálculo.
+    Uma linha por boletim: pedidos repetidos atualizam a mesma linha.
+    """
+
+    turma = models.ForeignKey(
+        Turma,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Turma",
+    )
+    aluno = models.ForeignKey(
+        Aluno,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Aluno",
+    )
+    periodo = models.PositiveSmallIntegerField("Período", choices=Periodo.choices)
+
+    primeiro_pedido_em = models.DateTimeField("Primeiro pedido em", default=timezone.now)
+    solicitado_em = models.DateTimeField("Último pedido em", default=timezone.now)
+    disponivel_em = models.DateTimeField("Disponível a partir de", default=timezone.now)
+
+    # Reserva do worker (claim); expira se o worker morrer a meio.
+    reservado_por = models.CharField("Reservado por", max_length=64, null=True, blank=True)
+    reservado_em = models.DateTimeField("Reservado em", null=True, blank=True)
+    tentativas = models.PositiveSmallIntegerField("Tentativas", default=0)
+
+    # Esgotou as tentativas: o worker deixa de o reservar até novo pedido.
+    falhou_em = models.DateTimeField("Falhou em", null=True, blank=True)
+    erro = models.TextField("Último erro", blank=True, default="")
+
+    class Meta:
+        verbose_name = "Recálculo pendente"
+        verbose_name_plural = "Recálculos pendentes"
+        unique_together = [("turma", "aluno", "periodo")]
+        indexes = [
+            models.Index(fields=["reservado_por", "disponivel_em"]),
+        ]
+        ordering = ["primeiro_pedido_em"]
+
+    def __str__(self) -> str:
+        return f"{self.turma_id}/{self.aluno_id}/{self.periodo} (desde {self.primeiro_pedido_em:%Y-%m-%d %H:%M:%S})"
+
+
+# -----------------------------
+# Estatísticas por turma/período (read model)
+# -----------------------------
+class EstatisticaTurmaPeriodoTIC(models.Model):
+    """
+    Resumo da nota final dos boletins de uma turma num período, mantido
+    incrementalmente (deltas) sempre que um boletim muda de resultado.
+    Os dashboards leem uma linha por turma em vez de varrer os boletins.
+
+    Só contam boletins já calculados (nota_final_100 preenchida).
+    As notas estão em CÊNTIMOS inteiros (ex.: 73.25 -> 7325), para os somatórios
+    serem exatos em qualquer base de dados.
+    """
+
+    turma = models.ForeignKey(
+        Turma,
+        on_delete=models.CASCADE,
+        related_name="estatisticas_tic",
+        verbose_name="Turma",
+    )
+    periodo = models.PositiveSmallIntegerField("Período", choices=Periodo.choices)
+
+    n = models.PositiveIntegerField("Boletins calculados", default=0)
+    soma_c = models.BigIntegerField("Σ nota final (cêntimos)", default=0)
+    soma_quadrados_c = models.BigIntegerField("Σ nota final² (cêntimos²)", default=0)
+
+    # {"<nota em cêntimos>": contagem} -> mínimo, máximo e mediana exatos
+    distribuicao_notas = models.JSONField("Distribuição das notas", default=dict)
+    # {"1": contagem, ..., "5": contagem}
+    histograma_nivel = models.JSONField("Boletins por nível SGE", default=dict)
+    # {"Insuficiente": contagem, ...}
+    histograma_mencao = models.JSONField("Boletins por menção", default=dict)
+
+    atualizado_em = models.DateTimeField("Atualizado em", auto_now=True)
+
+    class Meta:
+        verbose_name = "Estatística TIC (turma/período)"
+        verbose_name_plural = "Estatísticas TIC (turmas/períodos)"
+        unique_together = [("turma", "periodo")]
+        ordering = ["turma__nome", "periodo"]
+
+    # ---------- leituras derivadas (sem queries) ----------
+    @staticmethod
+    def _nota(centimos) -> Decimal:
+        return Decimal(int(centimos)).scaleb(-2)
+
+    def _notas_ordenadas(self) -> list[tuple[int, int]]:
+        return sorted((int(nota_c), contagem) for nota_c, contagem in self.distribuicao_notas.items())
+
+    @property
+    def media(self) -> Decimal | None:
+        if not self.n:
+            return None
+        return (Decimal(self.soma_c) / self.n).scaleb(-2).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+    @property
+    def desvio_padrao(self) -> Decimal | None:
+        """Desvio padrão populacional: sqrt(Σx²/n - (Σx/n)²)."""
+        if not self.n:
+            return None
+        variancia_c = (Decimal(self.soma_quadrados_c) * self.n - Decimal(self.soma_c) ** 2) / (self.n ** 2)
+        return max(variancia_c, Decimal("0")).sqrt().scaleb(-2).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+    @property
+    def minimo(self) -> Decimal | None:
+        notas = self._notas_ordenadas()
+        return self._nota(notas[0][0]) if notas else None
+
+    @property
+    def maximo(self) -> Decimal | None:
+        notas = self._notas_ordenadas()
+        return self._nota(notas[-1][0]) if notas else None
+
+    @property
+    def mediana(self) -> Decimal | None:
+        if not self.n:
+            return None
+
+        # posições (0-based) do(s) elemento(s) central(is)
+        alvos = sorted({(self.n - 1) // 2, self.n // 2})
+        valores = []
+        vistos = 0
+        for nota_c, contagem in self._notas_ordenadas():
+            vistos += contagem
+            while alvos and alvos[0] < vistos:
+                valores.append(nota_c)
+                alvos.pop(0)
+            if not alvos:
+                break
+
+        return (Decimal(sum(valores)) / len(valores)).scaleb(-2).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+    def __str__(self) -> str:
+        return f"{self.turma} - {Periodo(self.periodo).label} (n={self.n})"
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from apps.nucleo.models import Aluno
+from apps.tic.models import Periodo
+from apps.tic.services.cache_resultados import em_cache
+
+
+# -------------------------
+# Lista de alunos por turma (autocomplete do Admin)
+# -------------------------
+# O autocomplete pede a lista de uma turma a cada tecla; a lista (id, texto)
+# fica na cache "tic" (partilhada entre processos, services/cache_resultados.py)
+# na versão da turma. A lista não depende do período: usa a versão do 1.º,
+# que invalidar_turma() incrementa com as dos outros sempre que um aluno é
+# gravado, apagado ou importado (signals) ou a turma é arquivada. Mesmo que
+# uma entrada fique desatualizada, o formulário valida sempre o aluno
+# submetido contra a turma na base de dados.
+
+
+def opcoes_alunos_turma(turma_id: int) -> list[tuple[int, str]]:
+    """
+    [(aluno_id, texto do aluno)] da turma, por número e nome.
+    """
+    def construir() -> list[tuple[int, str]]:
+        return [
+            (aluno.pk, str(aluno))
+            for aluno in Aluno.objects.filter(turma_id=turma_id).order_by("numero", "nome_completo")
+        ]
+
+    return em_cache("alunos_turma", turma_id, Periodo.P1, construir)
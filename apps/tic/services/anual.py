@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from apps.nucleo.models import Turma
+from apps.tic.models import BoletimAnualTIC, BoletimPeriodoTIC
+from apps.tic.services.estatisticas import Alteracao
+from apps.tic.services.tic_rules import RegrasTIC, obter_regras, regras_da_turma
+
+
+# -------------------------
+# Classificação anual (P1 + P2 + P3)
+# -------------------------
+# O BoletimAnualTIC guarda a nota final de cada período (nota_p1..nota_p3).
+# Quando um boletim de período muda, só a coluna desse período é
+# substituída e a nota anual é re-derivada da própria linha, sem reler os
+# outros boletins do aluno.
+#
+#   nota anual = Σ (nota_p × peso_p) / Σ peso_p   (só períodos já calculados)
+
+CAMPOS_NOTA_PERIODO = {1: "nota_p1", 2: "nota_p2", 3: "nota_p3"}
+
+CAMPOS_ANUAL = (
+    "nota_p1",
+    "nota_p2",
+    "nota_p3",
+    "nota_anual_100",
+    "mencao_qualitativa",
+    "nivel_sge",
+    "atualizado_em",
+)
+
+
+def calcular_anual(
+    notas_periodos: Iterable[Decimal | None],
+    regras: RegrasTIC,
+) -> tuple[Decimal | None, str | None, int | None]:
+    """
+    (nota_anual_100, menção, nível) a partir das notas de P1, P2 e P3.
+    Sem nenhum período calculado (com peso > 0): (None, None, None).
+    """
+    pares = [
+        (Decimal(str(nota)), peso)
+        for nota, peso in zip(notas_periodos, regras.pesos_periodos)
+        if nota is not None and peso > 0
+    ]
+    if not pares:
+        return None, None, None
+
+    total_peso = sum((peso for _, peso in pares), Decimal("0"))
+    soma = sum((nota * peso for nota, peso in pares), Decimal("0"))
+    nota_anual = (soma / total_peso).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return nota_anual, regras.mencao(nota_anual), regras.nivel(nota_anual)
+
+
+def _derivar(anual: BoletimAnualTIC, regras: RegrasTIC) -> None:
+    anual.nota_anual_100, anual.mencao_qualitativa, anual.nivel_sge = calcular_anual(
+        (getattr(anual, campo) for campo in CAMPOS_NOTA_PERIODO.values()),
+        regras,
+    )
+
+
+def _filtro_pares(pares: Iterable[tuple[int, int]]) -> Q:
+    alunos_por_turma: dict[int, set[int]] = defaultdict(set)
+    for turma_id, aluno_id in pares:
+        alunos_por_turma[turma_id].add(aluno_id)
+
+    filtro = Q()
+    for turma_id, aluno_ids in alunos_por_turma.items():
+        filtro |= Q(turma_id=turma_id, aluno_id__in=aluno_ids)
+    return filtro
+
+
+# -------------------------
+# Atualização incremental
+# -------------------------
+@transaction.atomic
+def atualizar_anuais(alteracoes: Iterable[Alteracao]) -> int:
+    """
+    Aplica as alterações de boletins de período aos boletins anuais, com
+    3 queries por chamada. Retorna o número de boletins anuais atualizados.
+    """
+    novas_notas: dict[tuple[int, int], dict[int, Decimal | None]] = defaultdict(dict)
+    for turma_id, aluno_id, periodo, antes, depois in alteracoes:
+        if antes == depois:
+            continue
+        nota = Decimal(depois[0]).scaleb(-2) if depois is not None else None
+        novas_notas[(turma_id, aluno_id)][periodo] = nota
+
+    if not novas_notas:
+        return 0
+
+    # 1) garante as linhas; 2) bloqueia-as (com o contexto da turma); 3) grava.
+    BoletimAnualTIC.objects.bulk_create(
+        [BoletimAnualTIC(turma_id=turma_id, aluno_id=aluno_id) for turma_id, aluno_id in novas_notas],
+        ignore_conflicts=True,
+    )
+    anuais = list(
+        BoletimAnualTIC.objects
+        .select_for_update(of=("self",))
+        .select_related("turma")
+        .filter(_filtro_pares(novas_notas))
+    )
+
+    agora = timezone.now()
+    for anual in anuais:
+        for periodo, nota in novas_notas[(anual.turma_id, anual.aluno_id)].items():
+            setattr(anual, CAMPOS_NOTA_PERIODO[periodo], nota)
+        _derivar(anual, regras_da_turma(anual.turma))
+        anual.atualizado_em = agora  # bulk_update não aplica o auto_now
+
+    BoletimAnualTIC.objects.bulk_update(anuais, CAMPOS_ANUAL)
+    return len(anuais)
+
+
+# -------------------------
+# Caminho em massa (pauta anual)
+# -------------------------
+def _calcular_do_zero(turmas: QuerySet[Turma]) -> list[BoletimAnualTIC]:
+    """
+    Boletins anuais (não gravados) de todos os alunos com boletins de
+    período nas turmas dadas, a partir de uma única query.
+    """
+    linhas = (
+        BoletimPeriodoTIC.objects
+        .filter(turma__in=turmas)
+        .values_list("turma_id", "aluno_id", "periodo", "nota_final_100", "turma__tipo_contexto", "turma__ciclo")
+    )
+
+    anuais: dict[tuple[int, int], BoletimAnualTIC] = {}
+    contextos: dict[int, tuple[str, str]] = {}
+    for turma_id, aluno_id, periodo, nota, tipo_contexto, ciclo in linhas.iterator():
+        anual = anuais.get((turma_id, aluno_id))
+        if anual is None:
+            anual = anuais[(turma_id, aluno_id)] = BoletimAnualTIC(turma_id=turma_id, aluno_id=aluno_id)
+        setattr(anual, CAMPOS_NOTA_PERIODO[periodo], nota)
+        contextos[turma_id] = (tipo_contexto, ciclo)
+
+    for anual in anuais.values():
+        _derivar(anual, obter_regras(*contextos[anual.turma_id]))
+    return list(anuais.values())
+
+
+@transaction.atomic
+def recalcular_anuais(turmas: QuerySet[Turma] | None = None) -> int:
+    """
+    Reconstrói do zero os boletins anuais das turmas dadas (por omissão,
+    todas): uma leitura e um upsert em lotes, qualquer que seja o número
+    de alunos. Retorna o número de boletins anuais gravados.
+    """
+    if turmas is None:
+        turmas = Turma.objects.all()
+
+    anuais = _calcular_do_zero(turmas)
+    BoletimAnualTIC.objects.bulk_create(
+        anuais,
+        update_conflicts=True,
+        unique_fields=["turma", "aluno"],
+        update_fields=CAMPOS_ANUAL,
+        batch_size=500,
+    )
+    return len(anuais)
+
+
+def gerar_pauta_anual(ano_letivo_id: int | None = None, reconstruir: bool = False) -> QuerySet[BoletimAnualTIC]:
+    """
+    Pauta anual de toda a escola (ou de um ano letivo), ordenada por turma e
+    número do aluno. Os boletins anuais já estão atualizados (incremental);
+    reconstruir=True refaz-os antes, em massa.
+    """
+    turmas = Turma.objects.all()
+    if ano_letivo_id is not None:
+        turmas = turmas.filter(ano_letivo_id=ano_letivo_id)
+
+    if reconstruir:
+        recalcular_anuais(turmas)
+
+    return (
+        BoletimAnualTIC.objects
+        .filter(turma__in=turmas)
+        .select_related("turma__ano_letivo", "aluno")
+        .order_by("turma__nome", "aluno__numero", "aluno__nome_completo")
+    )
+
+
+def verificar_anuais(turmas: QuerySet[Turma] | None = None) -> list[tuple[int, int, str, object, object]]:
+    """
+    Compara os boletins anuais gravados com um cálculo do zero, sem gravar.
+    Retorna as divergências como (turma_id, aluno_id, campo, gravado, esperado).
+    """
+    if turmas is None:
+        turmas = Turma.objects.all()
+
+    gravados = {
+        (a.turma_id, a.aluno_id): a
+        for a in BoletimAnualTIC.objects.filter(turma__in=turmas)
+    }
+
+    divergencias = []
+    for esperado in _calcular_do_zero(turmas):
+        chave = (esperado.turma_id, esperado.aluno_id)
+        gravado = gravados.get(chave)
+        for campo in CAMPOS_ANUAL[:-1]:
+            valor_gravado = getattr(gravado, campo) if gravado is not None else None
+            valor_esperado = getattr(esperado, campo)
+            if valor_gravado != valor_esperado:
+                divergencias.append((*chave, campo, valor_gravado, valor_esperado))
+    return divergencias
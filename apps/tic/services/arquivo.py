@@ -0,0 +1,490 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+from typing import Iterator
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, Sum
+from django.db.models.functions import Cast, Round
+from django.utils import timezone
+
+try:  # dependência opcional (só para o arquivo de anos letivos)
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from apps.nucleo.models import AnoLetivo, Aluno, Turma
+from apps.tic.models import (
+    AtitudesPeriodoTIC,
+    AvaliacaoCognitivaTIC,
+    BoletimAnualTIC,
+    BoletimPeriodoTIC,
+    EstatisticaTurmaPeriodoTIC,
+    NotaAvaliacaoCognitivaTIC,
+    RecalculoPendente,
+)
+from apps.tic.services.cache_resultados import invalidar_turma
+from apps.tic.services.tic_calculator import CAMPOS_ATITUDES
+from apps.tic.signals import sinais_suspensos
+
+
+# -------------------------
+# Arquivo de anos letivos fechados (colunar, NumPy)
+# -------------------------
+# Um ano letivo terminado só é lido para histórico, mas as suas turmas,
+# alunos, notas e boletins continuam a pesar nas tabelas e índices da BD.
+# O arquivo guarda-o numa pasta própria, uma coluna por ficheiro .npy
+# (lido com mmap: só as páginas usadas vão para memória):
+#   <TIC_ARQUIVO_DIR>/2024-2025/
+#       manifesto.json            tabelas, linhas, dtype e sha256 de cada coluna
+#       boletins.nota_final_100.npy
+#       ...
+# Números inteiros e decimais (em cêntimos) são int64, com NULO para None;
+# textos são arrays unicode de largura fixa ("" = None nas colunas nulas).
+#
+# Ordem: escreve numa pasta temporária, confere o arquivo com a BD
+# (contagens e somas de controlo) e com os sha256, e só então apaga as
+# linhas do ano. O arquivo nunca é reescrito: se a remoção falhar, voltar
+# a correr o comando confere o arquivo existente e retoma a remoção.
+
+FORMATO = 1
+MANIFESTO = "manifesto.json"
+CHUNK = 2000
+
+INTEIRO = "inteiro"
+DECIMAL = "decimal"  # cêntimos (duas casas decimais)
+TEXTO = "texto"
+TEXTO_NULO = "texto_nulo"
+
+NULO = -(2**63)
+
+# tabela -> (modelo, caminho até ao ano letivo, ordenação, colunas (nome, caminho, tipo))
+TABELAS = {
+    "turmas": (
+        Turma,
+        "ano_letivo",
+        ("pk",),
+        (
+            ("id", "pk", INTEIRO),
+            ("nome", "nome", TEXTO),
+            ("tipo_contexto", "tipo_contexto", TEXTO),
+            ("ciclo", "ciclo", TEXTO),
+            ("ano_escolaridade", "ano_escolaridade", INTEIRO),
+        ),
+    ),
+    "alunos": (
+        Aluno,
+        "turma__ano_letivo",
+        ("pk",),
+        (
+            ("id", "pk", INTEIRO),
+            ("turma_id", "turma_id", INTEIRO),
+            ("numero", "numero", INTEIRO),
+            ("nome_completo", "nome_completo", TEXTO),
+        ),
+    ),
+    "avaliacoes": (
+        AvaliacaoCognitivaTIC,
+        "turma__ano_letivo",
+        ("pk",),
+        (
+            ("id", "pk", INTEIRO),
+            ("turma_id", "turma_id", INTEIRO),
+            ("periodo", "periodo", INTEIRO),
+            ("nome", "nome", TEXTO),
+            ("peso_percentual", "peso_percentual", DECIMAL),
+        ),
+    ),
+    "notas": (
+        NotaAvaliacaoCognitivaTIC,
+        "avaliacao__turma__ano_letivo",
+        ("avaliacao_id", "aluno_id"),
+        (
+            ("avaliacao_id", "avaliacao_id", INTEIRO),
+            ("aluno_id", "aluno_id", INTEIRO),
+            ("nota_0a100", "nota_0a100", DECIMAL),
+        ),
+    ),
+    # Mesma ordem da exportação de boletins (apps/tic/services/exportacao.py).
+    "boletins": (
+        BoletimPeriodoTIC,
+        "turma__ano_letivo",
+        ("turma__nome", "periodo", "aluno__numero", "aluno__nome_completo", "pk"),
+        (
+            ("id", "pk", INTEIRO),
+            ("turma_id", "turma_id", INTEIRO),
+            ("aluno_id", "aluno_id", INTEIRO),
+            ("periodo", "periodo", INTEIRO),
+            ("estado", "estado", TEXTO),
+            ("autoavaliacao_nivel", "autoavaliacao_nivel", INTEIRO),
+            ("media_cognitiva_100", "media_cognitiva_100", DECIMAL),
+            ("nota_cognitiva_80", "nota_cognitiva_80", DECIMAL),
+            ("nota_atitudes_20", "nota_atitudes_20", DECIMAL),
+            ("nota_final_100", "nota_final_100", DECIMAL),
+            ("mencao_qualitativa", "mencao_qualitativa", TEXTO_NULO),
+            ("nivel_sge", "nivel_sge", INTEIRO),
+            *((campo, f"atitudes__{campo}", DECIMAL) for campo in CAMPOS_ATITUDES),
+            ("observacao", "observacao", TEXTO_NULO),
+        ),
+    ),
+    "anuais": (
+        BoletimAnualTIC,
+        "turma__ano_letivo",
+        ("pk",),
+        (
+            ("turma_id", "turma_id", INTEIRO),
+            ("aluno_id", "aluno_id", INTEIRO),
+            ("nota_p1", "nota_p1", DECIMAL),
+            ("nota_p2", "nota_p2", DECIMAL),
+            ("nota_p3", "nota_p3", DECIMAL),
+            ("nota_anual_100", "nota_anual_100", DECIMAL),
+            ("mencao_qualitativa", "mencao_qualitativa", TEXTO_NULO),
+            ("nivel_sge", "nivel_sge", INTEIRO),
+        ),
+    ),
+}
+
+
+def numpy_disponivel() -> bool:
+    return np is not None
+
+
+def _exigir_numpy() -> None:
+    if np is None:
+        raise ImportError("O arquivo de anos letivos requer NumPy (pip install numpy).")
+
+
+def pasta_arquivo(ano_letivo: str, pasta_base: Path | str | None = None) -> Path:
+    base = Path(pasta_base or getattr(settings, "TIC_ARQUIVO_DIR", Path(settings.BASE_DIR) / "arquivo"))
+    return base / ano_letivo.replace("/", "-")
+
+
+def arquivado(ano_letivo: str, pasta_base: Path | str | None = None) -> bool:
+    return (pasta_arquivo(ano_letivo, pasta_base) / MANIFESTO).exists()
+
+
+def abrir_arquivo(ano_letivo: str, pasta_base: Path | str | None = None) -> ArquivoAnoLetivo:
+    return ArquivoAnoLetivo(pasta_arquivo(ano_letivo, pasta_base))
+
+
+# -------------------------
+# Conversão valor <-> coluna
+# -------------------------
+def _para_coluna(valores: list, tipo: str):
+    if tipo == INTEIRO:
+        return np.array([NULO if valor is None else valor for valor in valores], dtype=np.int64)
+    if tipo == DECIMAL:
+        return np.array([NULO if valor is None else int(valor.scaleb(2)) for valor in valores], dtype=np.int64)
+    return np.array(["" if valor is None else valor for valor in valores], dtype=str)
+
+
+def _valor(valor, tipo: str):
+    if tipo in (INTEIRO, DECIMAL):
+        valor = int(valor)
+        if valor == NULO:
+            return None
+        return Decimal(valor).scaleb(-2) if tipo == DECIMAL else valor
+    valor = str(valor)
+    return (valor or None) if tipo == TEXTO_NULO else valor
+
+
+def _sha256(coluna) -> str:
+    return hashlib.sha256(np.ascontiguousarray(coluna).tobytes()).hexdigest()
+
+
+# -------------------------
+# Controlo (contagens e somas, na BD e no arquivo)
+# -------------------------
+def _controlo_bd(ano: AnoLetivo) -> dict:
+    """
+    Linhas de cada tabela e soma (em cêntimos) de cada coluna decimal,
+    uma query por tabela.
+    """
+    linhas = {}
+    somas = {}
+    for tabela, (modelo, filtro, _, colunas) in TABELAS.items():
+        decimais = [(nome, caminho) for nome, caminho, tipo in colunas if tipo == DECIMAL]
+        agregados = modelo.objects.filter(**{filtro: ano}).aggregate(
+            _linhas=Count("pk"),
+            # Soma exata: cada valor passa a cêntimos inteiros antes de somar
+            # (no SQLite, a soma direta dos decimais é feita em vírgula flutuante).
+            **{nome: Sum(Cast(Round(F(caminho) * 100), IntegerField())) for nome, caminho in decimais},
+        )
+        linhas[tabela] = agregados["_linhas"]
+        for nome, _ in decimais:
+            somas[f"{tabela}.{nome}"] = agregados[nome] or 0
+    return {"linhas": linhas, "somas": somas}
+
+
+# -------------------------
+# Leitura (API de histórico)
+# -------------------------
+class ArquivoAnoLetivo:
+    """
+    Arquivo de um ano letivo. As colunas são abertas com mmap à medida que
+    são pedidas; nada é carregado no construtor além do manifesto.
+    """
+
+    def __init__(self, pasta: Path | str):
+        _exigir_numpy()
+        self.pasta = Path(pasta)
+        caminho = self.pasta / MANIFESTO
+        if not caminho.exists():
+            raise FileNotFoundError(f"Não existe arquivo em {self.pasta}.")
+        self.manifesto = json.loads(caminho.read_text(encoding="utf-8"))
+        if self.manifesto.get("formato") != FORMATO:
+            raise ValueError(f"Formato de arquivo não suportado: {self.manifesto.get('formato')!r}.")
+        self._colunas = {}
+
+    @property
+    def ano_letivo(self) -> str:
+        return self.manifesto["ano_letivo"]
+
+    def linhas(self, tabela: str) -> int:
+        return self.manifesto["tabelas"][tabela]["linhas"]
+
+    def _info(self, tabela: str, nome: str) -> dict:
+        return self.manifesto["tabelas"][tabela]["colunas"][nome]
+
+    def coluna(self, tabela: str, nome: str):
+        """
+        Array (só de leitura) da coluna. Inteiros/decimais: int64 com NULO.
+        """
+        chave = (tabela, nome)
+        if chave not in self._colunas:
+            caminho = self.pasta / self._info(tabela, nome)["ficheiro"]
+            # Um ficheiro sem dados não pode ser mapeado (mmap de 0 bytes).
+            mmap = "r" if self.linhas(tabela) else None
+            self._colunas[chave] = np.load(caminho, mmap_mode=mmap, allow_pickle=False)
+        return self._colunas[chave]
+
+    def verificar(self) -> list[str]:
+        """
+        Confere cada coluna com o manifesto (existência, linhas, dtype e
+        sha256). Retorna a lista de problemas (vazia = arquivo íntegro).
+        """
+        problemas = []
+        for tabela, dados in self.manifesto["tabelas"].items():
+            for nome, info in dados["colunas"].items():
+                try:
+                    coluna = self.coluna(tabela, nome)
+                except (OSError, ValueError) as exc:
+                    problemas.append(f"{tabela}.{nome}: {exc}")
+                    continue
+                if len(coluna) != dados["linhas"]:
+                    problemas.append(f"{tabela}.{nome}: {len(coluna)} linhas (esperadas {dados['linhas']}).")
+                elif coluna.dtype.str != info["dtype"] or _sha256(coluna) != info["sha256"]:
+                    problemas.append(f"{tabela}.{nome}: sha256 não confere.")
+        return problemas
+
+    def controlo(self) -> dict:
+        """
+        Mesmas contagens e somas de _controlo_bd(), calculadas no arquivo.
+        """
+        linhas = {tabela: self.linhas(tabela) for tabela in TABELAS}
+        somas = {}
+        for tabela, (_, _, _, colunas) in TABELAS.items():
+            for nome, _, tipo in colunas:
+                if tipo == DECIMAL:
+                    coluna = self.coluna(tabela, nome)
+                    somas[f"{tabela}.{nome}"] = int(coluna[coluna != NULO].sum())
+        return {"linhas": linhas, "somas": somas}
+
+    def tamanho_bytes(self) -> int:
+        return sum(caminho.stat().st_size for caminho in self.pasta.iterdir())
+
+    def boletins(
+        self,
+        turma_id: int | None = None,
+        periodo: int | None = None,
+        estado: str | None = None,
+    ) -> Iterator[tuple]:
+        """
+        Boletins arquivados, com as colunas e a ordem da exportação de
+        boletins (COLUNAS_EXPORTACAO): o histórico sai no mesmo formato que
+        os boletins ativos.
+        """
+        selecao = np.ones(self.linhas("boletins"), dtype=bool)
+        if turma_id:
+            selecao &= self.coluna("boletins", "turma_id") == turma_id
+        if periodo:
+            selecao &= self.coluna("boletins", "periodo") == periodo
+        if estado:
+            selecao &= self.coluna("boletins", "estado") == estado
+        indices = np.flatnonzero(selecao)
+
+        # id -> posição nas tabelas de turmas e alunos (guardadas por id).
+        turmas = np.searchsorted(self.coluna("turmas", "id"), self.coluna("boletins", "turma_id")[indices])
+        alunos = np.searchsorted(self.coluna("alunos", "id"), self.coluna("boletins", "aluno_id")[indices])
+
+        campos = (
+            ("turmas", "nome"),
+            ("alunos", "numero"),
+            ("alunos", "nome_completo"),
+            ("boletins", "periodo"),
+            ("boletins", "estado"),
+            ("boletins", "media_cognitiva_100"),
+            ("boletins", "nota_cognitiva_80"),
+            ("boletins", "nota_atitudes_20"),
+            ("boletins", "nota_final_100"),
+            ("boletins", "mencao_qualitativa"),
+            ("boletins", "nivel_sge"),
+        )
+        posicoes = {"turmas": turmas, "alunos": alunos, "boletins": indices}
+        tipos = [self._info(tabela, nome)["tipo"] for tabela, nome in campos]
+
+        # Lê as colunas em blocos de CHUNK boletins (memória constante).
+        for inicio in range(0, len(indices), CHUNK):
+            bloco = slice(inicio, inicio + CHUNK)
+            valores = [self.coluna(tabela, nome)[posicoes[tabela][bloco]] for tabela, nome in campos]
+            for linha in zip(*valores):
+                yield (self.ano_letivo, *map(_valor, linha, tipos))
+
+
+# -------------------------
+# Escrita / remoção
+# -------------------------
+@dataclass
+class ResultadoArquivo:
+    ano_letivo: str
+    pasta: Path
+    linhas: dict[str, int]
+    tamanho_bytes: int
+    apagadas: int = 0
+    retomado: bool = False
+
+
+def _validar_ano_fechado(ano: AnoLetivo) -> None:
+    if ano.data_fim and ano.data_fim >= timezone.localdate():
+        raise ValueError(f"O ano letivo {ano} ainda não terminou (data de fim: {ano.data_fim:%d/%m/%Y}).")
+    if BoletimPeriodoTIC.objects.filter(turma__ano_letivo=ano, estado=BoletimPeriodoTIC.Estado.ABERTO).exists():
+        raise ValueError(f"O ano letivo {ano} tem boletins abertos: feche os períodos antes de arquivar.")
+    if RecalculoPendente.objects.filter(turma__ano_letivo=ano).exists():
+        raise ValueError(f"O ano letivo {ano} tem recálculos pendentes: corra o tic_worker antes de arquivar.")
+
+
+def _escrever_tabela(pasta: Path, tabela: str, ano: AnoLetivo) -> dict:
+    modelo, filtro, ordenacao, colunas = TABELAS[tabela]
+    qs = modelo.objects.filter(**{filtro: ano}).order_by(*ordenacao).values_list(*(caminho for _, caminho, _ in colunas))
+
+    valores = [[] for _ in colunas]
+    for linha in qs.iterator(chunk_size=CHUNK):
+        for lista, valor in zip(valores, linha):
+            lista.append(valor)
+
+    dados = {"linhas": len(valores[0]), "colunas": {}}
+    for (nome, _, tipo), lista in zip(colunas, valores):
+        coluna = _para_coluna(lista, tipo)
+        ficheiro = f"{tabela}.{nome}.npy"
+        np.save(pasta / ficheiro, coluna, allow_pickle=False)
+        dados["colunas"][nome] = {
+            "ficheiro": ficheiro,
+            "tipo": tipo,
+            "dtype": coluna.dtype.str,
+            "sha256": _sha256(coluna),
+        }
+    return dados
+
+
+def _escrever_arquivo(ano: AnoLetivo, pasta: Path, controlo: dict) -> None:
+    """
+    Escreve numa pasta temporária e só a renomeia no fim: uma pasta com
+    manifesto é sempre um arquivo completo.
+    """
+    temporaria = pasta.with_name(pasta.name + ".parcial")
+    if temporaria.exists():
+        shutil.rmtree(temporaria)  # resto de uma execução interrompida
+    temporaria.mkdir(parents=True)
+
+    manifesto = {
+        "formato": FORMATO,
+        "ano_letivo": ano.nome,
+        "criado_em": timezone.now().isoformat(),
+        "tabelas": {tabela: _escrever_tabela(temporaria, tabela, ano) for tabela in TABELAS},
+        "controlo": controlo,
+    }
+    (temporaria / MANIFESTO).write_text(json.dumps(manifesto, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    for caminho in temporaria.iterdir():
+        os.chmod(caminho, 0o444)
+    temporaria.rename(pasta)
+
+
+def _apagar_ano_letivo(ano: AnoLetivo) -> int:
+    """
+    Apaga as linhas arquivadas, turma a turma (a memória do Collector do
+    Django fica limitada a uma turma). Os receivers de recálculo e dos
+    agregados ficam suspensos: os agregados do ano são apagados também.
+    """
+    apagadas = 0
+    turma_ids = list(Turma.objects.filter(ano_letivo=ano).values_list("pk", flat=True))
+    with sinais_suspensos():
+        for turma_id in turma_ids:
+            for qs in (
+                RecalculoPendente.objects.filter(turma_id=turma_id),
+                EstatisticaTurmaPeriodoTIC.objects.filter(turma_id=turma_id),
+                BoletimAnualTIC.objects.filter(turma_id=turma_id),
+                NotaAvaliacaoCognitivaTIC.objects.filter(avaliacao__turma_id=turma_id),
+                AtitudesPeriodoTIC.objects.filter(boletim__turma_id=turma_id),
+                BoletimPeriodoTIC.objects.filter(turma_id=turma_id),
+                AvaliacaoCognitivaTIC.objects.filter(turma_id=turma_id),
+                Aluno.objects.filter(turma_id=turma_id),
+                Turma.objects.filter(pk=turma_id),
+            ):
+                apagadas += qs.delete()[0]
+    invalidar_turma(*turma_ids)  # os ids podem voltar a ser usados (SQLite)
+    return apagadas
+
+
+@transaction.atomic
+def arquivar_ano_letivo(
+    ano_letivo: str,
+    pasta_base: Path | str | None = None,
+    apagar: bool = True,
+) -> ResultadoArquivo:
+    """
+    Arquiva o ano letivo (fechado) e, com apagar=True, remove as suas linhas
+    da BD depois de conferir o arquivo. Se o arquivo já existir, não é
+    reescrito: é conferido com a BD e a remoção é retomada.
+    Erros de validação: ValueError.
+    """
+    _exigir_numpy()
+    try:
+        ano = AnoLetivo.objects.get(nome=ano_letivo)
+    except AnoLetivo.DoesNotExist:
+        raise ValueError(f"Ano letivo inexistente: {ano_letivo}.") from None
+
+    _validar_ano_fechado(ano)
+    pasta = pasta_arquivo(ano.nome, pasta_base)
+    controlo = _controlo_bd(ano)
+    retomado = (pasta / MANIFESTO).exists()
+    ja_apagado = retomado and controlo["linhas"]["turmas"] == 0
+
+    if not retomado:
+        if controlo["linhas"]["turmas"] == 0:
+            raise ValueError(f"O ano letivo {ano} não tem turmas: nada para arquivar.")
+        _escrever_arquivo(ano, pasta, controlo)
+
+    arquivo = ArquivoAnoLetivo(pasta)
+    problemas = arquivo.verificar()
+    if not ja_apagado and arquivo.controlo() != controlo:
+        problemas.append("O arquivo não coincide com a base de dados (contagens ou somas de controlo).")
+    if problemas:
+        raise ValueError(f"Arquivo {pasta} inválido; nada foi apagado.\n" + "\n".join(problemas))
+
+    apagadas = _apagar_ano_letivo(ano) if apagar and not ja_apagado else 0
+    return ResultadoArquivo(
+        ano_letivo=ano.nome,
+        pasta=pasta,
+        linhas={tabela: arquivo.linhas(tabela) for tabela in TABELAS},
+        tamanho_bytes=arquivo.tamanho_bytes(),
+        apagadas=apagadas,
+        retomado=retomado,
+    )
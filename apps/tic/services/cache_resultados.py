@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Iterable, TypeVar
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from apps.tic.models import BoletimPeriodoTIC, Periodo
+
+
+# -------------------------
+# Cache de resultados (versão por turma/período)
+# -------------------------
+# Leituras repetidas (pauta, resultados e detalhe dos boletins) ficam na
+# cache "tic" (config/settings.py) com uma chave que inclui a versão da
+# turma/período. Qualquer alteração às entradas (notas, atitudes,
+# avaliações, alunos, fecho do período, recálculo) incrementa a versão:
+# as entradas antigas deixam de ser lidas e saem pelo TIMEOUT ou pelo
+# limite do backend (MAX_ENTRIES; a FileBasedCache descarta uma fração das
+# entradas ao acaso, um Redis com maxmemory-policy allkeys-lru pela ordem
+# LRU). Nunca é preciso apagar chaves uma a uma.
+#
+# Quem incrementa: os signals (apps/tic/signals.py), os serviços que gravam
+# com os signals suspensos (lançamento, importação, fecho, arquivo) e
+# propagar_alteracoes() (todos os recálculos que mudam um boletim).
+#
+# Dentro de uma transação a versão sobe logo (leituras na própria
+# transação) e outra vez no commit: uma leitura feita entretanto por outro
+# pedido, ainda com os dados antigos, fica numa versão que já não é usada.
+#
+# Se a própria versão sair da cache, recomeça num valor novo (relógio em
+# nanossegundos), nunca num valor já usado.
+#
+# As chaves das versões incluem um namespace, também guardado na cache e
+# renovado a cada migrate/flush (post_migrate, apps.py): uma cache que
+# sobreviva à base de dados (base recriada, ids de turmas reutilizados)
+# nunca devolve resultados da base anterior.
+#
+# Os contadores de acertos/falhas são do processo (estatisticas_cache()).
+#
+# A cache tem de ser partilhada entre processos (cache_partilhada()): com uma
+# LocMemCache, o incremento da versão feito no tic_worker não chegava aos
+# processos do servidor, que continuariam a servir resultados antigos.
+
+ALIAS = "tic"
+
+T = TypeVar("T")
+_AUSENTE = object()
+
+_contadores: Counter = Counter()
+_bloqueio = threading.Lock()
+
+
+def _cache():
+    return caches[ALIAS]
+
+
+def cache_partilhada() -> bool:
+    """
+    False se a cache "tic" for por processo (LocMemCache).
+    """
+    return not isinstance(_cache(), LocMemCache)
+
+
+_CHAVE_NAMESPACE = "tic:namespace"
+
+
+def _valor_persistente(cache, chave: str) -> int:
+    """
+    Valor da chave; se não existir, um valor novo (relógio em ns).
+    """
+    atual = cache.get(chave)
+    if atual is None:
+        cache.add(chave, time.time_ns(), None)
+        atual = cache.get(chave)
+    return atual
+
+
+def renovar_namespace(**kwargs) -> None:
+    """
+    Base de dados criada, migrada ou esvaziada: nenhuma versão anterior
+    volta a ser lida. Receiver de post_migrate (apps.py).
+    """
+    _cache().set(_CHAVE_NAMESPACE, time.time_ns(), None)
+
+
+def _chave_versao(namespace: int, turma_id: int, periodo: int) -> str:
+    return f"tic:{namespace}:versao:{turma_id}:{periodo}"
+
+
+def versao(turma_id: int, periodo: int) -> int:
+    cache = _cache()
+    return _valor_persistente(cache, _chave_versao(_valor_persistente(cache, _CHAVE_NAMESPACE), turma_id, periodo))
+
+
+def _incrementar(pares: set[tuple[int, int]]) -> None:
+    cache = _cache()
+    namespace = _valor_persistente(cache, _CHAVE_NAMESPACE)
+    for turma_id, periodo in pares:
+        try:
+            cache.incr(_chave_versao(namespace, turma_id, periodo))
+        except ValueError:  # versão ausente: a próxima leitura cria uma nova
+            pass
+
+
+def invalidar_resultados(pares: Iterable[tuple[int, int]]) -> None:
+    """
+    Incrementa a versão de cada (turma_id, periodo) (e de novo no commit).
+    """
+    pares = set(pares)
+    if not pares:
+        return
+    _incrementar(pares)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _incrementar(pares))
+
+
+def invalidar_turma(*turma_ids: int) -> None:
+    """
+    Todos os períodos das turmas (ex.: alunos alterados).
+    """
+    invalidar_resultados(
+        (turma_id, periodo) for turma_id in turma_ids if turma_id is not None for periodo in Periodo.values
+    )
+
+
+def em_cache(tipo: str, turma_id: int, periodo: int, calcular: Callable[[], T]) -> T:
+    """
+    Valor de `tipo` para a turma/período na versão atual; calcula-o e
+    guarda-o se não estiver em cache.
+    """
+    cache = _cache()
+    chave = f"tic:{tipo}:{turma_id}:{periodo}:{versao(turma_id, periodo)}"
+    valor = cache.get(chave, _AUSENTE)
+    with _bloqueio:
+        _contadores[(tipo, valor is not _AUSENTE)] += 1
+    if valor is _AUSENTE:
+        valor = calcular()
+        cache.set(chave, valor)
+    return valor
+
+
+def estatisticas_cache() -> dict[str, dict[str, int]]:
+    """
+    {tipo: {"acertos", "falhas"}} deste processo.
+    """
+    with _bloqueio:
+        tipos = sorted({tipo for tipo, _ in _contadores})
+        return {
+            tipo: {"acertos": _contadores[(tipo, True)], "falhas": _contadores[(tipo, False)]}
+            for tipo in tipos
+        }
+
+
+def repor_estatisticas_cache() -> None:
+    with _bloqueio:
+        _contadores.clear()
+
+
+# -------------------------
+# Resultados e detalhe dos boletins de uma turma/período
+# -------------------------
+@dataclass(frozen=True)
+class ResultadoBoletim:
+    aluno_id: int
+    numero: int | None
+    nome_completo: str
+    estado: str
+    media_cognitiva_100: Decimal | None
+    nota_cognitiva_80: Decimal | None
+    nota_atitudes_20: Decimal | None
+    nota_final_100: Decimal | None
+    mencao_qualitativa: str
+    nivel_sge: int | None
+    detalhe: dict
+
+
+def _ler_resultados(turma_id: int, periodo: int) -> tuple[ResultadoBoletim, ...]:
+    return tuple(
+        ResultadoBoletim(*linha[:-1], detalhe=linha[-1] or {})
+        for linha in (
+            BoletimPeriodoTIC.objects
+            .filter(turma_id=turma_id, periodo=periodo)
+            .order_by("aluno__numero", "aluno__nome_completo", "aluno_id")
+            .values_list(
+                "aluno_id",
+                "aluno__numero",
+                "aluno__nome_completo",
+                "estado",
+                "media_cognitiva_100",
+                "nota_cognitiva_80",
+                "nota_atitudes_20",
+                "nota_final_100",
+                "mencao_qualitativa",
+                "nivel_sge",
+                "detalhe_calculo",
+            )
+        )
+    )
+
+
+def resultados_periodo(turma_id: int, periodo: int) -> tuple[ResultadoBoletim, ...]:
+    """
+    Campos gravados e detalhe (detalhe_calculo) dos boletins da
+    turma/período, por número e nome do aluno.
+    """
+    return em_cache("resultados", turma_id, periodo, lambda: _ler_resultados(turma_id, periodo))
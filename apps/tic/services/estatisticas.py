@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+
+from apps.tic.models import BoletimPeriodoTIC, EstatisticaTurmaPeriodoTIC
+
+
+# -------------------------
+# Estatísticas por turma/período (atualização incremental)
+# -------------------------
+# Cada caminho que grava resultados de boletins (recalcular_boletim,
+# recalcular_boletins, motor vetorizado, delta de nota) regista aqui o
+# resumo ANTES e DEPOIS de cada boletim alterado:
+#     resumo = (nota_final em cêntimos, nível SGE, menção) ou None
+# e a linha EstatisticaTurmaPeriodoTIC da turma/período é ajustada pela
+# diferença (n, Σx, Σx², distribuição e histogramas), sem reler os boletins.
+
+Resumo = tuple[int, int, str]
+Alteracao = tuple[int, int, int, Resumo | None, Resumo | None]  # turma, aluno, período, antes, depois
+
+CAMPOS_RESUMO = ("nota_final_100", "nivel_sge", "mencao_qualitativa")
+
+CAMPOS_ESTATISTICA = (
+    "n",
+    "soma_c",
+    "soma_quadrados_c",
+    "distribuicao_notas",
+    "histograma_nivel",
+    "histograma_mencao",
+    "atualizado_em",
+)
+
+
+def resumo_boletim(boletim: BoletimPeriodoTIC) -> Resumo | None:
+    """
+    Resumo estatístico do boletim; None se ainda não foi calculado.
+    """
+    return resumo_de_valores(boletim.nota_final_100, boletim.nivel_sge, boletim.mencao_qualitativa)
+
+
+def resumo_de_valores(nota_final_100, nivel_sge, mencao_qualitativa) -> Resumo | None:
+    if nota_final_100 is None:
+        return None
+    return int(Decimal(str(nota_final_100)).scaleb(2)), int(nivel_sge), mencao_qualitativa
+
+
+class _Delta:
+    __slots__ = ("n", "soma_c", "soma_quadrados_c", "notas", "niveis", "mencoes")
+
+    def __init__(self):
+        self.n = 0
+        self.soma_c = 0
+        self.soma_quadrados_c = 0
+        self.notas: Counter = Counter()
+        self.niveis: Counter = Counter()
+        self.mencoes: Counter = Counter()
+
+    def adicionar(self, resumo: Resumo | None, sinal: int) -> None:
+        if resumo is None:
+            return
+        nota_c, nivel, mencao = resumo
+        self.n += sinal
+        self.soma_c += sinal * nota_c
+        self.soma_quadrados_c += sinal * nota_c * nota_c
+        self.notas[str(nota_c)] += sinal
+        self.niveis[str(nivel)] += sinal
+        self.mencoes[mencao] += sinal
+
+
+def _somar_histograma(histograma: dict, delta: Counter) -> dict:
+    resultado = dict(histograma)
+    for chave, valor in delta.items():
+        total = resultado.get(chave, 0) + valor
+        if total:
+            resultado[chave] = total
+        else:
+            resultado.pop(chave, None)
+    return resultado
+
+
+@transaction.atomic
+def registar_alteracoes(alteracoes: Iterable[Alteracao]) -> int:
+    """
+    alteracoes: (turma_id, aluno_id, periodo, resumo_antes, resumo_depois) por boletim.
+    Aplica os deltas com 3 queries por chamada, qualquer que seja o número
+    de boletins e de turmas. Retorna o número de turmas/períodos ajustados.
+    """
+    deltas: dict[tuple[int, int], _Delta] = defaultdict(_Delta)
+    for turma_id, _, periodo, antes, depois in alteracoes:
+        if antes == depois:
+            continue
+        delta = deltas[(turma_id, periodo)]
+        delta.adicionar(antes, -1)
+        delta.adicionar(depois, +1)
+
+    if not deltas:
+        return 0
+
+    # 1) garante as linhas; 2) bloqueia-as; 3) grava os novos totais.
+    EstatisticaTurmaPeriodoTIC.objects.bulk_create(
+        [EstatisticaTurmaPeriodoTIC(turma_id=turma_id, periodo=periodo) for turma_id, periodo in deltas],
+        ignore_conflicts=True,
+    )
+
+    filtro = Q()
+    for turma_id, periodo in deltas:
+        filtro |= Q(turma_id=turma_id, periodo=periodo)
+    linhas = list(EstatisticaTurmaPeriodoTIC.objects.select_for_update().filter(filtro))
+
+    agora = timezone.now()
+    for linha in linhas:
+        delta = deltas[(linha.turma_id, linha.periodo)]
+        linha.atualizado_em = agora  # bulk_update não aplica o auto_now
+        linha.n += delta.n
+        linha.soma_c += delta.soma_c
+        linha.soma_quadrados_c += delta.soma_quadrados_c
+        linha.distribuicao_notas = _somar_histograma(linha.distribuicao_notas, delta.notas)
+        linha.histograma_nivel = _somar_histograma(linha.histograma_nivel, delta.niveis)
+        linha.histograma_mencao = _somar_histograma(linha.histograma_mencao, delta.mencoes)
+
+    EstatisticaTurmaPeriodoTIC.objects.bulk_update(linhas, CAMPOS_ESTATISTICA)
+    return len(linhas)
+
+
+# -------------------------
+# Reconstrução completa (carga inicial / verificação)
+# -------------------------
+def _calcular_do_zero(boletins: QuerySet[BoletimPeriodoTIC] | None) -> dict[tuple[int, int], _Delta]:
+    """
+    Totais de TODOS os boletins das turmas/períodos abrangidos por `boletins`
+    (None = todos), lidos numa única passagem.
+    """
+    if boletins is None:
+        boletins = BoletimPeriodoTIC.objects.all()
+
+    ambitos = set(boletins.order_by().values_list("turma_id", "periodo").distinct())
+    totais: dict[tuple[int, int], _Delta] = {ambito: _Delta() for ambito in ambitos}
+
+    linhas = (
+        BoletimPeriodoTIC.objects
+        .filter(
+            turma_id__in={turma_id for turma_id, _ in ambitos},
+            periodo__in={periodo for _, periodo in ambitos},
+        )
+        .values_list("turma_id", "periodo", *CAMPOS_RESUMO)
+    )
+    for turma_id, periodo, *valores in linhas.iterator():
+        delta = totais.get((turma_id, periodo))
+        if delta is not None:
+            delta.adicionar(resumo_de_valores(*valores), +1)
+    return totais
+
+
+@transaction.atomic
+def reconstruir_estatisticas(boletins: QuerySet[BoletimPeriodoTIC] | None = None) -> int:
+    """
+    Recalcula do zero as estatísticas das turmas/períodos dos boletins dados
+    (por omissão, todos). Retorna o número de linhas gravadas.
+    """
+    linhas = [
+        EstatisticaTurmaPeriodoTIC(
+            turma_id=turma_id,
+            periodo=periodo,
+            n=total.n,
+            soma_c=total.soma_c,
+            soma_quadrados_c=total.soma_quadrados_c,
+            distribuicao_notas=dict(+total.notas),
+            histograma_nivel=dict(+total.niveis),
+            histograma_mencao=dict(+total.mencoes),
+        )
+        for (turma_id, periodo), total in _calcular_do_zero(boletins).items()
+    ]
+    EstatisticaTurmaPeriodoTIC.objects.bulk_create(
+        linhas,
+        update_conflicts=True,
+        unique_fields=["turma", "periodo"],
+        update_fields=CAMPOS_ESTATISTICA,
+    )
+    return len(linhas)
+
+
+def verificar_estatisticas(boletins: QuerySet[BoletimPeriodoTIC] | None = None) -> list[tuple[int, int, str]]:
+    """
+    Compara as linhas gravadas com um cálculo do zero, sem gravar nada.
+    Retorna as divergências como (turma_id, periodo, campo).
+    """
+    totais = _calcular_do_zero(boletins)
+    gravadas = {
+        (e.turma_id, e.periodo): e
+        for e in EstatisticaTurmaPeriodoTIC.objects.filter(
+            turma_id__in={turma_id for turma_id, _ in totais},
+            periodo__in={periodo for _, periodo in totais},
+        )
+    }
+
+    divergencias = []
+    for chave, esperado in totais.items():
+        linha = gravadas.get(chave)
+        if linha is None:
+            if esperado.n:
+                divergencias.append((*chave, "linha em falta"))
+            continue
+        comparacoes = {
+            "n": (linha.n, esperado.n),
+            "soma_c": (linha.soma_c, esperado.soma_c),
+            "soma_quadrados_c": (linha.soma_quadrados_c, esperado.soma_quadrados_c),
+            "distribuicao_notas": (linha.distribuicao_notas, dict(+esperado.notas)),
+            "histograma_nivel": (linha.histograma_nivel, dict(+esperado.niveis)),
+            "histograma_mencao": (linha.histograma_mencao, dict(+esperado.mencoes)),
+        }
+        divergencias.extend((*chave, campo) for campo, (a, b) in comparacoes.items() if a != b)
+    return divergencias
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import csv
+import json
+from decimal import Decimal
+from typing import Iterable, Iterator
+
+from django.db.models import QuerySet
+
+from apps.tic.models import BoletimPeriodoTIC
+from apps.tic.services import arquivo
+
+
+# -------------------------
+# Exportação de boletins (CSV / JSON) em streaming
+# -------------------------
+# Lê só as colunas exportadas (values_list, com as FKs num único JOIN) em
+# blocos de `chunk` linhas (.iterator) e produz o ficheiro aos bocados:
+# a memória não depende do número de boletins e o primeiro byte sai logo.
+# Um ano letivo arquivado (apps/tic/services/arquivo.py) é lido do arquivo,
+# com as mesmas colunas.
+
+CHUNK_PADRAO = 2000
+
+# (cabeçalho, caminho do campo)
+COLUNAS_EXPORTACAO = (
+    ("ano_letivo", "turma__ano_letivo__nome"),
+    ("turma", "turma__nome"),
+    ("numero", "aluno__numero"),
+    ("aluno", "aluno__nome_completo"),
+    ("periodo", "periodo"),
+    ("estado", "estado"),
+    ("media_cognitiva_100", "media_cognitiva_100"),
+    ("nota_cognitiva_80", "nota_cognitiva_80"),
+    ("nota_atitudes_20", "nota_atitudes_20"),
+    ("nota_final_100", "nota_final_100"),
+    ("mencao_qualitativa", "mencao_qualitativa"),
+    ("nivel_sge", "nivel_sge"),
+)
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+}
+
+
+def boletins_para_exportar(
+    ano_letivo: str | None = None,
+    turma_id: int | None = None,
+    periodo: int | None = None,
+    estado: str | None = None,
+) -> QuerySet:
+    """
+    values_list das COLUNAS_EXPORTACAO, por turma, período e número do aluno.
+    """
+    qs = BoletimPeriodoTIC.objects.all()
+    if ano_letivo:
+        qs = qs.filter(turma__ano_letivo__nome=ano_letivo)
+    if turma_id:
+        qs = qs.filter(turma_id=turma_id)
+    if periodo:
+        qs = qs.filter(periodo=periodo)
+    if estado:
+        qs = qs.filter(estado=estado)
+
+    return (
+        qs
+        .order_by("turma__ano_letivo__nome", "turma__nome", "periodo", "aluno__numero", "aluno__nome_completo", "pk")
+        .values_list(*(campo for _, campo in COLUNAS_EXPORTACAO))
+    )
+
+
+class _Eco:
+    """
+    "Ficheiro" que devolve o que lhe escrevem (para o csv.writer em streaming).
+    """
+
+    def write(self, valor: str) -> str:
+        return valor
+
+
+def _valor_json(valor):
+    return str(valor) if isinstance(valor, Decimal) else valor  # Decimal sem perder casas
+
+
+def _iterar(linhas: QuerySet | Iterable[tuple], chunk: int) -> Iterable[tuple]:
+    return linhas.iterator(chunk_size=chunk) if isinstance(linhas, QuerySet) else linhas
+
+
+def gerar_csv(linhas: QuerySet | Iterable[tuple], chunk: int = CHUNK_PADRAO) -> Iterator[str]:
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow([cabecalho for cabecalho, _ in COLUNAS_EXPORTACAO])
+    for linha in _iterar(linhas, chunk):
+        yield escritor.writerow(linha)
+
+
+def gerar_json(linhas: QuerySet | Iterable[tuple], chunk: int = CHUNK_PADRAO) -> Iterator[str]:
+    """
+    Um array JSON, um boletim (objeto) por linha.
+    """
+    cabecalhos = [cabecalho for cabecalho, _ in COLUNAS_EXPORTACAO]
+    separador = "[\n"
+    for linha in _iterar(linhas, chunk):
+        objeto = dict(zip(cabecalhos, map(_valor_json, linha)))
+        yield separador + json.dumps(objeto, ensure_ascii=False)
+        separador = ",\n"
+    yield "[]\n" if separador == "[\n" else "\n]\n"
+
+
+GERADORES = {
+    "csv": gerar_csv,
+    "json": gerar_json,
+}
+
+
+def exportar_boletins(formato: str, chunk: int = CHUNK_PADRAO, **filtros) -> Iterator[str]:
+    """
+    Texto do ficheiro exportado, aos bocados. filtros: ver boletins_para_exportar().
+    """
+    ano_letivo = filtros.get("ano_letivo")
+    if ano_letivo and arquivo.arquivado(ano_letivo):
+        linhas = arquivo.abrir_arquivo(ano_letivo).boletins(
+            turma_id=filtros.get("turma_id"),
+            periodo=filtros.get("periodo"),
+            estado=filtros.get("estado"),
+        )
+    else:
+        linhas = boletins_para_exportar(**filtros)
+    return GERADORES[formato](linhas, chunk=chunk)
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.nucleo.models import Aluno, Turma
+from apps.tic.models import BoletimPeriodoTIC, RecalculoPendente
+from apps.tic.services.cache_resultados import invalidar_resultados
+from apps.tic.services.recalculo_buffer import agendar_recalculo_turma
+from apps.tic.services.tic_calculator import garantir_boletins, recalcular_boletins
+
+
+# -------------------------
+# Fecho de período (congela os boletins)
+# -------------------------
+# Fechar um período de uma turma (ou de todas as turmas de um ano letivo),
+# numa só transação:
+#   1) cria os boletins em falta (todos os alunos da turma ficam com boletim)
+#   2) recalcula, turma a turma, os boletins ainda abertos: os campos
+#      gravados e o snapshot (detalhe_calculo) passam a ser o resultado
+#      congelado
+#   3) muda o estado para FECHADO num único UPDATE
+# A partir daí, os recálculos (signals, recalcular_tic, tic_worker, motores
+# em lote) ignoram os boletins FECHADO, os formulários recusam alterações
+# às notas/atitudes/avaliações do período, e as leituras desses boletins
+# usam só os campos gravados e o snapshot, sem ler as notas.
+
+
+@transaction.atomic
+def fechar_periodo(turmas: QuerySet[Turma], periodo: int) -> int:
+    """
+    Fecha o período nas turmas indicadas. Retorna o número de boletins
+    fechados (os que já estavam fechados não contam).
+    """
+    turma_ids = list(turmas.values_list("pk", flat=True))
+    garantir_boletins(
+        (turma_id, aluno_id, periodo)
+        for turma_id, aluno_id in Aluno.objects.filter(turma_id__in=turma_ids).values_list("turma_id", "pk")
+    )
+
+    for turma_id in turma_ids:
+        recalcular_boletins(BoletimPeriodoTIC.objects.filter(turma_id=turma_id, periodo=periodo))
+    RecalculoPendente.objects.filter(turma_id__in=turma_ids, periodo=periodo).delete()
+
+    agora = timezone.now()
+    fechados = (
+        BoletimPeriodoTIC.objects
+        .filter(turma_id__in=turma_ids, periodo=periodo)
+        .abertos()
+        .update(estado=BoletimPeriodoTIC.Estado.FECHADO, fechado_em=agora, atualizado_em=agora)
+    )
+    invalidar_resultados((turma_id, periodo) for turma_id in turma_ids)
+    return fechados
+
+
+@transaction.atomic
+def reabrir_periodo(turmas: QuerySet[Turma], periodo: int) -> int:
+    """
+    Volta a abrir o período nas turmas indicadas e agenda o recálculo de
+    cada turma/período. Retorna o número de boletins reabertos.
+    """
+    turma_ids = list(turmas.values_list("pk", flat=True))
+    reabertos = (
+        BoletimPeriodoTIC.objects
+        .filter(turma_id__in=turma_ids, periodo=periodo, estado=BoletimPeriodoTIC.Estado.FECHADO)
+        .update(estado=BoletimPeriodoTIC.Estado.ABERTO, fechado_em=None, atualizado_em=timezone.now())
+    )
+    invalidar_resultados((turma_id, periodo) for turma_id in turma_ids)
+    for turma_id in turma_ids:
+        agendar_recalculo_turma(turma_id=turma_id, periodo=periodo)
+    return reabertos
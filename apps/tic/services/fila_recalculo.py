@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import logging
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from typing import Iterable
+
+from django.db import OperationalError, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
+
+from apps.tic.models import BoletimPeriodoTIC, RecalculoPendente
+from apps.tic.services.tic_calculator import garantir_e_recalcular_boletins
+
+
+# -------------------------
+# Fila persistente de recálculo (sem broker externo)
+# -------------------------
+# Os signals inserem chaves (turma, aluno, período) na tabela
+# RecalculoPendente, na MESMA transação da alteração (se esta for revertida,
+# o pedido também é). O comando tic_worker reserva lotes de linhas com um
+# UPDATE atómico (claim), recalcula-os em lote e apaga as linhas.
+#
+# Se o lote falhar, os pedidos são repetidos um a um (um boletim com erro
+# não bloqueia os outros). Um pedido que falha volta à fila com backoff e,
+# ao fim de MAX_TENTATIVAS, fica marcado como falhado (falhou_em) e deixa
+# de ser reservado, até um novo pedido para o mesmo boletim.
+
+RESERVA_EXPIRA = timedelta(minutes=5)  # reserva de um worker que morreu
+ESPERA_MAXIMA = timedelta(minutes=10)  # teto do backoff entre tentativas
+MAX_TENTATIVAS = 10
+
+logger = logging.getLogger(__name__)
+
+
+def enfileirar(chaves: Iterable[tuple[int, int, int]]) -> int:
+    """
+    Insere (ou renova) os pedidos. Um pedido renovado volta a ficar livre,
+    mesmo que esteja reservado por um worker, para não se perder a alteração,
+    e com as tentativas a zero (mesmo que tivesse falhado).
+    """
+    agora = timezone.now()
+    objs = [
+        RecalculoPendente(
+            turma_id=turma_id,
+            aluno_id=aluno_id,
+            periodo=periodo,
+            primeiro_pedido_em=agora,
+            solicitado_em=agora,
+            disponivel_em=agora,
+        )
+        for turma_id, aluno_id, periodo in set(chaves)
+    ]
+    if not objs:
+        return 0
+
+    RecalculoPendente.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["turma", "aluno", "periodo"],
+        update_fields=[
+            "solicitado_em",
+            "disponivel_em",
+            "reservado_por",
+            "reservado_em",
+            "tentativas",
+            "falhou_em",
+            "erro",
+        ],
+    )
+    return len(objs)
+
+
+def enfileirar_turma(turma_id: int, periodo: int) -> int:
+    """
+    Enfileira todos os boletins existentes da turma no período.
+    """
+    aluno_ids = BoletimPeriodoTIC.objects.filter(turma_id=turma_id, periodo=periodo).values_list(
+        "aluno_id", flat=True
+    )
+    return enfileirar((turma_id, aluno_id, periodo) for aluno_id in aluno_ids)
+
+
+# -------------------------
+# Worker
+# -------------------------
+def com_retentativas(func, *args, tentativas: int = 6, espera_inicial: float = 0.05, **kwargs):
+    """
+    Repete func() com backoff exponencial enquanto o SQLite responder
+    "database is locked" (outro processo a escrever).
+    """
+    for n in range(tentativas):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as exc:
+            if "locked" not in str(exc).lower() or n == tentativas - 1:
+                raise
+            time.sleep(espera_inicial * (2 ** n))
+
+
+def novo_token() -> str:
+    return uuid.uuid4().hex
+
+
+def _livres(agora):
+    return RecalculoPendente.objects.filter(
+        Q(reservado_por__isnull=True) | Q(reservado_em__lt=agora - RESERVA_EXPIRA),
+        disponivel_em__lte=agora,
+        falhou_em__isnull=True,
+    )
+
+
+def reservar_lote(token: str, tamanho: int) -> list[tuple[int, int, int]]:
+    """
+    Reserva até `tamanho` pedidos livres (os mais antigos primeiro) com um
+    único UPDATE e retorna as suas chaves.
+    """
+    agora = timezone.now()
+    ids = _livres(agora).order_by("primeiro_pedido_em", "pk").values("pk")[:tamanho]
+    reservados = _livres(agora).filter(pk__in=ids).update(reservado_por=token, reservado_em=agora)
+    if not reservados:
+        return []
+    return list(
+        RecalculoPendente.objects.filter(reservado_por=token).values_list("turma_id", "aluno_id", "periodo")
+    )
+
+
+def processar_lote(token: str, tamanho: int = 200) -> int:
+    """
+    Reserva, recalcula (em lote) e remove um lote da fila.
+    Retorna o número de pedidos processados (0 = fila vazia), incluindo os
+    que falharam e voltaram à fila.
+    """
+    chaves = com_retentativas(reservar_lote, token, tamanho)
+    if not chaves:
+        return 0
+
+    try:
+        com_retentativas(_recalcular_e_concluir, token, chaves)
+    except Exception:
+        if len(chaves) == 1:
+            libertar_com_backoff(token, traceback.format_exc())
+            raise
+        logger.warning("Lote de %s pedidos falhou; a repetir um a um.", len(chaves), exc_info=True)
+        _processar_um_a_um(token, chaves)
+
+    return len(chaves)
+
+
+def _processar_um_a_um(token: str, chaves: list[tuple[int, int, int]]) -> None:
+    """
+    Cada pedido do lote passa a ter a sua própria reserva (token-i) e é
+    recalculado sozinho; os que falham voltam à fila com backoff.
+    """
+    for i, (turma_id, aluno_id, periodo) in enumerate(chaves):
+        token_pedido = f"{token}-{i}"
+        reservado = RecalculoPendente.objects.filter(
+            reservado_por=token, turma_id=turma_id, aluno_id=aluno_id, periodo=periodo
+        ).update(reservado_por=token_pedido)
+        if not reservado:
+            continue  # renovado entretanto: volta a ser reservado mais tarde
+        try:
+            com_retentativas(_recalcular_e_concluir, token_pedido, [(turma_id, aluno_id, periodo)])
+        except Exception:
+            logger.exception("Recálculo de %s/%s/%s falhou.", turma_id, aluno_id, periodo)
+            libertar_com_backoff(token_pedido, traceback.format_exc())
+
+
+@transaction.atomic
+def _recalcular_e_concluir(token: str, chaves: list[tuple[int, int, int]]) -> None:
+    garantir_e_recalcular_boletins(chaves)
+    # Pedidos renovados entretanto perderam a reserva e não são apagados.
+    RecalculoPendente.objects.filter(reservado_por=token).delete()
+
+
+def libertar_com_backoff(token: str, erro: str = "") -> None:
+    """
+    Devolve à fila os pedidos reservados por `token`, adiando a próxima
+    tentativa exponencialmente (1s, 2s, 4s, ... até ESPERA_MAXIMA). Na
+    tentativa MAX_TENTATIVAS o pedido fica marcado como falhado.
+    """
+    agora = timezone.now()
+    for pedido in RecalculoPendente.objects.filter(reservado_por=token).only("pk", "tentativas"):
+        espera = min(timedelta(seconds=2 ** pedido.tentativas), ESPERA_MAXIMA)
+        RecalculoPendente.objects.filter(pk=pedido.pk, reservado_por=token).update(
+            reservado_por=None,
+            reservado_em=None,
+            tentativas=F("tentativas") + 1,
+            disponivel_em=agora + espera,
+            falhou_em=agora if pedido.tentativas + 1 >= MAX_TENTATIVAS else None,
+            erro=erro,
+        )
+
+
+# -------------------------
+# Métricas
+# -------------------------
+def estado_fila() -> dict:
+    """
+    {"pendentes": N, "falhados": N, "mais_antigo": datetime|None, "atraso": timedelta|None}
+    O atraso é a idade do pedido pendente mais antigo (quão desatualizado
+    pode estar o boletim mais atrasado); os falhados não contam.
+    """
+    pendentes = RecalculoPendente.objects.filter(falhou_em__isnull=True)
+    dados = pendentes.aggregate(mais_antigo=Min("primeiro_pedido_em"))
+    mais_antigo = dados["mais_antigo"]
+    return {
+        "pendentes": pendentes.count(),
+        "falhados": RecalculoPendente.objects.filter(falhou_em__isnull=False).count(),
+        "mais_antigo": mais_antigo,
+        "atraso": (timezone.now() - mais_antigo) if mais_antigo else None,
+    }
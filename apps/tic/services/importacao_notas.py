@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import IO, Iterable
+
+from django.db import transaction
+
+from apps.nucleo.models import Aluno, Turma
+from apps.nucleo.utils import tabelas
+from apps.nucleo.utils.tabelas import Linhas, normalizar_coluna
+from apps.tic.models import AvaliacaoCognitivaTIC, NotaAvaliacaoCognitivaTIC
+from apps.tic.services.cache_resultados import invalidar_resultados
+from apps.tic.services.lancamento import exigir_periodo_aberto, ler_nota
+from apps.tic.services.recalculo_buffer import agendar_recalculo_turma
+from apps.tic.services.tic_calculator import garantir_boletins
+
+
+# -------------------------
+# Importação de notas de uma turma/período (CSV / XLSX)
+# -------------------------
+# Folha "larga", como a do professor: uma linha por aluno (coluna numero e/ou
+# nome_completo) e uma coluna por avaliação (nome da AvaliacaoCognitivaTIC).
+#   - alunos, avaliações e notas atuais da turma/período lidos uma vez
+#   - notas iguais às gravadas são ignoradas: reimportar o mesmo ficheiro
+#     não grava nada nem recalcula
+#   - upsert em blocos com bulk_create(update_conflicts), sem os signals
+#     por nota (bulk_create não os emite)
+#   - no fim, UM recálculo em lote da turma/período (após o commit, ou na fila)
+# Células vazias são ignoradas (não apagam notas).
+
+BLOCO_PADRAO = 1000
+COLUNAS_ALUNO = ("numero", "nome_completo")
+COLUNAS_NAO_AVALIACAO = {"numero", "nome_completo", "turma", "ano_letivo"}
+
+
+@dataclass
+class ResultadoImportacaoNotas:
+    lidas: int = 0
+    gravadas: int = 0
+    inalteradas: int = 0
+    erros: list[tuple[int, str]] = field(default_factory=list)  # (linha, mensagem)
+    colunas_ignoradas: list[str] = field(default_factory=list)
+
+
+def ler_ficheiro(ficheiro: IO[bytes], nome: str, encoding: str = "utf-8-sig") -> Linhas:
+    """
+    Linhas de um ficheiro de notas (.csv ou .xlsx), em streaming.
+    """
+    return tabelas.ler_ficheiro(ficheiro, nome, alguma_de=COLUNAS_ALUNO, encoding=encoding)
+
+
+class _Alunos:
+    """
+    Resolve a linha para um aluno da turma: pelo número, se preenchido;
+    senão pelo nome (sem distinguir maiúsculas).
+    """
+
+    def __init__(self, turma: Turma):
+        self.por_numero: dict[int, int] = {}
+        self.por_nome: dict[str, list[int]] = defaultdict(list)
+        for aluno_id, numero, nome in Aluno.objects.filter(turma=turma).values_list("pk", "numero", "nome_completo"):
+            if numero is not None:
+                self.por_numero[numero] = aluno_id
+            self.por_nome[nome.casefold()].append(aluno_id)
+
+    def resolver(self, linha: dict[str, str]) -> int:
+        numero = linha.get("numero", "")
+        if numero:
+            if not numero.isdigit() or int(numero) not in self.por_numero:
+                raise ValueError(f"Não há aluno com o número {numero} na turma.")
+            return self.por_numero[int(numero)]
+
+        nome = linha.get("nome_completo", "")
+        if not nome:
+            raise ValueError("Aluno não identificado (número e nome vazios).")
+        encontrados = self.por_nome.get(nome.casefold(), [])
+        if not encontrados:
+            raise ValueError(f"Não há aluno chamado {nome} na turma.")
+        if len(encontrados) > 1:
+            raise ValueError(f"Há {len(encontrados)} alunos chamados {nome}; use a coluna numero.")
+        return encontrados[0]
+
+
+@transaction.atomic
+def importar_notas(
+    turma: Turma,
+    periodo: int,
+    linhas: Iterable[tuple[int, dict[str, str]]],
+    bloco: int = BLOCO_PADRAO,
+    simular: bool = False,
+) -> ResultadoImportacaoNotas:
+    """
+    Importa as notas das linhas (ver ler_ficheiro) para as avaliações da
+    turma no período. simular=True valida e conta sem gravar.
+    Período fechado: ValueError.
+    """
+    exigir_periodo_aberto(turma.pk, periodo)
+    resultado = ResultadoImportacaoNotas()
+    avaliacoes = {
+        normalizar_coluna(avaliacao.nome): avaliacao.pk
+        for avaliacao in AvaliacaoCognitivaTIC.objects.filter(turma=turma, periodo=periodo)
+    }
+    alunos = _Alunos(turma)
+    atuais: dict[tuple[int, int], Decimal] = {
+        (avaliacao_id, aluno_id): nota
+        for avaliacao_id, aluno_id, nota in NotaAvaliacaoCognitivaTIC.objects
+        .filter(avaliacao__turma=turma, avaliacao__periodo=periodo)
+        .values_list("avaliacao_id", "aluno_id", "nota_0a100")
+    }
+
+    pendentes: dict[tuple[int, int], Decimal] = {}
+    com_notas_novas: set[int] = set()
+
+    def gravar_pendentes() -> None:
+        if pendentes and not simular:
+            NotaAvaliacaoCognitivaTIC.objects.bulk_create(
+                [
+                    NotaAvaliacaoCognitivaTIC(avaliacao_id=avaliacao_id, aluno_id=aluno_id, nota_0a100=nota)
+                    for (avaliacao_id, aluno_id), nota in pendentes.items()
+                ],
+                update_conflicts=True,
+                unique_fields=["avaliacao", "aluno"],
+                update_fields=["nota_0a100", "atualizado_em"],
+            )
+        resultado.gravadas += len(pendentes)
+        pendentes.clear()
+
+    colunas: dict[str, int] | None = None
+    for numero_linha, linha in linhas:
+        if colunas is None:
+            colunas = {c: avaliacoes[c] for c in linha if c in avaliacoes}
+            resultado.colunas_ignoradas = [
+                c for c in linha if c not in avaliacoes and c not in COLUNAS_NAO_AVALIACAO
+            ]
+
+        resultado.lidas += 1
+        try:
+            aluno_id = alunos.resolver(linha)
+        except ValueError as exc:
+            resultado.erros.append((numero_linha, str(exc)))
+            continue
+
+        for coluna, avaliacao_id in colunas.items():
+            try:
+                nota = ler_nota(linha[coluna])
+            except ValueError as exc:
+                resultado.erros.append((numero_linha, f"{coluna}: {exc}"))
+                continue
+            if nota is None:
+                continue
+
+            chave = (avaliacao_id, aluno_id)
+            if atuais.get(chave) == nota:
+                resultado.inalteradas += 1
+                continue
+            atuais[chave] = nota  # uma 2.ª linha do mesmo aluno compara com esta
+            pendentes[chave] = nota
+            com_notas_novas.add(aluno_id)
+
+        if len(pendentes) >= bloco:
+            gravar_pendentes()
+
+    gravar_pendentes()
+
+    if com_notas_novas and not simular:
+        garantir_boletins((turma.pk, aluno_id, periodo) for aluno_id in com_notas_novas)
+        invalidar_resultados([(turma.pk, periodo)])
+        agendar_recalculo_turma(turma_id=turma.pk, periodo=periodo)
+    return resultado
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from apps.nucleo.models import Turma
+from apps.tic.models import AtitudesPeriodoTIC, AvaliacaoCognitivaTIC, BoletimPeriodoTIC, NotaAvaliacaoCognitivaTIC, Periodo
+from apps.tic.services.cache_resultados import invalidar_resultados
+from apps.tic.services.recalculo_buffer import agendar_recalculo_turma
+from apps.tic.services.tic_calculator import CAMPOS_ATITUDES, garantir_boletins
+from apps.tic.signals import sinais_suspensos
+
+
+# -------------------------
+# Lançamento de notas em grelha (uma avaliação, toda a turma)
+# -------------------------
+# Em vez de um save() por nota (cada um com o seu delta no boletim), a
+# grelha grava todas as notas de uma vez:
+#   1) validação em memória (nada é gravado se alguma célula for inválida)
+#   2) upsert das notas alteradas num único bulk_create(update_conflicts)
+#   3) remoção das células apagadas num único DELETE
+#   4) UM recálculo em lote da turma/período (após o commit, ou na fila)
+# O número de queries não depende do número de alunos.
+
+NOTA_MAXIMA = Decimal("100.00")
+TOTAL_ATITUDES_MAXIMO = Decimal("20.00")
+CENTESIMA = Decimal("0.01")
+
+
+def exigir_periodo_aberto(turma_id: int, periodo: int) -> None:
+    """
+    Lançamentos em massa não passam pelo clean() dos modelos: recusa aqui
+    as alterações a um período fechado (ValueError).
+    """
+    if BoletimPeriodoTIC.objects.periodo_fechado(turma_id, periodo):
+        raise ValueError(f"O {Periodo(periodo).label} desta turma está fechado: não são permitidas alterações.")
+
+
+def _ler_decimal(texto: str | None, maximo: Decimal, fora_do_intervalo: str) -> Decimal | None:
+    """
+    Converte o texto de uma célula num valor de 0 a `maximo` com até duas
+    casas decimais (aceita vírgula decimal). Célula vazia: None.
+    Valor inválido: ValueError com a mensagem a mostrar.
+    """
+    texto = (texto or "").strip().replace(",", ".")
+    if not texto:
+        return None
+
+    try:
+        valor = Decimal(texto)
+    except InvalidOperation:
+        raise ValueError("Valor não numérico.") from None
+
+    if not valor.is_finite() or valor < 0 or valor > maximo:
+        raise ValueError(fora_do_intervalo)
+    if valor != valor.quantize(CENTESIMA):
+        raise ValueError("No máximo duas casas decimais.")
+    return valor.quantize(CENTESIMA)
+
+
+def ler_nota(texto: str | None) -> Decimal | None:
+    return _ler_decimal(texto, NOTA_MAXIMA, "A nota deve estar entre 0 e 100.")
+
+
+def validar_grelha(valores: dict[int, str | None]) -> tuple[dict[int, Decimal | None], dict[int, str]]:
+    """
+    valores: aluno_id -> texto da célula.
+    Retorna (notas, erros), ambos indexados por aluno_id.
+    """
+    notas: dict[int, Decimal | None] = {}
+    erros: dict[int, str] = {}
+    for aluno_id, texto in valores.items():
+        try:
+            notas[aluno_id] = ler_nota(texto)
+        except ValueError as exc:
+            erros[aluno_id] = str(exc)
+    return notas, erros
+
+
+@transaction.atomic
+def gravar_notas_avaliacao(
+    avaliacao: AvaliacaoCognitivaTIC,
+    notas: dict[int, Decimal | None],
+) -> tuple[int, int]:
+    """
+    notas: aluno_id -> nota (None apaga a nota existente). Os alunos têm de
+    pertencer à turma da avaliação (validado por quem chama).
+    Notas iguais às gravadas são ignoradas. Retorna (gravadas, apagadas).
+    """
+    exigir_periodo_aberto(avaliacao.turma_id, avaliacao.periodo)
+    existentes = dict(
+        NotaAvaliacaoCognitivaTIC.objects
+        .filter(avaliacao=avaliacao, aluno_id__in=notas)
+        .values_list("aluno_id", "nota_0a100")
+    )
+
+    a_gravar = [
+        NotaAvaliacaoCognitivaTIC(avaliacao=avaliacao, aluno_id=aluno_id, nota_0a100=nota)
+        for aluno_id, nota in notas.items()
+        if nota is not None and existentes.get(aluno_id) != nota
+    ]
+    a_apagar = [aluno_id for aluno_id, nota in notas.items() if nota is None and aluno_id in existentes]
+
+    if not a_gravar and not a_apagar:
+        return 0, 0
+
+    with sinais_suspensos():
+        if a_gravar:
+            NotaAvaliacaoCognitivaTIC.objects.bulk_create(
+                a_gravar,
+                update_conflicts=True,
+                unique_fields=["avaliacao", "aluno"],
+                update_fields=["nota_0a100", "atualizado_em"],
+            )
+        if a_apagar:
+            NotaAvaliacaoCognitivaTIC.objects.filter(avaliacao=avaliacao, aluno_id__in=a_apagar).delete()
+
+    # Alunos com nota nova podem ainda não ter boletim neste período.
+    garantir_boletins((avaliacao.turma_id, nota.aluno_id, avaliacao.periodo) for nota in a_gravar)
+    invalidar_resultados([(avaliacao.turma_id, avaliacao.periodo)])
+    agendar_recalculo_turma(turma_id=avaliacao.turma_id, periodo=avaliacao.periodo)
+    return len(a_gravar), len(a_apagar)
+
+
+# -------------------------
+# Lançamento de atitudes em grelha (uma turma/período)
+# -------------------------
+# Mesmo esquema da grelha de notas, para as 5 dimensões de atitudes:
+#   1) validação em memória contra os tetos das regras da turma (sem o
+#      full_clean() por linha do AtitudesPeriodoTIC.save())
+#   2) boletins em falta criados num único bulk_create
+#   3) upsert das atitudes alteradas num único bulk_create(update_conflicts)
+#   4) UM recálculo em lote da turma/período
+
+
+def ler_atitudes(textos: tuple[str | None, ...], tetos: tuple[Decimal, ...]) -> tuple[Decimal, ...] | None:
+    """
+    Textos das 5 dimensões (ordem de CAMPOS_ATITUDES). Todas vazias: None
+    (sem atitudes); uma dimensão vazia conta como 0.
+    """
+    valores = [
+        _ler_decimal(texto, teto, f"Valor deve estar entre 0 e {teto}.")
+        for texto, teto in zip(textos, tetos)
+    ]
+    if all(valor is None for valor in valores):
+        return None
+
+    valores = tuple(valor if valor is not None else Decimal("0.00") for valor in valores)
+    if sum(valores) > TOTAL_ATITUDES_MAXIMO:
+        raise ValueError("A soma total de atitudes deve estar entre 0 e 20.")
+    return valores
+
+
+def validar_grelha_atitudes(
+    valores: dict[int, tuple[str | None, ...]],
+    tetos: tuple[Decimal, ...],
+) -> tuple[dict[int, tuple[Decimal, ...] | None], dict[int, str]]:
+    """
+    valores: aluno_id -> textos das 5 dimensões.
+    Retorna (atitudes, erros), ambos indexados por aluno_id.
+    """
+    atitudes: dict[int, tuple[Decimal, ...] | None] = {}
+    erros: dict[int, str] = {}
+    for aluno_id, textos in valores.items():
+        try:
+            atitudes[aluno_id] = ler_atitudes(textos, tetos)
+        except ValueError as exc:
+            erros[aluno_id] = str(exc)
+    return atitudes, erros
+
+
+@transaction.atomic
+def gravar_atitudes_turma(
+    turma: Turma,
+    periodo: int,
+    atitudes: dict[int, tuple[Decimal, ...] | None],
+) -> tuple[int, int]:
+    """
+    atitudes: aluno_id -> 5 valores (None apaga as atitudes existentes). Os
+    alunos têm de pertencer à turma (validado por quem chama).
+    Valores iguais aos gravados são ignorados. Retorna (gravadas, apagadas).
+    """
+    exigir_periodo_aberto(turma.pk, periodo)
+    garantir_boletins((turma.pk, aluno_id, periodo) for aluno_id, valores in atitudes.items() if valores is not None)
+
+    # Boletim e atitudes atuais de cada aluno, numa só query (LEFT JOIN).
+    atuais = {
+        aluno_id: (boletim_id, atitudes_id, tuple(valores))
+        for aluno_id, boletim_id, atitudes_id, *valores in (
+            BoletimPeriodoTIC.objects
+            .filter(turma=turma, periodo=periodo, aluno_id__in=atitudes)
+            .values_list("aluno_id", "pk", "atitudes__pk", *(f"atitudes__{campo}" for campo in CAMPOS_ATITUDES))
+        )
+    }
+
+    a_gravar = []
+    a_apagar = []
+    for aluno_id, valores in atitudes.items():
+        if aluno_id not in atuais:
+            continue
+        boletim_id, atitudes_id, gravados = atuais[aluno_id]
+        if valores is None:
+            if atitudes_id is not None:
+                a_apagar.append(atitudes_id)
+        elif atitudes_id is None or gravados != valores:
+            a_gravar.append(AtitudesPeriodoTIC(boletim_id=boletim_id, **dict(zip(CAMPOS_ATITUDES, valores))))
+
+    if not a_gravar and not a_apagar:
+        return 0, 0
+
+    with sinais_suspensos():
+        if a_gravar:
+            AtitudesPeriodoTIC.objects.bulk_create(
+                a_gravar,
+                update_conflicts=True,
+                unique_fields=["boletim"],
+                update_fields=[*CAMPOS_ATITUDES, "atualizado_em"],
+            )
+        if a_apagar:
+            AtitudesPeriodoTIC.objects.filter(pk__in=a_apagar).delete()
+
+    invalidar_resultados([(turma.pk, periodo)])
+    agendar_recalculo_turma(turma_id=turma.pk, periodo=periodo)
+    return len(a_gravar), len(a_apagar)
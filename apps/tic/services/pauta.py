@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import csv
+import io
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Iterator
+
+from django.db.models import FilteredRelation, Max, Q
+from django.utils.html import escape
+
+try:  # dependência opcional (só para o formato .xlsx)
+    import openpyxl
+except ImportError:  # pragma: no cover
+    openpyxl = None
+
+from apps.nucleo.models import Aluno, Turma
+from apps.tic.models import AvaliacaoCognitivaTIC, BoletimPeriodoTIC, Periodo
+from apps.tic.services.cache_resultados import em_cache, resultados_periodo
+
+
+# -------------------------
+# Pauta de uma turma/período (alunos × avaliações)
+# -------------------------
+# Uma linha por aluno com a nota de cada avaliação (pesos no cabeçalho) e os
+# campos calculados do boletim. As notas são "pivotadas" numa única query
+# (MAX(nota) FILTER (avaliação = X) por coluna, com o boletim do período no
+# mesmo SELECT) para uma matriz compacta de tuplos.
+#
+# A matriz fica na cache de resultados (services/cache_resultados.py), na
+# versão da turma/período: qualquer alteração a alunos, avaliações, notas ou
+# boletins muda a versão. Uma pauta em cache não faz nenhuma query.
+#
+# Num período fechado (services/fecho.py) a pauta sai só dos boletins: as
+# notas vêm do snapshot congelado (detalhe_calculo), sem ler as notas nem
+# as avaliações. Avaliações sem nenhuma nota não aparecem nesse caso.
+
+CENTESIMA = Decimal("0.01")
+
+CAMPOS_BOLETIM = (
+    "media_cognitiva_100",
+    "nota_cognitiva_80",
+    "nota_atitudes_20",
+    "nota_final_100",
+    "mencao_qualitativa",
+    "nivel_sge",
+)
+CABECALHOS_BOLETIM = ("Média (0-100)", "Cognitivo (0-80)", "Atitudes (0-20)", "Final (0-100)", "Menção", "Nível")
+
+FORMATOS = {
+    "html": "text/html; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+@dataclass(frozen=True)
+class Pauta:
+    titulo: str
+    avaliacoes: tuple[tuple[str, Decimal], ...]  # (nome, peso)
+    linhas: tuple[tuple, ...]  # (número, nome, *notas, *CAMPOS_BOLETIM)
+
+    @property
+    def cabecalho(self) -> list[str]:
+        return [
+            "N.º",
+            "Aluno",
+            *(f"{nome} ({peso}%)" for nome, peso in self.avaliacoes),
+            *CABECALHOS_BOLETIM,
+        ]
+
+
+def _centesimas(valor: Decimal | None) -> Decimal | None:
+    return valor.quantize(CENTESIMA) if valor is not None else None
+
+
+def _construir(turma: Turma, periodo: int) -> Pauta:
+    avaliacoes = list(
+        AvaliacaoCognitivaTIC.objects
+        .filter(turma=turma, periodo=periodo)
+        .order_by("nome")
+        .values_list("pk", "nome", "peso_percentual")
+    )
+
+    colunas_notas = {
+        f"nota_{i}": Max(
+            "notas_avaliacoes_tic__nota_0a100",
+            filter=Q(notas_avaliacoes_tic__avaliacao_id=avaliacao_id),
+        )
+        for i, (avaliacao_id, _, _) in enumerate(avaliacoes)
+    }
+    linhas = (
+        Aluno.objects
+        .filter(turma=turma)
+        .annotate(
+            boletim=FilteredRelation(
+                "boletins_tic",
+                condition=Q(boletins_tic__turma=turma, boletins_tic__periodo=periodo),
+            )
+        )
+        .values("pk", "numero", "nome_completo", *(f"boletim__{campo}" for campo in CAMPOS_BOLETIM))
+        .annotate(**colunas_notas)
+        .order_by("numero", "nome_completo", "pk")
+        .values_list(
+            "numero",
+            "nome_completo",
+            *colunas_notas,
+            *(f"boletim__{campo}" for campo in CAMPOS_BOLETIM),
+        )
+    )
+
+    # No SQLite, o MAX() de um decimal vem como float: repõe as 2 casas decimais.
+    n = len(avaliacoes)
+    return Pauta(
+        titulo=f"Pauta TIC | {turma} | {Periodo(periodo).label}",
+        avaliacoes=tuple((nome, peso) for _, nome, peso in avaliacoes),
+        linhas=tuple(
+            (numero, nome, *(_centesimas(nota) for nota in resto[:n]), *resto[n:])
+            for numero, nome, *resto in linhas
+        ),
+    )
+
+
+def _construir_fechada(turma: Turma, periodo: int) -> Pauta:
+    pesos: dict[str, Decimal] = {}
+    lidas = []
+    for resultado in resultados_periodo(turma.pk, periodo):
+        notas = {}
+        for avaliacao, peso, nota in resultado.detalhe.get("avaliacoes", ()):
+            pesos[avaliacao] = Decimal(peso)
+            notas[avaliacao] = Decimal(nota)
+        campos = [getattr(resultado, campo) for campo in CAMPOS_BOLETIM]
+        lidas.append((resultado.numero, resultado.nome_completo, notas, campos))
+
+    nomes = sorted(pesos)
+    return Pauta(
+        titulo=f"Pauta TIC | {turma} | {Periodo(periodo).label}",
+        avaliacoes=tuple((nome, pesos[nome]) for nome in nomes),
+        linhas=tuple(
+            (numero, nome, *(notas.get(avaliacao) for avaliacao in nomes), *campos)
+            for numero, nome, notas, campos in lidas
+        ),
+    )
+
+
+def construir_pauta(turma: Turma, periodo: int) -> Pauta:
+    """
+    Pauta da turma/período, em cache enquanto as entradas não mudarem.
+    """
+    def construir() -> Pauta:
+        fechado = BoletimPeriodoTIC.objects.periodo_fechado(turma.pk, periodo)
+        return (_construir_fechada if fechado else _construir)(turma, periodo)
+
+    return em_cache("pauta", turma.pk, periodo, construir)
+
+
+# -------------------------
+# Saída (streaming)
+# -------------------------
+def _texto(valor) -> str:
+    return "" if valor is None else str(valor)
+
+
+class _Eco:
+    def write(self, valor: str) -> str:
+        return valor
+
+
+def gerar_csv(pauta: Pauta) -> Iterator[str]:
+    escritor = csv.writer(_Eco())
+    yield escritor.writerow(pauta.cabecalho)
+    for linha in pauta.linhas:
+        yield escritor.writerow([_texto(valor) for valor in linha])
+
+
+def gerar_html(pauta: Pauta) -> Iterator[str]:
+    titulo = escape(pauta.titulo)
+    yield (
+        f'<!DOCTYPE html>\n<html lang="pt"><head><meta charset="utf-8"><title>{titulo}</title>'
+        "<style>table{border-collapse:collapse}th,td{border:1px solid #999;padding:2px 6px}"
+        "td.n{text-align:right}</style></head><body>\n"
+        f"<h1>{titulo}</h1>\n<table>\n<tr>"
+        + "".join(f"<th>{escape(c)}</th>" for c in pauta.cabecalho)
+        + "</tr>\n"
+    )
+    for numero, nome, *valores in pauta.linhas:
+        yield (
+            f'<tr><td class="n">{_texto(numero)}</td><td>{escape(nome)}</td>'
+            + "".join(f'<td class="n">{escape(_texto(v))}</td>' for v in valores)
+            + "</tr>\n"
+        )
+    yield "</table>\n</body></html>\n"
+
+
+def gerar_xlsx(pauta: Pauta, bloco: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Livro .xlsx (openpyxl em modo write_only), enviado em blocos de bytes.
+    """
+    if openpyxl is None:
+        raise ImportError("O formato .xlsx requer openpyxl (pip install openpyxl).")
+    livro = openpyxl.Workbook(write_only=True)
+    folha = livro.create_sheet(title="Pauta")
+    folha.append([pauta.titulo])
+    folha.append(pauta.cabecalho)
+    for linha in pauta.linhas:
+        folha.append(list(linha))
+
+    saida = io.BytesIO()
+    livro.save(saida)
+    saida.seek(0)
+    while parte := saida.read(bloco):
+        yield parte
+
+
+GERADORES = {
+    "html": gerar_html,
+    "csv": gerar_csv,
+    "xlsx": gerar_xlsx,
+}
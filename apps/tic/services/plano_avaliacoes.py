@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import Iterable
+
+from apps.tic.models import AvaliacaoCognitivaTIC
+
+
+# -------------------------
+# Plano de avaliações (cópia entre turmas)
+# -------------------------
+# Usado na transição de ano letivo (apps/nucleo/services/transicao_ano.py):
+# a turma nova recebe as avaliações da turma de origem (período, nome e
+# peso), sem notas. Uma query de leitura e um bulk_create para todas as
+# turmas; bulk_create não emite post_save, e turmas novas não têm boletins
+# a recalcular.
+
+
+def clonar_plano_avaliacoes(pares: Iterable[tuple[int, int]]) -> int:
+    """
+    Copia as avaliações de cada turma de origem para a turma nova
+    (pares: (turma de origem id, turma nova id)). Retorna o número de
+    avaliações criadas.
+    """
+    nova_de = dict(pares)
+    if not nova_de:
+        return 0
+
+    avaliacoes = [
+        AvaliacaoCognitivaTIC(turma_id=nova_de[turma_id], periodo=periodo, nome=nome, peso_percentual=peso)
+        for turma_id, periodo, nome, peso in (
+            AvaliacaoCognitivaTIC.objects
+            .filter(turma_id__in=nova_de)
+            .order_by("turma_id", "periodo", "nome")
+            .values_list("turma_id", "periodo", "nome", "peso_percentual")
+        )
+    ]
+    AvaliacaoCognitivaTIC.objects.bulk_create(avaliacoes)
+    return len(avaliacoes)
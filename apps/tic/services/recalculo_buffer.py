@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from apps.tic.models import BoletimPeriodoTIC
+from apps.tic.services.fila_recalculo import enfileirar, enfileirar_turma
+from apps.tic.services.tic_calculator import (
+    DeltaNota,
+    aplicar_deltas_notas,
+    garantir_boletins,
+    recalcular_boletins,
+)
+
+
+# -------------------------
+# Buffer de recálculo por transação
+# -------------------------
+# Cada signal pede o recálculo de um boletim (turma, aluno, período).
+# Em vez de recalcular uma vez por save, as chaves ficam num buffer e são
+# recalculadas UMA vez, em lote, depois do commit.
+#
+# - Além de boletins individuais, aceita âmbitos (turma, período) inteiros,
+#   usados quando muda uma avaliação (peso) e toda a turma é afetada.
+# - Buffer por thread (cada thread tem a sua ligação/transação).
+# - Tudo o que fica pendente (chaves, âmbitos e deltas) vive num lote
+#   (_Lote) do nível de savepoint em que foi pedido, e o lote é ele próprio
+#   o on_commit que o descarrega. Se esse savepoint (ou a transação) for
+#   revertido, o Django retira o on_commit e o lote, com tudo o que tinha,
+#   perde-se com ele: nada fica para trás para a transação seguinte.
+# - Um savepoint confirmado passa a fazer parte do nível de cima: o seu
+#   lote é tratado como um lote desse nível. Normalmente há um só lote e
+#   uma descarga por transação; com savepoints, um lote por nível.
+#
+# As notas não pedem um recálculo: o signal passa o delta da nota
+# (agendar_delta_nota) e os deltas do lote, somados por boletim, são
+# aplicados na mesma descarga (aplicar_deltas_notas), sem reler as notas.
+# Um boletim com recálculo completo pendente deixa de receber deltas (o
+# recálculo já inclui as notas), e um recálculo pedido depois de deltas do
+# mesmo boletim substitui-os, no lote mais exterior que os tinha (que só é
+# revertido quando todos os outros também o são).
+#
+# Com settings.TIC_RECALCULO_EM_FILA = True, os pedidos não são recalculados
+# no pedido HTTP: vão para a tabela RecalculoPendente (na mesma transação) e
+# o comando tic_worker processa-os em segundo plano.
+
+class _Lote:
+    """
+    Pendentes de UM nível de savepoint: chaves (turma, aluno, período),
+    âmbitos (turma, período) e os deltas das notas por boletim. É ele
+    próprio o callback on_commit que os descarrega.
+    """
+
+    def __init__(self, savepoints: tuple[str, ...]):
+        self.savepoints = savepoints
+        self.chaves: set[tuple[int, int, int]] = set()
+        self.ambitos: set[tuple[int, int]] = set()
+        self.deltas: dict[tuple[int, int, int], DeltaNota] = {}
+        self.descarregado = False
+
+    def __call__(self) -> None:
+        self.descarregado = True
+        descarregar(self.chaves, self.ambitos, self.deltas)
+
+    def cobre(self, chave: tuple[int, int, int]) -> bool:
+        turma_id, _, periodo = chave
+        return chave in self.chaves or (turma_id, periodo) in self.ambitos
+
+
+class _Lotes(threading.local):
+    def __init__(self):
+        self.ativos: list[_Lote] = []
+
+
+_lotes = _Lotes()
+
+_contadores_lock = threading.Lock()
+_contadores = {
+    "solicitados": 0,  # pedidos feitos pelos signals (recálculos e deltas de notas)
+    "executados": 0,   # boletins efetivamente recalculados/atualizados
+    "descargas": 0,    # recálculos em lote executados
+}
+
+
+def _incrementar(nome: str, valor: int = 1) -> None:
+    with _contadores_lock:
+        _contadores[nome] += valor
+
+
+def _em_fila() -> bool:
+    return getattr(settings, "TIC_RECALCULO_EM_FILA", False)
+
+
+def _em_transacao() -> bool:
+    return transaction.get_connection().in_atomic_block
+
+
+def _lotes_da_transacao() -> list[_Lote]:
+    """
+    Lotes ainda válidos desta thread, do mais antigo para o mais recente.
+    Saem os já descarregados e os revertidos (on_commit retirado); os de
+    savepoints já confirmados passam ao nível de savepoint atual em comum.
+    """
+    ligacao = transaction.get_connection()
+    registados = {id(funcao) for _, funcao, _ in ligacao.run_on_commit}
+    atuais = tuple(ligacao.savepoint_ids)
+
+    validos = []
+    for lote in _lotes.ativos:
+        if lote.descarregado or id(lote) not in registados:
+            continue
+        comum = 0
+        while comum < min(len(lote.savepoints), len(atuais)) and lote.savepoints[comum] == atuais[comum]:
+            comum += 1
+        lote.savepoints = atuais[:comum]
+        validos.append(lote)
+    _lotes.ativos = validos
+    return validos
+
+
+def _lote_atual(lotes: list[_Lote]) -> _Lote:
+    """
+    Lote do nível de savepoint atual (criado e registado se não existir).
+    """
+    atuais = tuple(transaction.get_connection().savepoint_ids)
+    for lote in reversed(lotes):
+        if lote.savepoints == atuais:
+            return lote
+    lote = _Lote(atuais)
+    transaction.on_commit(lote)
+    _lotes.ativos.append(lote)
+    return lote
+
+
+def _substituir_deltas(lotes: list[_Lote], coberta) -> _Lote | None:
+    """
+    Retira os deltas dos boletins que vão ter recálculo completo (que já
+    inclui as notas). Retorna o lote mais exterior que tinha algum, onde o
+    recálculo tem de ficar para não se perder com um savepoint revertido.
+    """
+    exterior = None
+    for lote in lotes:
+        retirados = [chave for chave in lote.deltas if coberta(chave)]
+        for chave in retirados:
+            del lote.deltas[chave]
+        if retirados and (exterior is None or len(lote.savepoints) < len(exterior.savepoints)):
+            exterior = lote
+    return exterior
+
+
+def agendar_recalculo(turma_id: int, aluno_id: int, periodo: int, contar: bool = True) -> None:
+    """
+    Marca o boletim como "sujo"; o recálculo acontece depois do commit
+    (ou no tic_worker, em modo fila).
+    """
+    if contar:
+        _incrementar("solicitados")
+
+    chave = (turma_id, aluno_id, periodo)
+    if _em_fila():
+        enfileirar([chave])
+        return
+    if not _em_transacao():
+        descarregar(chaves={chave})
+        return
+
+    lotes = _lotes_da_transacao()
+    if any(lote.cobre(chave) for lote in lotes):
+        return
+    lote = _substituir_deltas(lotes, lambda c: c == chave) or _lote_atual(lotes)
+    lote.chaves.add(chave)
+
+
+def agendar_recalculo_turma(turma_id: int, periodo: int) -> None:
+    """
+    Marca todos os boletins da turma no período; recalculados depois do commit
+    (ou no tic_worker, em modo fila).
+    """
+    _incrementar("solicitados")
+
+    ambito = (turma_id, periodo)
+    if _em_fila():
+        enfileirar_turma(turma_id, periodo)
+        return
+    if not _em_transacao():
+        descarregar(ambitos={ambito})
+        return
+
+    lotes = _lotes_da_transacao()
+    if any(ambito in lote.ambitos for lote in lotes):
+        return
+    lote = _substituir_deltas(lotes, lambda c: (c[0], c[2]) == ambito) or _lote_atual(lotes)
+    lote.ambitos.add(ambito)
+
+
+def agendar_delta_nota(
+    turma_id: int,
+    aluno_id: int,
+    periodo: int,
+    delta_soma,
+    delta_peso,
+    sai: str | None = None,
+    entra: tuple | None = None,
+) -> None:
+    """
+    Soma o delta de uma nota (delta = nota_nova × peso_novo - nota_antiga ×
+    peso_antigo; ver aplicar_deltas_notas()) ao boletim; os deltas são
+    aplicados depois do commit, na mesma descarga dos recálculos.
+    Fora de uma transação é aplicado logo. Em modo fila, o boletim vai para
+    a fila (o tic_worker faz o recálculo completo).
+    """
+    _incrementar("solicitados")
+
+    chave = (turma_id, aluno_id, periodo)
+    if _em_fila():
+        enfileirar([chave])
+        return
+
+    delta = DeltaNota()
+    delta.somar(delta_soma, delta_peso, sai, entra)
+    if not _em_transacao():
+        descarregar(deltas={chave: delta})
+        return
+
+    lotes = _lotes_da_transacao()
+    if any(lote.cobre(chave) for lote in lotes):
+        return  # já vai ter recálculo completo, que inclui esta nota
+    _lote_atual(lotes).deltas.setdefault(chave, DeltaNota()).somar(delta_soma, delta_peso, sai, entra)
+
+
+def renomear_nos_deltas(turma_id: int, periodo: int, nome_antigo: str, nome_novo: str) -> None:
+    """
+    Uma avaliação renomeada depois de notas ainda por aplicar nesta
+    transação: os deltas passam a usar o nome novo no snapshot.
+    """
+    if not _em_transacao():
+        return
+
+    def renomear(nome):
+        return nome_novo if nome == nome_antigo else nome
+
+    for lote in _lotes_da_transacao():
+        for (t, _, p), delta in lote.deltas.items():
+            if (t, p) == (turma_id, periodo):
+                delta.snapshot = [
+                    (renomear(sai), entra and (renomear(entra[0]), *entra[1:]))
+                    for sai, entra in delta.snapshot
+                ]
+
+
+@transaction.atomic
+def descarregar(
+    chaves: set[tuple[int, int, int]] = frozenset(),
+    ambitos: set[tuple[int, int]] = frozenset(),
+    deltas: dict[tuple[int, int, int], DeltaNota] | None = None,
+) -> int:
+    """
+    Recalcula num único lote as chaves e os âmbitos e aplica os deltas das
+    notas dos restantes boletins.
+    Retorna o número de boletins recalculados/atualizados.
+    """
+    # O recálculo completo já inclui as notas: esses deltas não são aplicados.
+    deltas = {
+        chave: delta for chave, delta in (deltas or {}).items()
+        if chave not in chaves and (chave[0], chave[2]) not in ambitos
+    }
+    if not chaves and not ambitos and not deltas:
+        return 0
+
+    n = 0
+    if chaves or ambitos:
+        filtro = Q()
+        if chaves:
+            filtro |= Q(pk__in=garantir_boletins(chaves).values("pk"))
+        for turma_id, periodo in ambitos:
+            filtro |= Q(turma_id=turma_id, periodo=periodo)
+        n += recalcular_boletins(BoletimPeriodoTIC.objects.filter(filtro))
+    n += aplicar_deltas_notas(deltas)
+
+    _incrementar("executados", n)
+    _incrementar("descargas")
+    return n
+
+
+def contadores() -> dict[str, int]:
+    """
+    Ex.: {"solicitados": 30, "executados": 1, "descargas": 1}
+    """
+    with _contadores_lock:
+        return dict(_contadores)
+
+
+def repor_contadores() -> None:
+    with _contadores_lock:
+        for nome in _contadores:
+            _contadores[nome] = 0
@@ -1,15 +1,24 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from collections import defaultdict
+from dataclasses import dataclass, field, replace
 from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterable
 
 from django.db import transaction
+from django.db.models import Q, QuerySet
+from django.utils import timezone
 
+from apps.nucleo.models import Aluno
 from apps.tic.models import (
     BoletimPeriodoTIC,
     AtitudesPeriodoTIC,
     NotaAvaliacaoCognitivaTIC,
 )
+from apps.tic.services.anual import atualizar_anuais
+from apps.tic.services.cache_resultados import invalidar_resultados
+from apps.tic.services.estatisticas import Alteracao, registar_alteracoes, resumo_boletim
+from apps.tic.services.tic_rules import REGRAS_PADRAO, RegrasTIC, regras_da_turma
 
 
 # -------------------------
@@ -17,12 +26,15 @@ from apps.tic.models import (
 # -------------------------
 @dataclass(frozen=True)
 class ResultadoTIC:
+    soma_ponderada: Decimal           # Σ (nota × peso)
+    total_peso: Decimal               # Σ peso
     media_cognitiva_100: Decimal      # 0..100 (média ponderada)
     nota_cognitiva_80: Decimal        # 0..80
     nota_atitudes_20: Decimal         # 0..20
     nota_final_100: Decimal           # 0..100
     mencao_qualitativa: str
     nivel_sge: int
+    detalhe_calculo: dict | None = None  # snapshot para a página do boletim
 
 
 def _d(x) -> Decimal:
@@ -36,99 +48,160 @@ def _round2(x: Decimal) -> Decimal:
     return x.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
 
 
-def _mencao_qualitativa(nota_final_0_100: Decimal) -> str:
-    if nota_final_0_100 < Decimal("50"):
-        return "Insuficiente"
-    if nota_final_0_100 < Decimal("70"):
-        return "Suficiente"
-    if nota_final_0_100 < Decimal("90"):
-        return "Bom"
-    return "Muito Bom"
-
-
-def _nivel_1a5(nota_final_0_100: Decimal) -> int:
-    if nota_final_0_100 < Decimal("20"):
-        return 1
-    if nota_final_0_100 < Decimal("50"):
-        return 2
-    if nota_final_0_100 < Decimal("70"):
-        return 3
-    if nota_final_0_100 < Decimal("90"):
-        return 4
-    return 5
-
-
 # -------------------------
 # Cálculo do Boletim TIC
 # -------------------------
-def calcular_resultado_boletim(boletim: BoletimPeriodoTIC) -> ResultadoTIC:
-    """
-    Regras TIC (ensino básico/secundário):
-      - Cognitivo: média ponderada (0..100) e depois * 0.80 => 0..80
-      - Atitudes: soma de 5 dimensões, com tetos fixos, total 0..20
-      - Nota final (0..100) = cognitivo(0..80) + atitudes(0..20)
+CAMPOS_ATITUDES = (
+    "responsabilidade_integridade",
+    "excelencia_exigencia",
+    "curiosidade_reflexao_inovacao",
+    "cidadania_participacao",
+    "liberdade",
+)
+
+CAMPOS_RESULTADO = (
+    "soma_ponderada",
+    "total_peso",
+    "media_cognitiva_100",
+    "nota_cognitiva_80",
+    "nota_atitudes_20",
+    "nota_final_100",
+    "mencao_qualitativa",
+    "nivel_sge",
+    "detalhe_calculo",
+)
+
+
+def _calcular_resultado(
+    notas_pesos: Iterable[tuple],
+    atitudes: tuple | None,
+    regras: RegrasTIC = REGRAS_PADRAO,
+) -> ResultadoTIC:
     """
+    Núcleo puro do cálculo (sem acesso à BD), partilhado pelo caminho
+    por boletim e pelo motor em lote.
 
-    # 1) Cognitivo (média 0..100 e nota 0..80)
-    notas_qs = (
-        NotaAvaliacaoCognitivaTIC.objects
-        .select_related("avaliacao")
-        .filter(
-            aluno_id=boletim.aluno_id,
-            avaliacao__turma_id=boletim.turma_id,
-            avaliacao__periodo=boletim.periodo,
-        )
-    )
+    - notas_pesos: pares (nota 0..100, peso percentual)
+    - atitudes: valores das 5 dimensões (ordem de CAMPOS_ATITUDES) ou None
+    - regras: tetos, fator cognitivo e limites do contexto da turma
+    """
 
+    # 1) Cognitivo: agregados Σ(nota × peso) e Σ peso
     total_peso = Decimal("0")
     soma_ponderada = Decimal("0")
 
-    for n in notas_qs:
-        peso = _d(n.avaliacao.peso_percentual)  # ex.: 50
-        nota = _d(n.nota_0a100)                 # 0..100
+    for nota, peso in notas_pesos:
+        peso = _d(peso)  # ex.: 50
+        nota = _d(nota)  # 0..100
         total_peso += peso
         soma_ponderada += (nota * peso)
 
-    media_cognitiva_100 = (soma_ponderada / total_peso) if total_peso > 0 else Decimal("0")
-    media_cognitiva_100 = _round2(media_cognitiva_100)
-
-    nota_cognitiva_80 = _round2(media_cognitiva_100 * Decimal("0.80"))  # 0..80
-
     # 2) Atitudes (0..20) com tetos fixos
-    atitudes = AtitudesPeriodoTIC.objects.filter(boletim=boletim).first()
-
-    TETO_RESP = Decimal("3")
-    TETO_EXIG = Decimal("6")
-    TETO_CURI = Decimal("2")
-    TETO_CIDA = Decimal("4")
-    TETO_LIBE = Decimal("5")
-
-    if atitudes:
-        resp = min(_d(atitudes.responsabilidade_integridade), TETO_RESP)
-        exig = min(_d(atitudes.excelencia_exigencia), TETO_EXIG)
-        curi = min(_d(atitudes.curiosidade_reflexao_inovacao), TETO_CURI)
-        cida = min(_d(atitudes.cidadania_participacao), TETO_CIDA)
-        libe = min(_d(atitudes.liberdade), TETO_LIBE)
-
-        nota_atitudes_20 = resp + exig + curi + cida + libe
+    if atitudes is not None:
+        nota_atitudes_20 = sum(
+            (min(_d(valor), teto) for valor, teto in zip(atitudes, regras.tetos_atitudes)),
+            Decimal("0"),
+        )
     else:
         nota_atitudes_20 = Decimal("0")
 
-    nota_atitudes_20 = _round2(nota_atitudes_20)
+    return _resultado_de_somas(soma_ponderada, total_peso, _round2(nota_atitudes_20), regras)
+
+
+def _resultado_de_somas(
+    soma_ponderada: Decimal,
+    total_peso: Decimal,
+    nota_atitudes_20: Decimal,
+    regras: RegrasTIC = REGRAS_PADRAO,
+) -> ResultadoTIC:
+    """
+    Deriva todos os campos do boletim a partir dos agregados cognitivos e da
+    nota de atitudes (já arredondada). Usado pelo cálculo completo e pela
+    atualização incremental (delta) das notas.
+    """
+    media_cognitiva_100 = (soma_ponderada / total_peso) if total_peso > 0 else Decimal("0")
+    media_cognitiva_100 = _round2(media_cognitiva_100)
+
+    nota_cognitiva_80 = _round2(media_cognitiva_100 * regras.fator_cognitivo)  # 0..80
 
     # 3) Nota final (0..100)
     nota_final_100 = _round2(nota_cognitiva_80 + nota_atitudes_20)
 
     return ResultadoTIC(
+        soma_ponderada=soma_ponderada,
+        total_peso=total_peso,
         media_cognitiva_100=media_cognitiva_100,
         nota_cognitiva_80=nota_cognitiva_80,
         nota_atitudes_20=nota_atitudes_20,
         nota_final_100=nota_final_100,
-        mencao_qualitativa=_mencao_qualitativa(nota_final_100),
-        nivel_sge=_nivel_1a5(nota_final_100),
+        mencao_qualitativa=regras.mencao(nota_final_100),
+        nivel_sge=regras.nivel(nota_final_100),
     )
 
 
+def calcular_resultado_boletim(boletim: BoletimPeriodoTIC) -> ResultadoTIC:
+    """
+    Regras TIC (ensino básico/secundário):
+      - Cognitivo: média ponderada (0..100) e depois * 0.80 => 0..80
+      - Atitudes: soma de 5 dimensões, com tetos fixos, total 0..20
+      - Nota final (0..100) = cognitivo(0..80) + atitudes(0..20)
+    """
+    notas_pesos = (
+        NotaAvaliacaoCognitivaTIC.objects
+        .filter(
+            aluno_id=boletim.aluno_id,
+            avaliacao__turma_id=boletim.turma_id,
+            avaliacao__periodo=boletim.periodo,
+        )
+        .values_list("avaliacao__nome", "nota_0a100", "avaliacao__peso_percentual")
+    )
+
+    atitudes = (
+        AtitudesPeriodoTIC.objects
+        .filter(boletim=boletim)
+        .values_list(*CAMPOS_ATITUDES)
+        .first()
+    )
+
+    return _calcular_com_detalhe(notas_pesos, atitudes, regras_da_turma(boletim.turma))
+
+
+# -------------------------
+# Snapshot do cálculo (página do boletim)
+# -------------------------
+def _fmt2(x) -> str:
+    return f"{_round2(_d(x)):.2f}"
+
+
+def montar_detalhe(
+    notas: Iterable[tuple],
+    atitudes: tuple | None,
+    media_cognitiva_100: Decimal,
+) -> dict:
+    """
+    Snapshot compacto (JSON) do que entrou no cálculo:
+      {"avaliacoes": [[nome, peso, nota], ...],   # por nome
+       "media": "0.00",
+       "atitudes": [5 valores] | None,            # ordem de CAMPOS_ATITUDES
+       "total_atitudes": "0.00" | None}
+    """
+    return {
+        "avaliacoes": sorted([nome, _fmt2(peso), _fmt2(nota)] for nome, nota, peso in notas),
+        "media": _fmt2(media_cognitiva_100),
+        "atitudes": [_fmt2(v) for v in atitudes] if atitudes is not None else None,
+        "total_atitudes": _fmt2(sum((_d(v) for v in atitudes), Decimal("0"))) if atitudes is not None else None,
+    }
+
+
+def _calcular_com_detalhe(notas: Iterable[tuple], atitudes: tuple | None, regras: RegrasTIC) -> ResultadoTIC:
+    """
+    _calcular_resultado() a partir de (nome, nota, peso), com o snapshot.
+    """
+    notas = list(notas)
+    r = _calcular_resultado([(nota, peso) for _, nota, peso in notas], atitudes, regras)
+    return replace(r, detalhe_calculo=montar_detalhe(notas, atitudes, r.media_cognitiva_100))
+
+
 # -------------------------
 # Persistência (sem recursão)
 # -------------------------
@@ -139,19 +212,22 @@ def recalcular_boletim(boletim_id: int) -> None:
         .select_related("turma", "aluno")
         .get(pk=boletim_id)
     )
+    if boletim.estado == BoletimPeriodoTIC.Estado.FECHADO:
+        return  # resultado congelado no fecho do período
 
     r = calcular_resultado_boletim(boletim)
+    antes = resumo_boletim(boletim)
 
     # ✅ Update direto: NÃO chama save() e NÃO dispara signals.
+    #    (atualizado_em explícito: o update() não aplica o auto_now)
     BoletimPeriodoTIC.objects.filter(pk=boletim.pk).update(
-        media_cognitiva_100=r.media_cognitiva_100,
-        nota_cognitiva_80=r.nota_cognitiva_80,
-        nota_atitudes_20=r.nota_atitudes_20,
-        nota_final_100=r.nota_final_100,
-        mencao_qualitativa=r.mencao_qualitativa,
-        nivel_sge=r.nivel_sge,
+        **{campo: getattr(r, campo) for campo in CAMPOS_RESULTADO},
+        atualizado_em=timezone.now(),
     )
 
+    _aplicar_resultado(boletim, r)
+    propagar_alteracoes([(boletim.turma_id, boletim.aluno_id, boletim.periodo, antes, resumo_boletim(boletim))])
+
 
 @transaction.atomic
 def garantir_e_recalcular_boletim(turma_id: int, aluno_id: int, periodo: int) -> None:
@@ -164,6 +240,339 @@ def garantir_e_recalcular_boletim(turma_id: int, aluno_id: int, periodo: int) ->
     recalcular_boletim(boletim_id=boletim.id)
 
 
+# -------------------------
+# Motor em lote (set-based)
+# -------------------------
+def _carregar_boletins(boletins: QuerySet[BoletimPeriodoTIC]) -> list[BoletimPeriodoTIC]:
+    """
+    Boletins do âmbito com os campos calculados e o contexto da turma (regras),
+    numa única query.
+    """
+    return list(
+        boletins
+        .select_related("turma")
+        .only(
+            "id", "turma_id", "aluno_id", "periodo",
+            "turma__tipo_contexto", "turma__ciclo",
+            *CAMPOS_RESULTADO,
+        )
+    )
+
+
+def _calcular_lote(boletins: QuerySet[BoletimPeriodoTIC]) -> list[tuple[BoletimPeriodoTIC, ResultadoTIC]]:
+    """
+    Calcula o resultado de todos os boletins do queryset (não fatiado) com
+    um número constante de queries:
+      1) boletins do âmbito
+      2) notas + pesos de todas as avaliações do âmbito
+      3) atitudes de todos os boletins do âmbito
+    Boletins FECHADO ficam de fora (nem as suas notas são lidas).
+    """
+    boletins = boletins.filter(estado=BoletimPeriodoTIC.Estado.ABERTO)
+    lista = _carregar_boletins(boletins)
+    if not lista:
+        return []
+
+    # Notas: filtradas por subqueries do próprio âmbito (sem listas enormes de IDs).
+    notas_por_chave: dict[tuple[int, int, int], list[tuple]] = defaultdict(list)
+    notas = (
+        NotaAvaliacaoCognitivaTIC.objects
+        .filter(
+            aluno_id__in=boletins.values("aluno_id"),
+            avaliacao__turma_id__in=boletins.values("turma_id"),
+            avaliacao__periodo__in=boletins.values("periodo"),
+        )
+        .values_list(
+            "avaliacao__turma_id",
+            "aluno_id",
+            "avaliacao__periodo",
+            "avaliacao__nome",
+            "nota_0a100",
+            "avaliacao__peso_percentual",
+        )
+    )
+    for turma_id, aluno_id, periodo, nome, nota, peso in notas:
+        notas_por_chave[(turma_id, aluno_id, periodo)].append((nome, nota, peso))
+
+    atitudes_por_boletim = {
+        row[0]: row[1:]
+        for row in (
+            AtitudesPeriodoTIC.objects
+            .filter(boletim_id__in=boletins.values("pk"))
+            .values_list("boletim_id", *CAMPOS_ATITUDES)
+        )
+    }
+
+    return [
+        (
+            boletim,
+            _calcular_com_detalhe(
+                notas_por_chave.get((boletim.turma_id, boletim.aluno_id, boletim.periodo), ()),
+                atitudes_por_boletim.get(boletim.pk),
+                regras_da_turma(boletim.turma),
+            ),
+        )
+        for boletim in lista
+    ]
+
+
+@transaction.atomic
+def recalcular_boletins(boletins: QuerySet[BoletimPeriodoTIC]) -> int:
+    """
+    Recalcula em lote todos os boletins do queryset (não fatiado).
+
+    Número de queries constante, independente do número de alunos: as três
+    leituras de _calcular_lote() e um único bulk_update (apenas dos boletins
+    cujo resultado mudou).
+
+    O resultado é idêntico ao de recalcular_boletim(), porque ambos usam
+    _calcular_resultado(). Retorna o número de boletins processados.
+    """
+    calculados = _calcular_lote(boletins)
+    _gravar_resultados(calculados)
+    return len(calculados)
+
+
+def verificar_boletins(boletins: QuerySet[BoletimPeriodoTIC]) -> list[tuple[int, str, object, object]]:
+    """
+    Compara os valores gravados (incluindo os agregados incrementais) com um
+    recálculo completo, sem gravar nada.
+    Retorna as divergências como (boletim_id, campo, gravado, esperado).
+    """
+    divergencias = []
+    for boletim, r in _calcular_lote(boletins):
+        for campo in CAMPOS_RESULTADO:
+            gravado, esperado = getattr(boletim, campo), getattr(r, campo)
+            if gravado != esperado:
+                divergencias.append((boletim.pk, campo, gravado, esperado))
+    return divergencias
+
+
+def recalcular_turma_periodo(turma_id: int, periodo: int) -> int:
+    """
+    Recalcula todos os boletins de uma turma num período (ex.: após mudar pesos).
+    """
+    return recalcular_boletins(
+        BoletimPeriodoTIC.objects.filter(turma_id=turma_id, periodo=periodo)
+    )
+
+
+def _filtro_chaves(chaves: Iterable[tuple[int, int, int]]) -> Q:
+    """
+    Um filtro (turma, período, alunos) por turma/período, unidos por OR.
+    """
+    alunos_por_ambito: dict[tuple[int, int], set[int]] = defaultdict(set)
+    for turma_id, aluno_id, periodo in chaves:
+        alunos_por_ambito[(turma_id, periodo)].add(aluno_id)
+
+    filtro = Q()
+    for (turma_id, periodo), aluno_ids in alunos_por_ambito.items():
+        filtro |= Q(turma_id=turma_id, periodo=periodo, aluno_id__in=aluno_ids)
+    return filtro
+
+
+def garantir_boletins(chaves: Iterable[tuple[int, int, int]]) -> QuerySet[BoletimPeriodoTIC]:
+    """
+    Versão em lote do get_or_create de garantir_e_recalcular_boletim().
+    chaves: (turma_id, aluno_id, periodo). Cria os boletins em falta com um
+    único bulk_create e retorna o queryset (lazy) desses boletins.
+    """
+    chaves = set(chaves)
+    if not chaves:
+        return BoletimPeriodoTIC.objects.none()
+
+    boletins = BoletimPeriodoTIC.objects.filter(_filtro_chaves(chaves))
+    em_falta = chaves - set(boletins.values_list("turma_id", "aluno_id", "periodo"))
+
+    if em_falta:
+        # Só cria boletins para alunos que (ainda) existem e pertencem à turma.
+        validos = set(
+            Aluno.objects
+            .filter(
+                pk__in={aluno_id for _, aluno_id, _ in em_falta},
+                turma_id__in={turma_id for turma_id, _, _ in em_falta},
+            )
+            .values_list("turma_id", "pk")
+        )
+        BoletimPeriodoTIC.objects.bulk_create(
+            [
+                BoletimPeriodoTIC(turma_id=turma_id, aluno_id=aluno_id, periodo=periodo)
+                for turma_id, aluno_id, periodo in em_falta
+                if (turma_id, aluno_id) in validos
+            ],
+            ignore_conflicts=True,
+        )
+
+    return boletins
+
+
+@transaction.atomic
+def garantir_e_recalcular_boletins(chaves: Iterable[tuple[int, int, int]]) -> int:
+    """
+    Versão em lote de garantir_e_recalcular_boletim().
+    """
+    return recalcular_boletins(garantir_boletins(chaves))
+
+
+def propagar_alteracoes(alteracoes: list[Alteracao]) -> None:
+    """
+    Atualiza os read models derivados dos boletins de período (estatísticas
+    da turma/período e boletins anuais) a partir de (antes, depois), e a
+    versão da cache de resultados.
+    """
+    registar_alteracoes(alteracoes)
+    atualizar_anuais(alteracoes)
+    invalidar_resultados((turma_id, periodo) for turma_id, _, periodo, _, _ in alteracoes)
+
+
+def _gravar_resultados(calculados: Iterable[tuple[BoletimPeriodoTIC, ResultadoTIC]]) -> None:
+    """
+    Grava (num único bulk_update) os boletins cujo resultado mudou e
+    propaga as alterações (estatísticas e boletins anuais).
+    """
+    alterados, alteracoes = [], []
+    for boletim, r in calculados:
+        antes = resumo_boletim(boletim)
+        if _aplicar_resultado(boletim, r):
+            alterados.append(boletim)
+            alteracoes.append((boletim.turma_id, boletim.aluno_id, boletim.periodo, antes, resumo_boletim(boletim)))
+
+    # ✅ bulk_update: NÃO chama save() e NÃO dispara signals.
+    if alterados:
+        agora = timezone.now()  # o bulk_update não aplica o auto_now
+        for boletim in alterados:
+            boletim.atualizado_em = agora
+        BoletimPeriodoTIC.objects.bulk_update(alterados, (*CAMPOS_RESULTADO, "atualizado_em"))
+        propagar_alteracoes(alteracoes)
+
+
+def _aplicar_resultado(boletim: BoletimPeriodoTIC, r: ResultadoTIC) -> bool:
+    """
+    Copia o resultado para a instância. Retorna True se algum campo mudou.
+    """
+    alterado = False
+    for campo in CAMPOS_RESULTADO:
+        novo = getattr(r, campo)
+        if getattr(boletim, campo) != novo:
+            setattr(boletim, campo, novo)
+            alterado = True
+    return alterado
+
+
+# -------------------------
+# Atualização incremental (deltas de notas)
+# -------------------------
+@dataclass
+class DeltaNota:
+    """
+    Deltas acumulados das notas de UM boletim: Σ(nota × peso), Σ peso e as
+    alterações ao snapshot (sai = nome da avaliação que sai; entra =
+    (nome, nota, peso)), pela ordem em que aconteceram.
+    """
+    soma: Decimal = Decimal("0")
+    peso: Decimal = Decimal("0")
+    snapshot: list[tuple[str | None, tuple | None]] = field(default_factory=list)
+
+    def somar(self, delta_soma: Decimal, delta_peso: Decimal, sai: str | None = None, entra: tuple | None = None) -> None:
+        self.soma += delta_soma
+        self.peso += delta_peso
+        self.snapshot.append((sai, entra))
+
+
+@transaction.atomic
+def aplicar_deltas_notas(deltas: dict[tuple[int, int, int], DeltaNota]) -> int:
+    """
+    Ajusta os agregados de cada boletim (turma, aluno, período) pelo delta
+    das suas notas e re-deriva os campos calculados, sem voltar a ler as
+    outras notas: uma leitura e um bulk_update para todos os boletins.
+
+    O snapshot (detalhe_calculo) é ajustado da mesma forma: sai a linha da
+    avaliação `sai` (nome) e entra `entra` = (nome, nota, peso).
+
+    Boletins que ainda não existam (ou nunca foram calculados) têm o cálculo
+    completo, que já inclui as notas. Boletins FECHADO ficam como estão.
+    Retorna o número de boletins atualizados.
+    """
+    if not deltas:
+        return 0
+
+    boletins = (
+        BoletimPeriodoTIC.objects
+        .select_for_update()
+        .select_related("turma")
+        .filter(_filtro_chaves(deltas))
+        .only("id", "turma_id", "aluno_id", "periodo", "estado", "turma__tipo_contexto", "turma__ciclo", *CAMPOS_RESULTADO)
+    )
+    por_chave = {(b.turma_id, b.aluno_id, b.periodo): b for b in boletins}
+
+    completos = []
+    calculados = []
+    for chave, delta in deltas.items():
+        boletim = por_chave.get(chave)
+        if boletim is not None and boletim.estado == BoletimPeriodoTIC.Estado.FECHADO:
+            continue  # resultado congelado no fecho do período
+        if boletim is None or boletim.nota_atitudes_20 is None or not boletim.detalhe_calculo:
+            completos.append(chave)
+            continue
+
+        r = _resultado_de_somas(
+            _d(boletim.soma_ponderada) + delta.soma,
+            _d(boletim.total_peso) + delta.peso,
+            _d(boletim.nota_atitudes_20),
+            regras_da_turma(boletim.turma),
+        )
+
+        detalhe = dict(boletim.detalhe_calculo)
+        linhas = detalhe["avaliacoes"]
+        for sai, entra in delta.snapshot:
+            linhas = [linha for linha in linhas if linha[0] != sai]
+            if entra is not None:
+                nome, nota, peso = entra
+                linhas = [linha for linha in linhas if linha[0] != nome] + [[nome, _fmt2(peso), _fmt2(nota)]]
+        detalhe["avaliacoes"] = sorted(linhas)
+        detalhe["media"] = _fmt2(r.media_cognitiva_100)
+        calculados.append((boletim, replace(r, detalhe_calculo=detalhe)))
+
+    _gravar_resultados(calculados)
+    if completos:
+        garantir_e_recalcular_boletins(completos)
+    return len(calculados) + len(completos)
+
+
+def renomear_avaliacao_no_detalhe(turma_id: int, periodo: int, nome_antigo: str, nome_novo: str) -> int:
+    """
+    O nome da avaliação não entra no cálculo, só no snapshot
+    (detalhe_calculo): troca-o nos boletins abertos da turma/período, num
+    único bulk_update, sem recalcular (o snapshot de um boletim FECHADO fica
+    como foi congelado). Retorna o número de boletins alterados.
+    """
+    alterados = []
+    for boletim in (
+        BoletimPeriodoTIC.objects
+        .filter(turma_id=turma_id, periodo=periodo)
+        .abertos()
+        .exclude(detalhe_calculo={})
+        .only("id", "detalhe_calculo")
+    ):
+        linhas = boletim.detalhe_calculo.get("avaliacoes", [])
+        if not any(linha[0] == nome_antigo for linha in linhas):
+            continue
+        boletim.detalhe_calculo = {
+            **boletim.detalhe_calculo,
+            "avaliacoes": sorted([nome_novo, *linha[1:]] if linha[0] == nome_antigo else linha for linha in linhas),
+        }
+        alterados.append(boletim)
+
+    if alterados:
+        # atualizado_em faz parte da chave da cache de fragmentos do Admin.
+        agora = timezone.now()
+        for boletim in alterados:
+            boletim.atualizado_em = agora
+        BoletimPeriodoTIC.objects.bulk_update(alterados, ("detalhe_calculo", "atualizado_em"))
+    invalidar_resultados([(turma_id, periodo)])
+    return len(alterados)
+
+
 def agendar_recalculo_boletim(boletim_id: int) -> None:
     """
     ✅ Use isto dentro de signals/admin: só recalcula depois do commit.
@@ -1,8 +1,198 @@
 from __future__ import annotations
 
+from bisect import bisect_right
+from dataclasses import dataclass, field, fields
 from decimal import Decimal
+from functools import lru_cache
 
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import Signal, receiver
 
+
+# -------------------------
+# Regras de classificação TIC
+# -------------------------
+@dataclass(frozen=True)
+class RegrasTIC:
+    """
+    Tabela de regras (compilada uma vez) para um contexto de turma.
+
+    - limites_nivel: nível = 1 + nº de limites <= nota  (bisect)
+    - limites_mencao / mencoes: menção = mencoes[nº de limites <= nota]
+    - tetos_atitudes: teto de cada dimensão (ordem de CAMPOS_ATITUDES)
+    - fator_cognitivo: peso do domínio cognitivo (0.80 => 80/20)
+    - pesos_periodos: peso relativo de P1, P2 e P3 na classificação anual
+    """
+
+    limites_nivel: tuple[Decimal, ...] = (Decimal("20"), Decimal("50"), Decimal("70"), Decimal("90"))
+    limites_mencao: tuple[Decimal, ...] = (Decimal("50"), Decimal("70"), Decimal("90"))
+    mencoes: tuple[str, ...] = ("Insuficiente", "Suficiente", "Bom", "Muito Bom")
+    tetos_atitudes: tuple[Decimal, ...] = (
+        Decimal("3"),  # responsabilidade e integridade
+        Decimal("6"),  # excelência e exigência
+        Decimal("2"),  # curiosidade, reflexão e inovação
+        Decimal("4"),  # cidadania e participação
+        Decimal("5"),  # liberdade
+    )
+    fator_cognitivo: Decimal = Decimal("0.80")
+    pesos_periodos: tuple[Decimal, ...] = (Decimal("1"), Decimal("1"), Decimal("1"))
+
+    # Versões em cêntimos inteiros (motores NumPy e SQL)
+    limites_nivel_c: tuple[int, ...] = field(init=False, repr=False, compare=False)
+    limites_mencao_c: tuple[int, ...] = field(init=False, repr=False, compare=False)
+    tetos_atitudes_c: tuple[int, ...] = field(init=False, repr=False, compare=False)
+    fator_cognitivo_c: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if len(self.mencoes) != len(self.limites_mencao) + 1:
+            raise ValueError("mencoes deve ter exatamente len(limites_mencao) + 1 elementos.")
+        if list(self.limites_nivel) != sorted(self.limites_nivel):
+            raise ValueError("limites_nivel devem estar por ordem crescente.")
+        if list(self.limites_mencao) != sorted(self.limites_mencao):
+            raise ValueError("limites_mencao devem estar por ordem crescente.")
+        if len(self.pesos_periodos) != 3 or any(p < 0 for p in self.pesos_periodos) or not any(self.pesos_periodos):
+            raise ValueError("pesos_periodos deve ter 3 pesos (P1, P2, P3) não negativos, com pelo menos um > 0.")
+
+        def c(x: Decimal) -> int:
+            centimos = Decimal(x).scaleb(2)
+            if centimos != centimos.to_integral_value():
+                raise ValueError(f"{x}: as regras TIC só admitem valores com até 2 casas decimais.")
+            return int(centimos)
+
+        object.__setattr__(self, "limites_nivel_c", tuple(c(x) for x in self.limites_nivel))
+        object.__setattr__(self, "limites_mencao_c", tuple(c(x) for x in self.limites_mencao))
+        object.__setattr__(self, "tetos_atitudes_c", tuple(c(x) for x in self.tetos_atitudes))
+        object.__setattr__(self, "fator_cognitivo_c", c(self.fator_cognitivo))
+
+    def nivel(self, nota_0a100: Decimal) -> int:
+        return bisect_right(self.limites_nivel, nota_0a100) + 1
+
+    def mencao(self, nota_0a100: Decimal) -> str:
+        return self.mencoes[bisect_right(self.limites_mencao, nota_0a100)]
+
+
+REGRAS_PADRAO = RegrasTIC()
+
+
+# -------------------------
+# Regras por contexto (settings.TIC_REGRAS)
+# -------------------------
+# As regras de cada Turma.TipoContexto (e opcionalmente ciclo) vêm de
+# settings.TIC_REGRAS, lidas por cada processo na primeira utilização: o
+# servidor, o tic_worker e os workers do recalcular_tic usam todos as
+# mesmas tabelas. Contextos sem entrada usam REGRAS_PADRAO.
+#
+# registar_regras()/remover_regras() alteram as regras em execução e
+# enviam regras_alteradas uma vez por alteração: o receiver (signals.py)
+# invalida a cache de resultados e agenda o recálculo das turmas afetadas.
+# Uma alteração a TIC_REGRAS só chega aos boletins gravados com
+# `python manage.py recalcular_tic`.
+
+# (tipo_contexto, ciclo) -> regras; ciclo None = todos os ciclos do contexto.
+_REGISTO: dict[tuple[str | None, str | None], RegrasTIC] | None = None
+
+# Enviado com tipo_contexto e ciclo depois de registar/remover regras.
+regras_alteradas = Signal()
+
+_CAMPOS_REGRAS = {f.name for f in fields(RegrasTIC) if f.init}
+
+
+def _regras_de_valores(valores: dict) -> RegrasTIC:
+    """
+    RegrasTIC a partir de uma entrada de TIC_REGRAS (números ou strings).
+    """
+    desconhecidos = set(valores) - _CAMPOS_REGRAS
+    if desconhecidos:
+        raise ValueError(f"campos desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+    convertidos = {}
+    for campo, valor in valores.items():
+        if campo == "mencoes":
+            convertidos[campo] = tuple(str(m) for m in valor)
+        elif campo == "fator_cognitivo":
+            convertidos[campo] = Decimal(str(valor))
+        else:
+            convertidos[campo] = tuple(Decimal(str(v)) for v in valor)
+    return RegrasTIC(**convertidos)
+
+
+def regras_de_settings() -> dict[tuple[str | None, str | None], RegrasTIC]:
+    """
+    settings.TIC_REGRAS compiladas: {(tipo_contexto, ciclo): RegrasTIC}.
+    ImproperlyConfigured se alguma entrada for inválida.
+    """
+    registo = {}
+    for chave, valores in getattr(settings, "TIC_REGRAS", {}).items():
+        tipo_contexto, ciclo = (chave, None) if isinstance(chave, str) else chave
+        try:
+            registo[(tipo_contexto, ciclo)] = _regras_de_valores(valores)
+        except (TypeError, ValueError, ArithmeticError) as exc:
+            raise ImproperlyConfigured(f"TIC_REGRAS[{chave!r}]: {exc}") from exc
+    return registo
+
+
+def _registo() -> dict[tuple[str | None, str | None], RegrasTIC]:
+    global _REGISTO
+    if _REGISTO is None:
+        _REGISTO = regras_de_settings()
+    return _REGISTO
+
+
+@receiver(setting_changed)
+def _recarregar_regras(setting, **kwargs):
+    global _REGISTO
+    if setting == "TIC_REGRAS":
+        _REGISTO = None
+        obter_regras.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def obter_regras(tipo_contexto: str | None = None, ciclo: str | None = None) -> RegrasTIC:
+    """
+    Regras para um Turma.TipoContexto/ciclo (cache até ao próximo registo).
+    Procura (contexto, ciclo), depois (contexto, None), depois o padrão.
+    """
+    registo = _registo()
+    return (
+        registo.get((tipo_contexto, ciclo))
+        or registo.get((tipo_contexto, None))
+        or REGRAS_PADRAO
+    )
+
+
+def regras_da_turma(turma) -> RegrasTIC:
+    return obter_regras(turma.tipo_contexto, turma.ciclo)
+
+
+def registar_regras(regras: RegrasTIC, tipo_contexto: str, ciclo: str | None = None) -> None:
+    """
+    Define regras próprias para um contexto (e opcionalmente um ciclo).
+    Invalida a cache de obter_regras() e envia regras_alteradas uma única
+    vez (nada, se as regras já eram estas).
+    """
+    registo = _registo()
+    if registo.get((tipo_contexto, ciclo)) == regras:
+        return
+    registo[(tipo_contexto, ciclo)] = regras
+    obter_regras.cache_clear()
+    regras_alteradas.send(sender=RegrasTIC, tipo_contexto=tipo_contexto, ciclo=ciclo)
+
+
+def remover_regras(tipo_contexto: str, ciclo: str | None = None) -> None:
+    if _registo().pop((tipo_contexto, ciclo), None) is not None:
+        obter_regras.cache_clear()
+        regras_alteradas.send(sender=RegrasTIC, tipo_contexto=tipo_contexto, ciclo=ciclo)
+
+
+def regras_registadas() -> dict[tuple[str | None, str | None], RegrasTIC]:
+    return dict(_registo())
+
+
+# -------------------------
+# Atalhos (regras padrão)
+# -------------------------
 def mencao_qualitativa_tic(nota_0a100: Decimal) -> str:
     """
     Regra (ensino básico TIC):
@@ -11,13 +201,7 @@ def mencao_qualitativa_tic(nota_0a100: Decimal) -> str:
       < 90  -> Bom
       >= 90 -> Muito Bom
     """
-    if nota_0a100 < Decimal("50"):
-        return "Insuficiente"
-    if nota_0a100 < Decimal("70"):
-        return "Suficiente"
-    if nota_0a100 < Decimal("90"):
-        return "Bom"
-    return "Muito Bom"
+    return REGRAS_PADRAO.mencao(nota_0a100)
 
 
 def nivel_sge_tic(nota_0a100: Decimal) -> int:
@@ -29,12 +213,4 @@ def nivel_sge_tic(nota_0a100: Decimal) -> int:
       < 90  -> 4
       >= 90 -> 5
     """
-    if nota_0a100 < Decimal("20"):
-        return 1
-    if nota_0a100 < Decimal("50"):
-        return 2
-    if nota_0a100 < Decimal("70"):
-        return 3
-    if nota_0a100 < Decimal("90"):
-        return 4
-    return 5
+    return REGRAS_PADRAO.nivel(nota_0a100)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from django.db.models import (
+    Case,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    QuerySet,
+    Subquery,
+    Sum,
+    Value,
+    When,
+    CharField,
+)
+from django.db.models.functions import Cast, Coalesce, Least, Round
+
+from apps.tic.models import BoletimPeriodoTIC, NotaAvaliacaoCognitivaTIC
+from apps.tic.services.tic_calculator import CAMPOS_ATITUDES
+from apps.tic.services.tic_rules import REGRAS_PADRAO, RegrasTIC, regras_registadas
+
+
+# -------------------------
+# Cálculo TIC em SQL (anotações)
+# -------------------------
+# Espelha _calcular_resultado() (tic_calculator) e as regras de tic_rules
+# (uma expressão por contexto registado, escolhida com Case na turma).
+#
+# Toda a aritmética é feita em CÊNTIMOS INTEIROS: os decimais (2 casas) são
+# convertidos para inteiros, e o ROUND_HALF_UP é feito por divisão inteira:
+#     round_half_up(a / b) = (2a + b) // (2b)     (a, b >= 0)
+# Assim o resultado é exato e igual ao do Decimal, também no SQLite
+# (que guarda DecimalField como REAL/INTEGER).
+
+_DEC2 = DecimalField(max_digits=6, decimal_places=2)
+
+
+def _centimos(expr) -> Cast:
+    """Decimal com 2 casas -> inteiro em cêntimos (ex.: 12.34 -> 1234)."""
+    return Cast(
+        Round(ExpressionWrapper(expr * Value(100), output_field=DecimalField())),
+        IntegerField(),
+    )
+
+
+def _inteiro(expr) -> ExpressionWrapper:
+    return ExpressionWrapper(expr, output_field=IntegerField())
+
+
+def _para_decimal(centimos) -> ExpressionWrapper:
+    """Inteiro em cêntimos -> decimal 0.00."""
+    return ExpressionWrapper(centimos / Value(100.0), output_field=_DEC2)
+
+
+def _por_contexto(construir, output_field):
+    """
+    Aplica construir(regras) por Turma.TipoContexto/ciclo registado em tic_rules;
+    entradas com ciclo têm prioridade, tal como em obter_regras().
+    """
+    registadas = regras_registadas()
+    if not registadas:
+        return construir(REGRAS_PADRAO)
+
+    whens = []
+    for (tipo_contexto, ciclo), regras in sorted(registadas.items(), key=lambda kv: kv[0][1] is None):
+        condicao = Q(turma__tipo_contexto=tipo_contexto)
+        if ciclo is not None:
+            condicao &= Q(turma__ciclo=ciclo)
+        whens.append(When(condicao, then=construir(regras)))
+
+    return Case(*whens, default=construir(REGRAS_PADRAO), output_field=output_field)
+
+
+def _atitudes_c(regras: RegrasTIC):
+    # LEFT JOIN pelo OneToOne (sem atitudes -> 0), cada dimensão com teto.
+    return _inteiro(sum(
+        (
+            Coalesce(Least(_centimos(F(f"atitudes__{campo}")), Value(teto_c)), Value(0))
+            for campo, teto_c in zip(CAMPOS_ATITUDES, regras.tetos_atitudes_c)
+        ),
+        Value(0),
+    ))
+
+
+def _cognitiva_c(regras: RegrasTIC):
+    # cognitivo em cêntimos = round_half_up(média × fator), fator em cêntimos (0.80 -> 80)
+    return _inteiro((F("_media_c") * Value(regras.fator_cognitivo_c) + Value(50)) / Value(100))
+
+
+def _nivel(regras: RegrasTIC):
+    whens = [
+        When(_final_c__lt=limite_c, then=Value(nivel))
+        for nivel, limite_c in enumerate(regras.limites_nivel_c, start=1)
+    ]
+    return Case(*whens, default=Value(len(regras.limites_nivel_c) + 1), output_field=IntegerField())
+
+
+def _mencao(regras: RegrasTIC):
+    whens = [
+        When(_final_c__lt=limite_c, then=Value(mencao))
+        for mencao, limite_c in zip(regras.mencoes, regras.limites_mencao_c)
+    ]
+    return Case(*whens, default=Value(regras.mencoes[-1]), output_field=CharField())
+
+
+def anotar_resultados(qs: QuerySet) -> QuerySet:
+    """
+    Anota num queryset de BoletimPeriodoTIC os resultados calculados em SQL,
+    sem depender dos campos gravados estarem atualizados:
+
+      calc_media_cognitiva_100, calc_nota_cognitiva_80, calc_nota_atitudes_20,
+      calc_nota_final_100, calc_nivel_sge, calc_mencao_qualitativa
+
+    Boletins FECHADO devolvem os valores congelados no fecho do período (o
+    CASE não chega a avaliar as subqueries das notas nessas linhas).
+    """
+    notas = (
+        NotaAvaliacaoCognitivaTIC.objects
+        .filter(
+            aluno_id=OuterRef("aluno_id"),
+            avaliacao__turma_id=OuterRef("turma_id"),
+            avaliacao__periodo=OuterRef("periodo"),
+        )
+        .order_by()
+        .values("aluno_id")
+    )
+    peso_c = _centimos(F("avaliacao__peso_percentual"))
+    soma_c = Subquery(
+        notas.annotate(s=Sum(_inteiro(_centimos(F("nota_0a100")) * peso_c))).values("s"),
+        output_field=IntegerField(),
+    )
+    total_c = Subquery(
+        notas.annotate(s=Sum(peso_c)).values("s"),
+        output_field=IntegerField(),
+    )
+
+    aberto = Q(estado=BoletimPeriodoTIC.Estado.ABERTO)
+    qs = qs.annotate(
+        _soma_c=Case(When(aberto, then=Coalesce(soma_c, Value(0))), default=Value(0), output_field=IntegerField()),
+        _total_c=Case(When(aberto, then=Coalesce(total_c, Value(0))), default=Value(0), output_field=IntegerField()),
+    ).annotate(
+        # média (0..100) em cêntimos = round_half_up(Σ n·p / Σ p)
+        _media_c=Case(
+            When(_total_c__gt=0, then=_inteiro(
+                (Value(2) * F("_soma_c") + F("_total_c")) / (Value(2) * F("_total_c"))
+            )),
+            default=Value(0),
+            output_field=IntegerField(),
+        ),
+        _atitudes_c=_por_contexto(_atitudes_c, IntegerField()),
+    ).annotate(
+        _cognitiva_c=_por_contexto(_cognitiva_c, IntegerField()),
+    ).annotate(
+        _final_c=_inteiro(F("_cognitiva_c") + F("_atitudes_c")),
+    )
+
+    def congelado(campo: str, expr, output_field):
+        return Case(When(aberto, then=expr), default=F(campo), output_field=output_field)
+
+    return qs.annotate(
+        calc_media_cognitiva_100=congelado("media_cognitiva_100", _para_decimal(F("_media_c")), _DEC2),
+        calc_nota_cognitiva_80=congelado("nota_cognitiva_80", _para_decimal(F("_cognitiva_c")), _DEC2),
+        calc_nota_atitudes_20=congelado("nota_atitudes_20", _para_decimal(F("_atitudes_c")), _DEC2),
+        calc_nota_final_100=congelado("nota_final_100", _para_decimal(F("_final_c")), _DEC2),
+        calc_nivel_sge=congelado("nivel_sge", _por_contexto(_nivel, IntegerField()), IntegerField()),
+        calc_mencao_qualitativa=congelado("mencao_qualitativa", _por_contexto(_mencao, CharField()), CharField()),
+    )
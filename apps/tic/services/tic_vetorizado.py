@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+try:  # dependência opcional (só para execuções em massa)
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from apps.tic.models import (
+    BoletimPeriodoTIC,
+    AtitudesPeriodoTIC,
+    NotaAvaliacaoCognitivaTIC,
+)
+from apps.tic.services.tic_calculator import (
+    CAMPOS_ATITUDES,
+    ResultadoTIC,
+    _carregar_boletins,
+    _gravar_resultados,
+    montar_detalhe,
+)
+from apps.tic.services.tic_rules import REGRAS_PADRAO, RegrasTIC, regras_da_turma
+
+
+# -------------------------
+# Motor vetorizado (NumPy)
+# -------------------------
+# Mesmas regras de _calcular_resultado(), mas por colunas:
+#   - notas, pesos e atitudes em CÊNTIMOS inteiros (int64), logo sem erros
+#     de vírgula flutuante;
+#   - médias ponderadas por redução agrupada (np.add.at);
+#   - tetos de atitudes com np.minimum;
+#   - menção/nível com np.searchsorted sobre as tabelas de tic_rules.
+# O ROUND_HALF_UP é feito por divisão inteira: round(a / b) = (2a + b) // (2b).
+
+
+def numpy_disponivel() -> bool:
+    return np is not None
+
+
+def _exigir_numpy() -> None:
+    if np is None:
+        raise ImportError("O motor vetorizado requer NumPy (pip install numpy).")
+
+
+def _centimos(x) -> int:
+    """Decimal (2 casas) -> inteiro em cêntimos, sem passar por float."""
+    return int(Decimal(str(x)).scaleb(2)) if x is not None else 0
+
+
+def calcular_centimos(grupos, notas_c, pesos_c, atitudes_c, n_grupos: int, regras=REGRAS_PADRAO) -> dict:
+    """
+    Núcleo vetorizado (sem acesso à BD).
+
+    - grupos: índice do boletim (0..n_grupos-1) de cada nota
+    - notas_c, pesos_c: nota e peso de cada nota, em cêntimos
+    - atitudes_c: matriz (n_grupos, 5) em cêntimos (zeros se não houver atitudes)
+    - regras: RegrasTIC comum a todos, ou uma por boletim
+
+    Retorna arrays por boletim: soma (Σ nota·peso, em 1e-4), total_peso_c,
+    media_c, cognitiva_c, atitudes_c, final_c, nivel e mencao (texto).
+    """
+    _exigir_numpy()
+    grupos = np.asarray(grupos, dtype=np.int64)
+    notas_c = np.asarray(notas_c, dtype=np.int64)
+    pesos_c = np.asarray(pesos_c, dtype=np.int64)
+    atitudes_c = np.asarray(atitudes_c, dtype=np.int64).reshape(n_grupos, len(CAMPOS_ATITUDES))
+
+    # Regras distintas (normalmente 1) e índice da regra de cada boletim.
+    if isinstance(regras, RegrasTIC):
+        distintas = [regras]
+        indice_regras = np.zeros(n_grupos, dtype=np.int64)
+    else:
+        posicao: dict[RegrasTIC, int] = {}
+        indice_regras = np.array([posicao.setdefault(r, len(posicao)) for r in regras], dtype=np.int64)
+        distintas = list(posicao)
+
+    soma = np.zeros(n_grupos, dtype=np.int64)
+    total = np.zeros(n_grupos, dtype=np.int64)
+    np.add.at(soma, grupos, notas_c * pesos_c)
+    np.add.at(total, grupos, pesos_c)
+
+    # média (0..100) em cêntimos = round_half_up(Σ n·p / Σ p)
+    com_peso = total > 0
+    divisor = np.where(com_peso, total, 1)
+    media_c = np.where(com_peso, (2 * soma + divisor) // (2 * divisor), 0)
+
+    # cognitivo (0..80) = round_half_up(média × fator), fator em cêntimos (0.80 -> 80)
+    fator_c = np.array([r.fator_cognitivo_c for r in distintas], dtype=np.int64)[indice_regras]
+    cognitiva_c = (media_c * fator_c + 50) // 100
+
+    tetos_c = np.array([r.tetos_atitudes_c for r in distintas], dtype=np.int64)[indice_regras]
+    total_atitudes_c = np.minimum(atitudes_c, tetos_c).sum(axis=1)
+
+    final_c = cognitiva_c + total_atitudes_c
+
+    nivel = np.empty(n_grupos, dtype=np.int64)
+    mencao = np.empty(n_grupos, dtype=object)
+    for k, r in enumerate(distintas):
+        linhas = indice_regras == k
+        nivel[linhas] = np.searchsorted(r.limites_nivel_c, final_c[linhas], side="right") + 1
+        mencao[linhas] = np.array(r.mencoes, dtype=object)[
+            np.searchsorted(r.limites_mencao_c, final_c[linhas], side="right")
+        ]
+
+    return {
+        "soma": soma,
+        "total_peso_c": total,
+        "media_c": media_c,
+        "cognitiva_c": cognitiva_c,
+        "atitudes_c": total_atitudes_c,
+        "final_c": final_c,
+        "nivel": nivel,
+        "mencao": mencao,
+    }
+
+
+def _resultado(colunas: dict, i: int) -> ResultadoTIC:
+    def dec(valor, casas=2) -> Decimal:
+        return Decimal(int(valor)).scaleb(-casas)
+
+    return ResultadoTIC(
+        soma_ponderada=dec(colunas["soma"][i], 4),
+        total_peso=dec(colunas["total_peso_c"][i]),
+        media_cognitiva_100=dec(colunas["media_c"][i]),
+        nota_cognitiva_80=dec(colunas["cognitiva_c"][i]),
+        nota_atitudes_20=dec(colunas["atitudes_c"][i]),
+        nota_final_100=dec(colunas["final_c"][i]),
+        mencao_qualitativa=colunas["mencao"][i],
+        nivel_sge=int(colunas["nivel"][i]),
+    )
+
+
+@transaction.atomic
+def recalcular_boletins_vetorizado(boletins: QuerySet[BoletimPeriodoTIC]) -> int:
+    """
+    Equivalente a recalcular_boletins() (mesmas queries e mesmo resultado),
+    mas com o cálculo feito por colunas em NumPy. Indicado para execuções
+    em massa (todas as turmas, todos os períodos).
+    """
+    _exigir_numpy()
+
+    boletins = boletins.filter(estado=BoletimPeriodoTIC.Estado.ABERTO)  # FECHADO: congelados
+    lista = _carregar_boletins(boletins)
+    if not lista:
+        return 0
+
+    indice_chave = {(b.turma_id, b.aluno_id, b.periodo): i for i, b in enumerate(lista)}
+    indice_pk = {b.pk: i for i, b in enumerate(lista)}
+
+    grupos, notas_c, pesos_c = [], [], []
+    notas_por_boletim: list[list[tuple]] = [[] for _ in lista]  # para o snapshot
+    notas = (
+        NotaAvaliacaoCognitivaTIC.objects
+        .filter(
+            aluno_id__in=boletins.values("aluno_id"),
+            avaliacao__turma_id__in=boletins.values("turma_id"),
+            avaliacao__periodo__in=boletins.values("periodo"),
+        )
+        .values_list(
+            "avaliacao__turma_id",
+            "aluno_id",
+            "avaliacao__periodo",
+            "avaliacao__nome",
+            "nota_0a100",
+            "avaliacao__peso_percentual",
+        )
+    )
+    for turma_id, aluno_id, periodo, nome, nota, peso in notas:
+        i = indice_chave.get((turma_id, aluno_id, periodo))
+        if i is not None:
+            grupos.append(i)
+            notas_c.append(_centimos(nota))
+            pesos_c.append(_centimos(peso))
+            notas_por_boletim[i].append((nome, nota, peso))
+
+    atitudes_c = np.zeros((len(lista), len(CAMPOS_ATITUDES)), dtype=np.int64)
+    atitudes_por_boletim: list[tuple | None] = [None] * len(lista)
+    atitudes = (
+        AtitudesPeriodoTIC.objects
+        .filter(boletim_id__in=boletins.values("pk"))
+        .values_list("boletim_id", *CAMPOS_ATITUDES)
+    )
+    for boletim_id, *valores in atitudes:
+        atitudes_c[indice_pk[boletim_id]] = [_centimos(v) for v in valores]
+        atitudes_por_boletim[indice_pk[boletim_id]] = tuple(valores)
+
+    colunas = calcular_centimos(
+        grupos, notas_c, pesos_c, atitudes_c, len(lista),
+        regras=[regras_da_turma(b.turma) for b in lista],
+    )
+
+    def com_detalhe(i: int) -> ResultadoTIC:
+        r = _resultado(colunas, i)
+        detalhe = montar_detalhe(notas_por_boletim[i], atitudes_por_boletim[i], r.media_cognitiva_100)
+        return replace(r, detalhe_calculo=detalhe)
+
+    _gravar_resultados((b, com_detalhe(i)) for i, b in enumerate(lista))
+    return len(lista)
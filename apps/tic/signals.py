@@ -1,47 +1,175 @@
+import threading
+from contextlib import contextmanager
+from decimal import Decimal
+from functools import partial
+
+from django.core.exceptions import ValidationError
 from django.db import transaction
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
 from django.dispatch import receiver
 
+from apps.nucleo.models import Aluno, Turma
+from apps.nucleo.signals import alunos_importados, turmas_transitadas
 from apps.tic.models import (
+    BoletimPeriodoTIC,
+    Periodo,
     NotaAvaliacaoCognitivaTIC,
     AtitudesPeriodoTIC,
     AvaliacaoCognitivaTIC,
+    _validar_periodo_aberto,
+)
+from apps.tic.services.anual import recalcular_anuais
+from apps.tic.services.cache_resultados import invalidar_resultados, invalidar_turma
+from apps.tic.services.estatisticas import resumo_boletim
+from apps.tic.services.plano_avaliacoes import clonar_plano_avaliacoes
+from apps.tic.services.recalculo_buffer import (
+    agendar_delta_nota,
+    agendar_recalculo,
+    agendar_recalculo_turma,
+    renomear_nos_deltas,
 )
-from apps.tic.services.tic_calculator import garantir_e_recalcular_boletim
+from apps.tic.services.tic_calculator import propagar_alteracoes, renomear_avaliacao_no_detalhe
+from apps.tic.services.tic_rules import regras_alteradas, regras_registadas
+
+
+# -------------------------
+# Suspensão (escritas em massa)
+# -------------------------
+# Os serviços de lançamento em massa gravam notas/atitudes com bulk_create
+# (que não emite signals) e apagam com queryset.delete() (que emite um
+# post_delete por linha). Dentro de sinais_suspensos() estes receivers não
+# fazem nada: o próprio serviço recalcula a turma/período uma só vez (ou,
+# no arquivo de um ano letivo, apaga também os agregados).
+_suspensao = threading.local()
+
+
+@contextmanager
+def sinais_suspensos():
+    _suspensao.nivel = getattr(_suspensao, "nivel", 0) + 1
+    try:
+        yield
+    finally:
+        _suspensao.nivel -= 1
+
+
+def _suspensos() -> bool:
+    return getattr(_suspensao, "nivel", 0) > 0
 
 
 def _recalcular(turma_id: int, aluno_id: int, periodo: int) -> None:
     """
-    Recalcula o boletim após o commit da transação.
-    Evita erros no Admin (objeto ainda não commitado) e comportamentos inconsistentes.
+    Marca o boletim para recálculo após o commit da transação.
+    Vários saves na mesma transação (ex.: inlines no Admin) resultam num
+    único recálculo em lote por boletim.
     """
-    transaction.on_commit(
-        lambda: garantir_e_recalcular_boletim(
-            turma_id=turma_id,
-            aluno_id=aluno_id,
-            periodo=periodo,
-        )
-    )
+    agendar_recalculo(turma_id=turma_id, aluno_id=aluno_id, periodo=periodo)
 
 
 # -------------------------
-# NOTAS COGNITIVAS
+# PERÍODO FECHADO (notas e atitudes não se apagam)
+# -------------------------
+# O clean() dos models impede alterações num período fechado, mas um delete
+# não passa pelo clean(). O arquivo do ano letivo apaga os períodos fechados
+# com os signals suspensos.
+@receiver(pre_delete, sender=NotaAvaliacaoCognitivaTIC)
+def impedir_apagar_nota_periodo_fechado(sender, instance: NotaAvaliacaoCognitivaTIC, **kwargs):
+    if _suspensos():
+        return
+    avaliacao = instance.avaliacao
+    _validar_periodo_aberto(avaliacao.turma_id, avaliacao.periodo)
+
+
+@receiver(pre_delete, sender=AtitudesPeriodoTIC)
+def impedir_apagar_atitudes_periodo_fechado(sender, instance: AtitudesPeriodoTIC, **kwargs):
+    if _suspensos():
+        return
+    if BoletimPeriodoTIC.objects.filter(pk=instance.boletim_id, estado=BoletimPeriodoTIC.Estado.FECHADO).exists():
+        raise ValidationError("O boletim está fechado: não são permitidas alterações.")
+
+
 # -------------------------
+# NOTAS COGNITIVAS (atualização incremental: deltas aplicados no commit)
+# -------------------------
+def _contribuicao(nota, peso) -> Decimal:
+    return Decimal(str(nota)) * Decimal(str(peso))
+
+
+@receiver(pre_save, sender=NotaAvaliacaoCognitivaTIC)
+def guardar_nota_anterior(sender, instance: NotaAvaliacaoCognitivaTIC, **kwargs):
+    """
+    Guarda (turma, aluno, período, nota, peso, avaliação) da nota gravada, para calcular o delta.
+    """
+    if _suspensos():
+        return
+    instance._nota_anterior = None
+    if instance.pk:
+        instance._nota_anterior = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list(
+                "avaliacao__turma_id",
+                "aluno_id",
+                "avaliacao__periodo",
+                "nota_0a100",
+                "avaliacao__peso_percentual",
+                "avaliacao__nome",
+            )
+            .first()
+        )
+
+
 @receiver(post_save, sender=NotaAvaliacaoCognitivaTIC)
 def recalcular_quando_salvar_nota(sender, instance: NotaAvaliacaoCognitivaTIC, **kwargs):
-    _recalcular(
-        turma_id=instance.avaliacao.turma_id,
-        aluno_id=instance.aluno_id,
-        periodo=instance.avaliacao.periodo,
-    )
+    if _suspensos():
+        return
+    avaliacao = instance.avaliacao
+    chave_nova = (avaliacao.turma_id, instance.aluno_id, avaliacao.periodo)
+    contribuicao_nova = _contribuicao(instance.nota_0a100, avaliacao.peso_percentual)
+    peso_novo = Decimal(str(avaliacao.peso_percentual))
+    entra = (avaliacao.nome, instance.nota_0a100, avaliacao.peso_percentual)
+
+    anterior = getattr(instance, "_nota_anterior", None)
+    ambitos = [(avaliacao.turma_id, avaliacao.periodo)]
+    if anterior is not None:
+        ambitos.append((anterior[0], anterior[2]))
+    invalidar_resultados(ambitos)
+    if anterior is None:
+        agendar_delta_nota(*chave_nova, delta_soma=contribuicao_nova, delta_peso=peso_novo, entra=entra)
+        return
+
+    turma_id, aluno_id, periodo, nota, peso, nome = anterior
+    chave_antiga = (turma_id, aluno_id, periodo)
+    contribuicao_antiga = _contribuicao(nota, peso)
+    peso_antigo = Decimal(str(peso))
+
+    if chave_antiga == chave_nova:
+        if (contribuicao_nova, peso_novo, avaliacao.nome) != (contribuicao_antiga, peso_antigo, nome):
+            agendar_delta_nota(
+                *chave_nova,
+                delta_soma=contribuicao_nova - contribuicao_antiga,
+                delta_peso=peso_novo - peso_antigo,
+                sai=nome,
+                entra=entra,
+            )
+        return
+
+    # A nota mudou de avaliação/aluno: sai de um boletim e entra noutro.
+    agendar_delta_nota(*chave_antiga, delta_soma=-contribuicao_antiga, delta_peso=-peso_antigo, sai=nome)
+    agendar_delta_nota(*chave_nova, delta_soma=contribuicao_nova, delta_peso=peso_novo, entra=entra)
 
 
 @receiver(post_delete, sender=NotaAvaliacaoCognitivaTIC)
 def recalcular_quando_apagar_nota(sender, instance: NotaAvaliacaoCognitivaTIC, **kwargs):
-    _recalcular(
-        turma_id=instance.avaliacao.turma_id,
-        aluno_id=instance.aluno_id,
-        periodo=instance.avaliacao.periodo,
+    if _suspensos():
+        return
+    avaliacao = instance.avaliacao
+    invalidar_resultados([(avaliacao.turma_id, avaliacao.periodo)])
+    agendar_delta_nota(
+        avaliacao.turma_id,
+        instance.aluno_id,
+        avaliacao.periodo,
+        delta_soma=-_contribuicao(instance.nota_0a100, avaliacao.peso_percentual),
+        delta_peso=-Decimal(str(avaliacao.peso_percentual)),
+        sai=avaliacao.nome,
     )
 
 
@@ -50,7 +178,10 @@ def recalcular_quando_apagar_nota(sender, instance: NotaAvaliacaoCognitivaTIC, *
 # -------------------------
 @receiver(post_save, sender=AtitudesPeriodoTIC)
 def recalcular_quando_salvar_atitudes(sender, instance: AtitudesPeriodoTIC, **kwargs):
+    if _suspensos():
+        return
     boletim = instance.boletim
+    invalidar_resultados([(boletim.turma_id, boletim.periodo)])
     _recalcular(
         turma_id=boletim.turma_id,
         aluno_id=boletim.aluno_id,
@@ -60,7 +191,10 @@ def recalcular_quando_salvar_atitudes(sender, instance: AtitudesPeriodoTIC, **kw
 
 @receiver(post_delete, sender=AtitudesPeriodoTIC)
 def recalcular_quando_apagar_atitudes(sender, instance: AtitudesPeriodoTIC, **kwargs):
+    if _suspensos():
+        return
     boletim = instance.boletim
+    invalidar_resultados([(boletim.turma_id, boletim.periodo)])
     _recalcular(
         turma_id=boletim.turma_id,
         aluno_id=boletim.aluno_id,
@@ -69,24 +203,138 @@ def recalcular_quando_apagar_atitudes(sender, instance: AtitudesPeriodoTIC, **kw
 
 
 # -------------------------
-# AVALIAÇÃO COGNITIVA (se alterar peso/período/nome)
+# AVALIAÇÃO COGNITIVA (se alterar peso/turma/período)
 # -------------------------
+# Campos que entram no cálculo. O nome só aparece no detalhe_calculo do
+# boletim: mudar o nome não recalcula, só atualiza o snapshot.
+CAMPOS_AVALIACAO_CALCULO = ("turma_id", "periodo", "peso_percentual")
+
+
+@receiver(pre_save, sender=AvaliacaoCognitivaTIC)
+def guardar_avaliacao_anterior(sender, instance: AvaliacaoCognitivaTIC, **kwargs):
+    instance._valores_calculo_anteriores = None
+    instance._nome_anterior = None
+    if instance.pk:
+        anteriores = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list(*CAMPOS_AVALIACAO_CALCULO, "nome")
+            .first()
+        )
+        if anteriores is not None:
+            instance._valores_calculo_anteriores = anteriores[:-1]
+            instance._nome_anterior = anteriores[-1]
+
+
 @receiver(post_save, sender=AvaliacaoCognitivaTIC)
-def recalcular_quando_mudar_avaliacao(sender, instance: AvaliacaoCognitivaTIC, **kwargs):
+def recalcular_quando_mudar_avaliacao(sender, instance: AvaliacaoCognitivaTIC, created, **kwargs):
     """
-    Se o professor alterar a Avaliação (ex.: peso), recalcula os boletins
-    dos alunos que têm nota nessa avaliação.
+    Se o professor alterar a Avaliação (ex.: peso), recalcula de uma vez
+    todos os boletins da turma/período (antigo e novo, se mudou de âmbito).
+    Se só mudar o nome, troca-o no detalhe dos boletins, sem recalcular.
+    Uma avaliação acabada de criar ainda não tem notas: nada a recalcular
+    (mas a pauta ganha uma coluna).
     """
-    aluno_ids = (
-        NotaAvaliacaoCognitivaTIC.objects.filter(avaliacao=instance)
-        .values_list("aluno_id", flat=True)
-        .distinct()
-    )
+    anteriores = getattr(instance, "_valores_calculo_anteriores", None)
+    if created or anteriores is None:
+        invalidar_resultados([(instance.turma_id, instance.periodo)])
+        return
+
+    atuais = tuple(getattr(instance, campo) for campo in CAMPOS_AVALIACAO_CALCULO)
+    if atuais == anteriores:
+        if instance.nome != instance._nome_anterior:
+            renomear_nos_deltas(instance.turma_id, instance.periodo, instance._nome_anterior, instance.nome)
+            renomear_avaliacao_no_detalhe(instance.turma_id, instance.periodo, instance._nome_anterior, instance.nome)
+        return
+
+    ambitos = {anteriores[:2], (instance.turma_id, instance.periodo)}
+    invalidar_resultados(ambitos)
+    for turma_id, periodo in ambitos:
+        agendar_recalculo_turma(turma_id=turma_id, periodo=periodo)
+
+
+@receiver(post_delete, sender=AvaliacaoCognitivaTIC)
+def recalcular_quando_apagar_avaliacao(sender, instance: AvaliacaoCognitivaTIC, **kwargs):
+    if _suspensos():
+        return
+    invalidar_resultados([(instance.turma_id, instance.periodo)])
+    agendar_recalculo_turma(turma_id=instance.turma_id, periodo=instance.periodo)
+
+
+# -------------------------
+# BOLETIM (estatísticas da turma/período e boletim anual)
+# -------------------------
+@receiver(post_delete, sender=BoletimPeriodoTIC)
+def retirar_boletim_dos_agregados(sender, instance: BoletimPeriodoTIC, **kwargs):
+    if _suspensos():
+        return
+    propagar_alteracoes([
+        (instance.turma_id, instance.aluno_id, instance.periodo, resumo_boletim(instance), None)
+    ])
+
+
+# -------------------------
+# ALUNOS (cache de resultados: número e nome aparecem na pauta e na
+# lista por turma do autocomplete do Admin)
+# -------------------------
+@receiver(pre_save, sender=Aluno)
+def guardar_turma_anterior(sender, instance: Aluno, **kwargs):
+    instance._turma_anterior_id = None
+    if instance.pk:
+        instance._turma_anterior_id = sender.objects.filter(pk=instance.pk).values_list("turma_id", flat=True).first()
 
-    for aluno_id in aluno_ids:
-        _recalcular(
-            turma_id=instance.turma_id,
-            aluno_id=aluno_id,
-            periodo=instance.periodo,
+
+@receiver(post_save, sender=Aluno)
+@receiver(post_delete, sender=Aluno)
+def invalidar_cache_alunos(sender, instance: Aluno, **kwargs):
+    turma_ids = (instance.turma_id, getattr(instance, "_turma_anterior_id", None))
+    invalidar_turma(*turma_ids)
+
+
+@receiver(alunos_importados)
+def invalidar_cache_alunos_importados(sender, turma_ids, **kwargs):
+    invalidar_turma(*turma_ids)
+
+
+@receiver(post_save, sender=Turma)
+def invalidar_cache_turma(sender, instance: Turma, created, **kwargs):
+    if not created:
+        invalidar_turma(instance.pk)  # nome da turma no título da pauta
+
+
+# -------------------------
+# TRANSIÇÃO DE ANO LETIVO
+# -------------------------
+@receiver(turmas_transitadas)
+def clonar_avaliacoes_turmas_transitadas(sender, pares, clonar_avaliacoes=False, **kwargs):
+    if clonar_avaliacoes:
+        clonar_plano_avaliacoes(pares)
+
+
+# -------------------------
+# REGRAS DE CLASSIFICAÇÃO
+# -------------------------
+@receiver(regras_alteradas)
+def recalcular_turmas_com_regras_alteradas(sender, tipo_contexto, ciclo=None, **kwargs):
+    """
+    Só as turmas que usam as regras alteradas: do contexto (e ciclo); sem
+    ciclo, exceto os ciclos com regras próprias. Uma invalidação da cache
+    para todas, o recálculo de cada turma/período e a reconstrução dos
+    boletins anuais (os pesos dos períodos podem ter mudado).
+    """
+    turmas = Turma.objects.filter(tipo_contexto=tipo_contexto)
+    if ciclo is not None:
+        turmas = turmas.filter(ciclo=ciclo)
+    else:
+        turmas = turmas.exclude(
+            ciclo__in=[c for t, c in regras_registadas() if t == tipo_contexto and c is not None]
         )
+    turma_ids = list(turmas.values_list("pk", flat=True))
+    if not turma_ids:
+        return
+
+    invalidar_resultados((turma_id, periodo) for turma_id in turma_ids for periodo in Periodo.values)
+    for turma_id in turma_ids:
+        for periodo in Periodo.values:
+            agendar_recalculo_turma(turma_id=turma_id, periodo=periodo)
+    transaction.on_commit(partial(recalcular_anuais, Turma.objects.filter(pk__in=turma_ids)))
 
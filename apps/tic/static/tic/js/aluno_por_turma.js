@@ -0,0 +1,34 @@
+// Select de alunos (select2 do Admin) carregado por AJAX e filtrado pela
+// turma escolhida no mesmo formulário. Ao mudar de turma, limpa o aluno.
+(function ($) {
+  "use strict";
+
+  function iniciar(el) {
+    const $el = $(el);
+    const turma = document.getElementById(el.dataset.campoTurma);
+
+    $el.select2({
+      width: "20em",
+      allowClear: true,
+      placeholder: "",
+      ajax: {
+        url: el.dataset.url,
+        dataType: "json",
+        delay: 250,
+        data: (params) => ({
+          turma: turma ? turma.value : "",
+          term: params.term || "",
+          page: params.page || 1,
+        }),
+      },
+    });
+
+    if (turma) {
+      turma.addEventListener("change", () => $el.val(null).trigger("change"));
+    }
+  }
+
+  $(function () {
+    $(".tic-aluno-por-turma").each((_, el) => iniciar(el));
+  });
+})(django.jQuery);
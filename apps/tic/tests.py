@@ -1,3 +1,1488 @@
-from django.test import TestCase
+import csv
+import json
+import random
+import statistics
+import shutil
+import tempfile
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.nucleo.models import Aluno, AnoLetivo, Turma
+from apps.nucleo.services.transicao_ano import transitar_turmas
+from apps.nucleo.utils.admin_paginacao import contagem_estimada
+from apps.nucleo.utils.ano_letivo import anos_letivos_permitidos
+from apps.tic.models import (
+    AtitudesPeriodoTIC,
+    AvaliacaoCognitivaTIC,
+    BoletimPeriodoTIC,
+    EstatisticaTurmaPeriodoTIC,
+    NotaAvaliacaoCognitivaTIC,
+    RecalculoPendente,
+)
+from apps.tic.checks import verificar_cache_modo_fila, verificar_regras
+from apps.tic.management.commands import recalcular_tic
+from apps.tic.services import arquivo, cache_resultados, fila_recalculo, pauta, recalculo_buffer
+from apps.tic.services.anual import calcular_anual, verificar_anuais
+from apps.tic.services.estatisticas import reconstruir_estatisticas, verificar_estatisticas
+from apps.tic.services.exportacao import COLUNAS_EXPORTACAO, FORMATOS, boletins_para_exportar, exportar_boletins
+from apps.tic.services.fecho import fechar_periodo, reabrir_periodo
+from apps.tic.services.importacao_notas import importar_notas, ler_ficheiro
+from apps.tic.services.lancamento import gravar_atitudes_turma, gravar_notas_avaliacao
+from apps.tic.services.tic_calculator import (
+    CAMPOS_ATITUDES,
+    CAMPOS_RESULTADO,
+    _calcular_resultado,
+    garantir_e_recalcular_boletins,
+    recalcular_boletim,
+    recalcular_boletins,
+    verificar_boletins,
+)
+from apps.tic.services.tic_rules import (
+    REGRAS_PADRAO,
+    RegrasTIC,
+    obter_regras,
+    regras_alteradas,
+    registar_regras,
+    remover_regras,
+)
+from apps.tic.services.tic_vetorizado import calcular_centimos, numpy_disponivel
+
+
+@skipUnless(numpy_disponivel(), "NumPy não instalado")
+class MotorVetorizadoTests(SimpleTestCase):
+    """
+    O motor NumPy tem de dar exatamente o mesmo resultado (ao cêntimo,
+    ROUND_HALF_UP) que o cálculo Decimal de referência.
+    """
+
+    def _aleatorio(self, rng: random.Random, n_boletins: int):
+        boletins = []
+        for _ in range(n_boletins):
+            notas = [
+                (Decimal(rng.randint(0, 10000)) / 100, Decimal(rng.randint(1, 10000)) / 100)
+                for _ in range(rng.randint(0, 6))
+            ]
+            atitudes = None
+            if rng.random() < 0.8:
+                # inclui valores acima do teto, para testar o np.minimum
+                atitudes = tuple(
+                    Decimal(rng.randint(0, int(teto * 100) + 200)) / 100 for teto in REGRAS_PADRAO.tetos_atitudes
+                )
+            boletins.append((notas, atitudes))
+        return boletins
+
+    def test_equivalente_ao_decimal_em_dados_aleatorios(self):
+        rng = random.Random(20260917)
+        boletins = self._aleatorio(rng, 2000)
+
+        grupos, notas_c, pesos_c, atitudes_c = [], [], [], []
+        for i, (notas, atitudes) in enumerate(boletins):
+            for nota, peso in notas:
+                grupos.append(i)
+                notas_c.append(int(nota * 100))
+                pesos_c.append(int(peso * 100))
+            atitudes_c.append([int(v * 100) for v in atitudes] if atitudes else [0] * 5)
+
+        colunas = calcular_centimos(grupos, notas_c, pesos_c, atitudes_c, len(boletins))
+
+        for i, (notas, atitudes) in enumerate(boletins):
+            r = _calcular_resultado(notas, atitudes)
+            with self.subTest(boletim=i):
+                self.assertEqual(Decimal(int(colunas["soma"][i])).scaleb(-4), r.soma_ponderada)
+                self.assertEqual(Decimal(int(colunas["media_c"][i])).scaleb(-2), r.media_cognitiva_100)
+                self.assertEqual(Decimal(int(colunas["cognitiva_c"][i])).scaleb(-2), r.nota_cognitiva_80)
+                self.assertEqual(Decimal(int(colunas["atitudes_c"][i])).scaleb(-2), r.nota_atitudes_20)
+                self.assertEqual(Decimal(int(colunas["final_c"][i])).scaleb(-2), r.nota_final_100)
+                self.assertEqual(int(colunas["nivel"][i]), r.nivel_sge)
+                self.assertEqual(colunas["mencao"][i], r.mencao_qualitativa)
+
+    def test_limites_de_nivel_e_mencao(self):
+        # (nota, atitudes) cujo total fica exatamente nos limites 20/50/70/90 ou logo abaixo
+        casos = [
+            ("24.99", None),                                      # 19.99
+            ("25.00", None),                                      # 20.00
+            ("62.49", None),                                      # 49.99
+            ("62.50", None),                                      # 50.00
+            ("87.49", None),                                      # 69.99
+            ("87.50", None),                                      # 70.00
+            ("100.00", ("3.00", "6.00", "0.99", "0.00", "0.00")),  # 89.99
+            ("100.00", ("3.00", "6.00", "1.00", "0.00", "0.00")),  # 90.00
+        ]
+        for nota, atitudes in casos:
+            nota = Decimal(nota)
+            atitudes = tuple(Decimal(v) for v in atitudes) if atitudes else None
+            colunas = calcular_centimos(
+                [0], [int(nota * 100)], [100], [[int(v * 100) for v in atitudes] if atitudes else [0] * 5], 1
+            )
+            r = _calcular_resultado([(nota, Decimal("1"))], atitudes)
+            with self.subTest(final=r.nota_final_100):
+                self.assertEqual(Decimal(int(colunas["final_c"][0])).scaleb(-2), r.nota_final_100)
+                self.assertEqual(int(colunas["nivel"][0]), r.nivel_sge)
+                self.assertEqual(colunas["mencao"][0], r.mencao_qualitativa)
+
+
+# -------------------------
+# Dados de teste (turma com avaliações, notas e atitudes)
+# -------------------------
+def criar_turma(nome: str = "7A", n_alunos: int = 4, ano_letivo: AnoLetivo | None = None) -> Turma:
+    professor, _ = get_user_model().objects.get_or_create(username="prof")
+    ano_letivo = ano_letivo or AnoLetivo.objects.first() or AnoLetivo.objects.create()
+    turma = Turma.objects.create(
+        ano_letivo=ano_letivo, nome=nome, ciclo="3C", ano_escolaridade=int(nome[0]), professor=professor
+    )
+    Aluno.objects.bulk_create(
+        Aluno(turma=turma, numero=i, nome_completo=f"Aluno {nome}-{i}") for i in range(1, n_alunos + 1)
+    )
+    return turma
+
+
+def lancar_periodo(turma: Turma, periodo: int = 1, seed: int = 1) -> list[AvaliacaoCognitivaTIC]:
+    """
+    Duas avaliações, uma nota por aluno em cada uma e atitudes (gravadas
+    com os signals, como no Admin).
+    """
+    rng = random.Random(seed)
+    avaliacoes = [
+        AvaliacaoCognitivaTIC.objects.create(turma=turma, periodo=periodo, nome=nome, peso_percentual=peso)
+        for nome, peso in (("Teste", Decimal("60.00")), ("Trabalho", Decimal("40.00")))
+    ]
+    for aluno in turma.alunos.all():
+        for avaliacao in avaliacoes:
+            NotaAvaliacaoCognitivaTIC.objects.create(
+                avaliacao=avaliacao, aluno=aluno, nota_0a100=Decimal(rng.randint(0, 10000)) / 100
+            )
+        boletim, _ = BoletimPeriodoTIC.objects.get_or_create(turma=turma, aluno=aluno, periodo=periodo)
+        AtitudesPeriodoTIC.objects.create(
+            boletim=boletim,
+            responsabilidade_integridade=Decimal("2.50"),
+            excelencia_exigencia=Decimal("5.00"),
+            curiosidade_reflexao_inovacao=Decimal("1.50"),
+            cidadania_participacao=Decimal("3.00"),
+            liberdade=Decimal("4.25"),
+        )
+    return avaliacoes
+
+
+# Boletins, notas, atitudes e bulk_update; estatísticas (3) e anuais (3);
+# 6 SAVEPOINT/RELEASE dos atomic aninhados.
+QUERIES_RECALCULO_LOTE = 16
+
+
+class RecalculoEmLoteTests(TestCase):
+    """
+    recalcular_boletins() (em lote, número constante de queries) tem de dar
+    o mesmo resultado que recalcular_boletim() boletim a boletim.
+    """
+
+    def setUp(self):
+        self.pequena = criar_turma("7A", n_alunos=3)
+        self.grande = criar_turma("8B", n_alunos=12)
+        with self.captureOnCommitCallbacks(execute=True):
+            lancar_periodo(self.pequena, seed=1)
+            lancar_periodo(self.grande, seed=2)
+
+    def _apagar_resultados(self):
+        BoletimPeriodoTIC.objects.update(
+            soma_ponderada=Decimal("0"),
+            total_peso=Decimal("0"),
+            media_cognitiva_100=None,
+            nota_final_100=None,
+            detalhe_calculo={},
+        )
+
+    def _resultados(self):
+        return list(BoletimPeriodoTIC.objects.order_by("pk").values_list("pk", *CAMPOS_RESULTADO))
+
+    def test_mesmo_resultado_que_boletim_a_boletim(self):
+        self._apagar_resultados()
+        for pk in BoletimPeriodoTIC.objects.values_list("pk", flat=True):
+            recalcular_boletim(pk)
+        esperado = self._resultados()
+
+        self._apagar_resultados()
+        self.assertEqual(recalcular_boletins(BoletimPeriodoTIC.objects.all()), len(esperado))
+        self.assertEqual(self._resultados(), esperado)
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+
+    def test_numero_de_queries_nao_depende_dos_alunos(self):
+        self._apagar_resultados()
+        with self.assertNumQueries(QUERIES_RECALCULO_LOTE):
+            recalcular_boletins(BoletimPeriodoTIC.objects.filter(turma=self.pequena))
+        with self.assertNumQueries(QUERIES_RECALCULO_LOTE):
+            recalcular_boletins(BoletimPeriodoTIC.objects.filter(turma=self.grande))
+
+        # Boletim a boletim, as queries crescem com o número de alunos.
+        self._apagar_resultados()
+        with CaptureQueriesContext(connection) as queries:
+            for pk in BoletimPeriodoTIC.objects.filter(turma=self.grande).values_list("pk", flat=True):
+                recalcular_boletim(pk)
+        self.assertGreater(len(queries), 12 * QUERIES_RECALCULO_LOTE)
+
+
+# Pesos 50/50 e atitudes (responsabilidade, excelência, curiosidade, cidadania,
+# liberdade); cada caso cai num limite de nível/menção ou mesmo abaixo dele.
+CASOS_LIMITE = [
+    (("24.99", "24.99"), None, "19.99"),
+    (("25.00", "25.00"), None, "20.00"),
+    (("62.49", "62.49"), None, "49.99"),
+    (("62.50", "62.50"), None, "50.00"),
+    (("87.49", "87.49"), None, "69.99"),
+    (("87.50", "87.50"), None, "70.00"),
+    (("100.00", "100.00"), ("1.00", "0", "0", "4.00", "4.99"), "89.99"),
+    (("100.00", "100.00"), ("1.00", "0", "0", "4.00", "5.00"), "90.00"),
+    (("10.01", "10.00"), None, "8.01"),  # média 10.005 -> 10.01 (meio para cima)
+    (("80.00", None), ("2.50", "6.00", "0.75", "3.25", "4.00"), "80.50"),  # só uma nota
+    ((None, None), ("3.00", "6.00", "2.00", "4.00", "5.00"), "20.00"),  # só atitudes
+    ((None, None), None, "0.00"),  # sem notas nem atitudes
+]
+
+
+class ResultadosSqlTests(TestCase):
+    """
+    with_resultados() (cálculo em SQL) tem de dar exatamente o mesmo que o
+    motor Decimal de recalcular_boletins(), incluindo nos limites de nível e
+    menção, alunos sem notas e boletins fechados (valores congelados).
+    """
+
+    def setUp(self):
+        self.turma = criar_turma("7A", n_alunos=len(CASOS_LIMITE))
+        teste, trabalho = (
+            AvaliacaoCognitivaTIC.objects.create(turma=self.turma, periodo=1, nome=nome, peso_percentual=Decimal("50"))
+            for nome in ("Teste", "Trabalho")
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            for aluno, (notas, atitudes, _) in zip(self.turma.alunos.order_by("numero"), CASOS_LIMITE):
+                boletim = BoletimPeriodoTIC.objects.create(turma=self.turma, aluno=aluno, periodo=1)
+                for avaliacao, nota in zip((teste, trabalho), notas):
+                    if nota is not None:
+                        NotaAvaliacaoCognitivaTIC.objects.create(
+                            avaliacao=avaliacao, aluno=aluno, nota_0a100=Decimal(nota)
+                        )
+                if atitudes is not None:
+                    AtitudesPeriodoTIC.objects.create(
+                        boletim=boletim, **dict(zip(CAMPOS_ATITUDES, map(Decimal, atitudes)))
+                    )
+        recalcular_boletins(BoletimPeriodoTIC.objects.all())
+
+    def _comparar(self):
+        centimo = Decimal("0.01")
+        for b in BoletimPeriodoTIC.objects.with_resultados().order_by("aluno__numero"):
+            with self.subTest(aluno=b.aluno_id):
+                self.assertEqual(
+                    Decimal(str(b.calc_media_cognitiva_100)).quantize(centimo), b.media_cognitiva_100
+                )
+                self.assertEqual(Decimal(str(b.calc_nota_cognitiva_80)).quantize(centimo), b.nota_cognitiva_80)
+                self.assertEqual(Decimal(str(b.calc_nota_atitudes_20)).quantize(centimo), b.nota_atitudes_20)
+                self.assertEqual(Decimal(str(b.calc_nota_final_100)).quantize(centimo), b.nota_final_100)
+                self.assertEqual(b.calc_nivel_sge, b.nivel_sge)
+                self.assertEqual(b.calc_mencao_qualitativa, b.mencao_qualitativa)
+
+    def test_limites_de_nivel_e_mencao(self):
+        finais = list(
+            BoletimPeriodoTIC.objects.order_by("aluno__numero").values_list("nota_final_100", flat=True)
+        )
+        self.assertEqual(finais, [Decimal(esperado) for _, _, esperado in CASOS_LIMITE])
+        niveis = dict(BoletimPeriodoTIC.objects.values_list("nota_final_100", "nivel_sge"))
+        self.assertEqual(
+            [niveis[Decimal(x)] for x in ("19.99", "20.00", "49.99", "50.00", "69.99", "70.00", "89.99", "90.00")],
+            [1, 2, 2, 3, 3, 4, 4, 5],
+        )
+        self._comparar()
+
+    def test_aleatorio(self):
+        outra = criar_turma("8B", n_alunos=20)
+        with self.captureOnCommitCallbacks(execute=True):
+            lancar_periodo(outra, seed=7)
+        self._comparar()
+
+    def test_boletim_fechado_devolve_valores_congelados(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            fechar_periodo(Turma.objects.filter(pk=self.turma.pk), 1)
+        # Mudar as regras não pode alterar o que já foi fechado.
+        outras = {("ENSINO_BASICO_TIC", "3C"): RegrasTIC(fator_cognitivo=Decimal("0.5"))}
+        with mock.patch("apps.tic.services.tic_sql.regras_registadas", return_value=outras):
+            self._comparar()
+
+
+class BufferRecalculoTests(TestCase):
+    """
+    Vários saves na mesma transação: nada é recalculado antes do commit e,
+    depois, uma única descarga.
+    """
+
+    def setUp(self):
+        self.turma = criar_turma()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.avaliacoes = lancar_periodo(self.turma)
+        recalculo_buffer.repor_contadores()
+
+    def test_uma_descarga_por_transacao(self):
+        antes = dict(BoletimPeriodoTIC.objects.values_list("pk", "nota_final_100"))
+        notas = list(NotaAvaliacaoCognitivaTIC.objects.filter(avaliacao=self.avaliacoes[0]).order_by("pk"))
+        atitudes = list(AtitudesPeriodoTIC.objects.order_by("pk"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for registo in atitudes[2:]:
+                registo.liberdade = Decimal("0.00")
+                registo.save()
+            for nota in notas[:3]:
+                nota.nota_0a100 = Decimal("0.00")
+                nota.save()
+            # Ainda nada recalculado: só depois do commit.
+            self.assertEqual(dict(BoletimPeriodoTIC.objects.values_list("pk", "nota_final_100")), antes)
+
+        self.assertEqual(
+            recalculo_buffer.contadores(),
+            {"solicitados": 3 + len(atitudes[2:]), "executados": 4, "descargas": 1},
+        )
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+
+    def test_descarga_unica_com_mudanca_de_peso(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for nota in NotaAvaliacaoCognitivaTIC.objects.order_by("pk")[:4]:
+                nota.nota_0a100 = Decimal("50.00")
+                nota.save()
+            avaliacao = self.avaliacoes[1]
+            avaliacao.peso_percentual = Decimal("10.00")
+            avaliacao.save()
+
+        self.assertEqual(recalculo_buffer.contadores()["descargas"], 1)
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+
+
+class BufferRollbackTests(TransactionTestCase):
+    """
+    Commits e rollbacks reais: o que foi pedido numa transação revertida não
+    fica no buffer para a transação seguinte.
+    """
+
+    def setUp(self):
+        self.turma = criar_turma()
+        lancar_periodo(self.turma)  # autocommit: recalculado logo
+        self.atitudes = AtitudesPeriodoTIC.objects.order_by("pk").first()
+
+    def _reverter(self, funcao):
+        try:
+            with transaction.atomic():
+                funcao()
+                raise ValueError
+        except ValueError:
+            pass
+
+    def test_boletim_revertido_volta_a_ser_recalculado(self):
+        def alterar():
+            self.atitudes.liberdade = Decimal("0.00")
+            self.atitudes.save()
+
+        self._reverter(alterar)
+        self.atitudes.refresh_from_db()
+        with transaction.atomic():
+            self.atitudes.cidadania_participacao = Decimal("0.00")
+            self.atitudes.save()
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+
+        # O mesmo, com o pedido de recálculo num savepoint confirmado.
+        self._reverter(alterar)
+        self.atitudes.refresh_from_db()
+        with transaction.atomic():
+            with transaction.atomic():
+                self.atitudes.cidadania_participacao = Decimal("1.00")
+                self.atitudes.save()
+                nota = NotaAvaliacaoCognitivaTIC.objects.filter(aluno_id=self.atitudes.boletim.aluno_id).first()
+                nota.nota_0a100 = Decimal("3.00")
+                nota.save()
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+
+    def test_turma_revertida_nao_chega_a_outra_transacao(self):
+        def criar():
+            lancar_periodo(criar_turma("8B"))
+
+        self._reverter(criar)
+        with transaction.atomic():
+            self.atitudes.liberdade = Decimal("0.00")
+            self.atitudes.save()
+        self.assertFalse(Turma.objects.filter(nome="8B").exists())
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+
+
+class LancamentoEmMassaTests(TestCase):
+    """
+    Grelhas e importação: um único recálculo da turma/período por
+    lançamento; repetir o mesmo lançamento não grava nem recalcula nada.
+    """
+
+    def setUp(self):
+        self.turma = criar_turma()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.avaliacoes = lancar_periodo(self.turma)
+        self.alunos = list(self.turma.alunos.order_by("numero"))
+        recalculo_buffer.repor_contadores()
+
+    def assertUmRecalculo(self):
+        self.assertEqual(
+            recalculo_buffer.contadores(),
+            {"solicitados": 1, "executados": len(self.alunos), "descargas": 1},
+        )
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+        recalculo_buffer.repor_contadores()
+
+    def _notas(self):
+        return list(NotaAvaliacaoCognitivaTIC.objects.order_by("pk").values_list("pk", "nota_0a100", "atualizado_em"))
+
+    def assertNadaGravado(self, notas_antes):
+        self.assertEqual(recalculo_buffer.contadores(), {"solicitados": 0, "executados": 0, "descargas": 0})
+        self.assertEqual(self._notas(), notas_antes)
+
+    def test_grelha_de_notas(self):
+        avaliacao = self.avaliacoes[0]
+        grelha = {aluno.pk: Decimal(10 * i) for i, aluno in enumerate(self.alunos[:-1])}
+        grelha[self.alunos[-1].pk] = None  # célula apagada
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(gravar_notas_avaliacao(avaliacao, grelha), (len(self.alunos) - 1, 1))
+        self.assertUmRecalculo()
+
+        antes = self._notas()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(gravar_notas_avaliacao(avaliacao, grelha), (0, 0))
+        self.assertNadaGravado(antes)
+
+    def test_grelha_de_atitudes(self):
+        maximos = (Decimal("3.00"), Decimal("6.00"), Decimal("2.00"), Decimal("4.00"), Decimal("5.00"))
+        grelha = {aluno.pk: maximos for aluno in self.alunos[:-1]}
+        grelha[self.alunos[-1].pk] = None  # linha apagada
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(gravar_atitudes_turma(self.turma, 1, grelha), (len(self.alunos) - 1, 1))
+        self.assertUmRecalculo()
+        self.assertEqual(
+            set(BoletimPeriodoTIC.objects.values_list("aluno_id", "nota_atitudes_20")),
+            {*((aluno.pk, Decimal("20.00")) for aluno in self.alunos[:-1]), (self.alunos[-1].pk, Decimal("0.00"))},
+        )
+
+        antes = list(AtitudesPeriodoTIC.objects.order_by("pk").values_list("pk", "atualizado_em"))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(gravar_atitudes_turma(self.turma, 1, grelha), (0, 0))
+        self.assertNadaGravado(self._notas())
+        self.assertEqual(list(AtitudesPeriodoTIC.objects.order_by("pk").values_list("pk", "atualizado_em")), antes)
+
+    def test_importar_e_reimportar_o_mesmo_ficheiro(self):
+        csv = "numero;Teste;Trabalho\n" + "".join(
+            f"{aluno.numero};{50 + i},5;{60 + i}\n" for i, aluno in enumerate(self.alunos)
+        )
+
+        def importar():
+            return importar_notas(self.turma, 1, ler_ficheiro(BytesIO(csv.encode()), "notas.csv"), bloco=3)
+
+        n = len(self.alunos)
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = importar()
+        self.assertEqual((resultado.lidas, resultado.gravadas, resultado.erros), (n, 2 * n, []))
+        self.assertUmRecalculo()
+
+        antes = self._notas()
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = importar()
+        self.assertEqual((resultado.gravadas, resultado.inalteradas), (0, 2 * n))
+        self.assertNadaGravado(antes)
+
+
+class SomasIncrementaisTests(TestCase):
+    """
+    Os agregados mantidos pelos deltas das notas (soma_ponderada,
+    total_peso, detalhe_calculo) têm de coincidir com um recálculo completo.
+    """
+
+    def setUp(self):
+        self.turma = criar_turma()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.avaliacoes = lancar_periodo(self.turma)
+
+    def assertSemDivergencias(self):
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+
+    def test_criar_alterar_apagar_e_mudar_peso(self):
+        self.assertSemDivergencias()
+        notas = list(NotaAvaliacaoCognitivaTIC.objects.order_by("pk"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for nota in notas[:5]:
+                nota.nota_0a100 = Decimal("12.34")
+                nota.save()
+        self.assertSemDivergencias()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            notas[0].delete()
+            notas[3].delete()
+        self.assertSemDivergencias()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            NotaAvaliacaoCognitivaTIC.objects.create(
+                avaliacao=notas[0].avaliacao, aluno=notas[0].aluno, nota_0a100=Decimal("99.99")
+            )
+        self.assertSemDivergencias()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            avaliacao = self.avaliacoes[0]
+            avaliacao.peso_percentual = Decimal("33.33")
+            avaliacao.save()
+            notas[1].nota_0a100 = Decimal("50.00")
+            notas[1].save()
+        self.assertSemDivergencias()
+
+    def test_delta_de_savepoint_revertido_nao_e_aplicado(self):
+        nota = NotaAvaliacaoCognitivaTIC.objects.order_by("pk").first()
+        outra = NotaAvaliacaoCognitivaTIC.objects.exclude(aluno=nota.aluno).order_by("pk").first()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    nota.nota_0a100 = Decimal("77.00")
+                    nota.save()
+                    raise ValueError
+            except ValueError:
+                pass
+            outra.nota_0a100 = Decimal("1.00")
+            outra.save()
+
+        self.assertSemDivergencias()
+
+
+    def test_renomear_avaliacao_so_atualiza_o_detalhe(self):
+        avaliacao = self.avaliacoes[0]
+        antes = dict(BoletimPeriodoTIC.objects.values_list("pk", "atualizado_em"))
+
+        with mock.patch("apps.tic.services.recalculo_buffer.recalcular_boletins") as recalcular:
+            with self.captureOnCommitCallbacks(execute=True):
+                avaliacao.nome = "Teste escrito"
+                avaliacao.save()
+        recalcular.assert_not_called()
+
+        for pk, detalhe, atualizado_em in BoletimPeriodoTIC.objects.values_list("pk", "detalhe_calculo", "atualizado_em"):
+            self.assertEqual([linha[0] for linha in detalhe["avaliacoes"]], ["Teste escrito", "Trabalho"])
+            self.assertGreater(atualizado_em, antes[pk])
+        self.assertSemDivergencias()
+
+    def test_renomear_depois_de_alterar_nota_na_mesma_transacao(self):
+        avaliacao = self.avaliacoes[1]
+        nota = avaliacao.notas.order_by("pk").first()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.nota_0a100 = Decimal("42.00")
+            nota.save()
+            avaliacao.nome = "Projeto"
+            avaliacao.save()
+
+        self.assertSemDivergencias()
+
+
+class FilaRecalculoTests(TestCase):
+    def setUp(self):
+        self.turma = criar_turma()
+        with self.captureOnCommitCallbacks(execute=True):
+            lancar_periodo(self.turma)
+
+    @override_settings(TIC_RECALCULO_EM_FILA=True)
+    def test_notas_vao_para_a_fila(self):
+        nota = NotaAvaliacaoCognitivaTIC.objects.select_related("avaliacao").order_by("pk").first()
+        antes = BoletimPeriodoTIC.objects.get(turma=self.turma, aluno=nota.aluno, periodo=1).nota_final_100
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.nota_0a100 = Decimal("0.00") if nota.nota_0a100 else Decimal("100.00")
+            nota.save()
+
+        self.assertEqual(
+            list(RecalculoPendente.objects.values_list("turma_id", "aluno_id", "periodo")),
+            [(self.turma.pk, nota.aluno_id, 1)],
+        )
+        self.assertEqual(
+            BoletimPeriodoTIC.objects.get(turma=self.turma, aluno=nota.aluno, periodo=1).nota_final_100, antes
+        )
+
+    def _falhar_para(self, aluno_id):
+        def recalcular(chaves):
+            if any(a == aluno_id for _, a, _ in chaves):
+                raise RuntimeError("boletim inválido")
+            return garantir_e_recalcular_boletins(chaves)
+
+        return mock.patch.object(fila_recalculo, "garantir_e_recalcular_boletins", side_effect=recalcular)
+
+    def test_pedido_com_erro_nao_bloqueia_o_lote(self):
+        alunos = list(self.turma.alunos.order_by("pk"))
+        fila_recalculo.enfileirar((self.turma.pk, aluno.pk, 1) for aluno in alunos)
+
+        with self._falhar_para(alunos[0].pk), self.assertLogs(fila_recalculo.logger, "WARNING"):
+            self.assertEqual(fila_recalculo.processar_lote(fila_recalculo.novo_token()), len(alunos))
+
+        pedido = RecalculoPendente.objects.get()
+        self.assertEqual(pedido.aluno_id, alunos[0].pk)
+        self.assertEqual(pedido.tentativas, 1)
+        self.assertIsNone(pedido.reservado_por)
+        self.assertIn("boletim inválido", pedido.erro)
+
+    def test_maximo_de_tentativas_marca_falhado(self):
+        aluno = self.turma.alunos.first()
+        fila_recalculo.enfileirar([(self.turma.pk, aluno.pk, 1)])
+
+        with self._falhar_para(aluno.pk):
+            for _ in range(fila_recalculo.MAX_TENTATIVAS):
+                RecalculoPendente.objects.update(disponivel_em=timezone.now())
+                # O worker regista o erro e continua.
+                call_command("tic_worker", "--uma-vez", "--intervalo", "0", stdout=StringIO(), stderr=StringIO())
+
+        pedido = RecalculoPendente.objects.get()
+        self.assertIsNotNone(pedido.falhou_em)
+        RecalculoPendente.objects.update(disponivel_em=timezone.now())
+        self.assertEqual(fila_recalculo.reservar_lote(fila_recalculo.novo_token(), 10), [])
+        self.assertEqual(fila_recalculo.estado_fila()["falhados"], 1)
+
+        # Um novo pedido para o mesmo boletim volta a dar-lhe tentativas.
+        fila_recalculo.enfileirar([(self.turma.pk, aluno.pk, 1)])
+        pedido.refresh_from_db()
+        self.assertEqual((pedido.falhou_em, pedido.tentativas), (None, 0))
+        self.assertEqual(fila_recalculo.processar_lote(fila_recalculo.novo_token()), 1)
+        self.assertFalse(RecalculoPendente.objects.exists())
+
+
+class CacheResultadosTests(SimpleTestCase):
+    def test_testes_usam_pasta_propria(self):
+        pasta = Path(caches[cache_resultados.ALIAS]._dir)
+        self.assertNotEqual(pasta, Path(settings.BASE_DIR) / "cache" / "tic")
+        self.assertFalse(pasta.is_relative_to(settings.BASE_DIR))
+
+    def test_namespace_renovado_no_migrate(self):
+        self.assertEqual(cache_resultados.em_cache("teste", 1, 1, lambda: "antes"), "antes")
+        self.assertEqual(cache_resultados.em_cache("teste", 1, 1, lambda: "depois"), "antes")
+        versao = cache_resultados.versao(1, 1)
+
+        # Base de dados recriada (migrate/flush): nada do que estava em cache volta a ser lido.
+        cache_resultados.renovar_namespace()
+        self.assertNotEqual(cache_resultados.versao(1, 1), versao)
+        self.assertEqual(cache_resultados.em_cache("teste", 1, 1, lambda: "depois"), "depois")
+
+
+LOCMEM = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    "tic": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tic-testes"},
+}
+
+
+@override_settings(CACHES=LOCMEM)
+class CachePorProcessoTests(SimpleTestCase):
+    """
+    Com a cache "tic" por processo, o tic_worker e o modo fila recusam-se a
+    arrancar (as versões incrementadas pelo worker não chegariam ao servidor).
+    """
+
+    def test_worker_recusa_locmem(self):
+        with self.assertRaises(CommandError):
+            call_command("tic_worker", "--uma-vez", stdout=StringIO())
+
+    def test_modo_fila_com_locmem_falha_o_check(self):
+        self.assertEqual(verificar_cache_modo_fila(None), [])
+        with self.settings(TIC_RECALCULO_EM_FILA=True):
+            self.assertEqual([erro.id for erro in verificar_cache_modo_fila(None)], ["tic.E001"])
+
+
+class FechoPeriodoTests(TestCase):
+    def setUp(self):
+        self.turma = criar_turma()
+        with self.captureOnCommitCallbacks(execute=True):
+            lancar_periodo(self.turma)
+
+    def _fechar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            fechar_periodo(Turma.objects.filter(pk=self.turma.pk), 1)
+
+    def test_fechar_congela_e_reabrir_recalcula(self):
+        boletins = BoletimPeriodoTIC.objects.filter(turma=self.turma, periodo=1)
+        finais = dict(boletins.values_list("aluno_id", "nota_final_100"))
+
+        self._fechar()
+        self.assertEqual(set(boletins.values_list("estado", flat=True)), {BoletimPeriodoTIC.Estado.FECHADO})
+        self.assertFalse(boletins.filter(fechado_em__isnull=True).exists())
+        self.assertEqual(fechar_periodo(Turma.objects.filter(pk=self.turma.pk), 1), 0)  # já fechado
+
+        # Formulários recusam a alteração; escrita direta não mexe no boletim.
+        nota = NotaAvaliacaoCognitivaTIC.objects.filter(avaliacao__turma=self.turma, avaliacao__periodo=1).first()
+        nota.nota_0a100 = Decimal("0.00")
+        with self.assertRaises(ValidationError):
+            nota.full_clean()
+        NotaAvaliacaoCognitivaTIC.objects.filter(pk=nota.pk).update(nota_0a100=Decimal("0.00"))
+        self.assertEqual(recalcular_boletins(boletins), 0)
+        self.assertEqual(dict(boletins.values_list("aluno_id", "nota_final_100")), finais)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reabertos = reabrir_periodo(Turma.objects.filter(pk=self.turma.pk), 1)
+        self.assertEqual(reabertos, len(finais))
+        self.assertEqual(set(boletins.values_list("estado", flat=True)), {BoletimPeriodoTIC.Estado.ABERTO})
+        self.assertFalse(boletins.filter(fechado_em__isnull=False).exists())
+        self.assertEqual(verificar_boletins(boletins), [])
+        self.assertLess(boletins.get(aluno_id=nota.aluno_id).nota_final_100, finais[nota.aluno_id])
+        nota.full_clean()
+
+    def test_renomear_avaliacao_nao_altera_snapshot_congelado(self):
+        self._fechar()
+        boletins = BoletimPeriodoTIC.objects.filter(turma=self.turma, periodo=1)
+        antes = list(boletins.order_by("pk").values_list("detalhe_calculo", "atualizado_em"))
+
+        avaliacao = AvaliacaoCognitivaTIC.objects.get(turma=self.turma, periodo=1, nome="Teste")
+        avaliacao.nome = "Teste final"
+        with self.captureOnCommitCallbacks(execute=True):
+            avaliacao.save()  # sem full_clean: o Admin recusaria
+        self.assertEqual(list(boletins.order_by("pk").values_list("detalhe_calculo", "atualizado_em")), antes)
+
+    def test_nao_apaga_notas_nem_atitudes_de_periodo_fechado(self):
+        self._fechar()
+        nota = NotaAvaliacaoCognitivaTIC.objects.first()
+        atitudes = AtitudesPeriodoTIC.objects.first()
+
+        # delete() corre num atomic sem savepoint: cada tentativa no seu atomic.
+        with self.assertRaises(ValidationError), transaction.atomic():
+            nota.delete()
+        with self.assertRaises(ValidationError), transaction.atomic():
+            atitudes.delete()
+        with self.assertRaises(ValidationError), transaction.atomic():
+            NotaAvaliacaoCognitivaTIC.objects.filter(avaliacao__turma=self.turma).delete()
+        self.assertTrue(NotaAvaliacaoCognitivaTIC.objects.filter(pk=nota.pk).exists())
+
+        request = RequestFactory().get("/")
+        request.user = get_user_model().objects.create_superuser("admin", "admin@example.com", "x")
+        self.assertFalse(admin.site._registry[NotaAvaliacaoCognitivaTIC].has_delete_permission(request, nota))
+        self.assertFalse(admin.site._registry[AtitudesPeriodoTIC].has_delete_permission(request, atitudes))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            reabrir_periodo(Turma.objects.filter(pk=self.turma.pk), 1)
+        self.assertTrue(admin.site._registry[NotaAvaliacaoCognitivaTIC].has_delete_permission(request, nota))
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.delete()
+            atitudes.delete()
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+
+
+@skipUnless(arquivo.numpy_disponivel(), "NumPy não instalado")
+class ArquivoAnoLetivoTests(TestCase):
+    def setUp(self):
+        self.ano = AnoLetivo.objects.create()
+        AnoLetivo.objects.filter(pk=self.ano.pk).update(data_fim=date(2000, 7, 31))  # ano já terminado
+        turmas = [criar_turma("7A", ano_letivo=self.ano), criar_turma("8B", n_alunos=3, ano_letivo=self.ano)]
+        with self.captureOnCommitCallbacks(execute=True):
+            for turma in turmas:
+                lancar_periodo(turma)
+            fechar_periodo(Turma.objects.filter(ano_letivo=self.ano), 1)
+
+        # Outro ano letivo, que não pode ser tocado.
+        self.outra = criar_turma("9C", ano_letivo=AnoLetivo.objects.create(nome=anos_letivos_permitidos(3)[1]))
+
+        self.pasta_base = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.pasta_base)
+
+    def _arquivar(self, **kwargs):
+        return arquivo.arquivar_ano_letivo(self.ano.nome, pasta_base=self.pasta_base, **kwargs)
+
+    def test_arquivar_adulterado_retomar_e_ler(self):
+        exportados = list(boletins_para_exportar(ano_letivo=self.ano.nome))
+        n_boletins = len(exportados)
+
+        resultado = self._arquivar(apagar=False)
+        self.assertEqual((resultado.retomado, resultado.apagadas), (False, 0))
+        self.assertEqual(resultado.linhas["boletins"], n_boletins)
+
+        # Uma coluna adulterada: o arquivo é recusado e nada é apagado.
+        ficheiro = resultado.pasta / "boletins.nota_final_100.npy"
+        original = ficheiro.read_bytes()
+        ficheiro.chmod(0o644)
+        coluna = arquivo.np.load(ficheiro)
+        coluna[0] += 100
+        arquivo.np.save(ficheiro, coluna)
+        with self.assertRaisesRegex(ValueError, "inválido"):
+            self._arquivar()
+        self.assertEqual(BoletimPeriodoTIC.objects.filter(turma__ano_letivo=self.ano).count(), n_boletins)
+
+        # Reposta a coluna, a execução é retomada e apaga o ano letivo.
+        ficheiro.write_bytes(original)
+        resultado = self._arquivar()
+        self.assertTrue(resultado.retomado)
+        self.assertGreater(resultado.apagadas, 0)
+        self.assertFalse(Turma.objects.filter(ano_letivo=self.ano).exists())
+        self.assertFalse(NotaAvaliacaoCognitivaTIC.objects.filter(avaliacao__turma__ano_letivo=self.ano).exists())
+        self.assertTrue(Turma.objects.filter(pk=self.outra.pk).exists())
+
+        lido = arquivo.abrir_arquivo(self.ano.nome, self.pasta_base)
+        self.assertEqual(lido.verificar(), [])
+        self.assertEqual(list(lido.boletins()), exportados)
+        self.assertEqual(list(lido.boletins(periodo=1, estado="FECHADO")), exportados)
+
+        # Uma nova execução encontra o arquivo e não apaga nada outra vez.
+        resultado = self._arquivar()
+        self.assertEqual((resultado.retomado, resultado.apagadas), (True, 0))
+
+    def test_recusa_ano_com_boletins_abertos(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reabrir_periodo(Turma.objects.filter(ano_letivo=self.ano), 1)
+        with self.assertRaisesRegex(ValueError, "boletins abertos"):
+            self._arquivar()
+        self.assertFalse(any(self.pasta_base.iterdir()))
+
+    def test_exportar_ano_arquivado_le_do_arquivo(self):
+        with override_settings(TIC_ARQUIVO_DIR=self.pasta_base):
+            esperado = {
+                formato: "".join(exportar_boletins(formato, ano_letivo=self.ano.nome)) for formato in FORMATOS
+            }
+            self._arquivar()
+            self.assertFalse(BoletimPeriodoTIC.objects.filter(turma__ano_letivo=self.ano).exists())
+            for formato, texto in esperado.items():
+                with self.subTest(formato=formato):
+                    self.assertEqual("".join(exportar_boletins(formato, ano_letivo=self.ano.nome)), texto)
+            self.assertEqual(
+                "".join(exportar_boletins("csv", ano_letivo=self.ano.nome, periodo=2)).count("\n"), 1
+            )
+
+class TransicaoAnoLetivoTests(TestCase):
+    def setUp(self):
+        self.ano = AnoLetivo.objects.create(nome=anos_letivos_permitidos(3)[0])
+        self.destino = anos_letivos_permitidos(3)[1]
+        self.t7a = criar_turma("7A", ano_letivo=self.ano)
+        self.t8b = criar_turma("8B", n_alunos=3, ano_letivo=self.ano)
+        self.t9c = criar_turma("9C", n_alunos=2, ano_letivo=self.ano)  # último ano do 3.º ciclo
+        with self.captureOnCommitCallbacks(execute=True):
+            lancar_periodo(self.t7a)
+
+    def _transitar(self, **kwargs):
+        return transitar_turmas(Turma.objects.filter(ano_letivo=self.ano), **kwargs)
+
+    def test_simular_nao_grava(self):
+        resultado = self._transitar(simular=True)
+        self.assertEqual([nova.nome for _, nova in resultado.turmas], ["8A", "9B"])
+        self.assertEqual(resultado.alunos, 7)
+        self.assertFalse(AnoLetivo.objects.filter(nome=self.destino).exists())
+
+    def test_transita_finalistas_nomes_e_repeticao(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = self._transitar()
+        self.assertEqual([(origem.nome, nova.nome) for origem, nova in resultado.turmas], [("7A", "8A"), ("8B", "9B")])
+        self.assertEqual(resultado.finalistas, [self.t9c])
+        self.assertEqual(resultado.existentes, [])
+        self.assertEqual(resultado.alunos, 7)
+
+        novas = Turma.objects.filter(ano_letivo__nome=self.destino)
+        self.assertEqual(
+            set(novas.values_list("nome", "ano_escolaridade", "ciclo", "professor_id")),
+            {("8A", 8, "3C", self.t7a.professor_id), ("9B", 9, "3C", self.t8b.professor_id)},
+        )
+        self.assertEqual(
+            list(Aluno.objects.filter(turma__in=novas, turma__nome="8A").values_list("numero", "nome_completo")),
+            list(self.t7a.alunos.order_by("numero").values_list("numero", "nome_completo")),
+        )
+        self.assertFalse(AvaliacaoCognitivaTIC.objects.filter(turma__in=novas).exists())
+
+        # Repetir não duplica nada: as sucessoras já existem.
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = self._transitar(clonar_avaliacoes=True)
+        self.assertEqual(resultado.turmas, [])
+        self.assertEqual(resultado.existentes, [self.t7a, self.t8b])
+        self.assertEqual(resultado.finalistas, [self.t9c])
+        self.assertEqual(novas.count(), 2)
+        self.assertEqual(Aluno.objects.filter(turma__in=novas).count(), 7)
+        self.assertFalse(AvaliacaoCognitivaTIC.objects.filter(turma__in=novas).exists())
+
+    def test_clonar_avaliacoes_sem_notas(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._transitar(clonar_avaliacoes=True)
+        nova = Turma.objects.get(ano_letivo__nome=self.destino, nome="8A")
+        plano = ("periodo", "nome", "peso_percentual")
+        self.assertEqual(
+            list(nova.avaliacoes_tic.order_by(*plano).values_list(*plano)),
+            list(self.t7a.avaliacoes_tic.order_by(*plano).values_list(*plano)),
+        )
+        self.assertFalse(NotaAvaliacaoCognitivaTIC.objects.filter(avaliacao__turma=nova).exists())
+        self.assertFalse(AvaliacaoCognitivaTIC.objects.filter(turma__nome="9B").exists())
+
+
+@override_settings(TIC_REGRAS={})
+class RegrasPorContextoTests(TestCase):
+    def setUp(self):
+        self.turma = criar_turma()  # ENSINO_BASICO_TIC, 3.º ciclo
+        self.outra = criar_turma("8B", n_alunos=2)
+        Turma.objects.filter(pk=self.outra.pk).update(ciclo="2C")  # outro ciclo, sem regras próprias
+        with self.captureOnCommitCallbacks(execute=True):
+            lancar_periodo(self.turma)
+            lancar_periodo(self.turma, periodo=2, seed=2)
+            lancar_periodo(self.outra)
+
+    def test_regras_vem_de_settings(self):
+        with override_settings(TIC_REGRAS={
+            "ENSINO_BASICO_TIC": {"fator_cognitivo": "0.70"},
+            ("ENSINO_BASICO_TIC", "3C"): {"limites_nivel": [10, 50, 70, 95], "pesos_periodos": [1, 1, 2]},
+        }):
+            self.assertEqual(obter_regras("ENSINO_BASICO_TIC", "2C").fator_cognitivo, Decimal("0.70"))
+            regras_3c = obter_regras("ENSINO_BASICO_TIC", "3C")
+            self.assertEqual(regras_3c.limites_nivel[-1], Decimal("95"))
+            self.assertEqual(regras_3c.fator_cognitivo, REGRAS_PADRAO.fator_cognitivo)
+            self.assertIs(obter_regras("ENSINO_SECUNDARIO", "SEC"), REGRAS_PADRAO)
+            self.assertEqual(verificar_regras(None), [])
+        self.assertIs(obter_regras("ENSINO_BASICO_TIC", "3C"), REGRAS_PADRAO)
+
+        with override_settings(TIC_REGRAS={"ENSINO_SECUNDARIO": {"fator_cognitivo": "0.805"}}):
+            self.assertEqual([erro.id for erro in verificar_regras(None)], ["tic.E002"])
+        with override_settings(TIC_REGRAS={"ENSINO_SECUNDARIO": {"fator": "0.80"}}):
+            self.assertEqual([erro.id for erro in verificar_regras(None)], ["tic.E002"])
+
+    def test_registar_recalcula_so_as_turmas_afetadas(self):
+        outra_antes = list(BoletimPeriodoTIC.objects.filter(turma=self.outra).values_list("pk", "atualizado_em"))
+        versao_antes = cache_resultados.versao(self.turma.pk, 1)
+        recebidos = []
+
+        def receber(sender, **kwargs):
+            recebidos.append((kwargs["tipo_contexto"], kwargs["ciclo"]))
+
+        regras_alteradas.connect(receber)
+        self.addCleanup(regras_alteradas.disconnect, receber)
+
+        regras = RegrasTIC(fator_cognitivo=Decimal("0.50"), pesos_periodos=(Decimal("1"), Decimal("3"), Decimal("0")))
+        with self.captureOnCommitCallbacks(execute=True):
+            registar_regras(regras, "ENSINO_BASICO_TIC", "3C")
+        with self.captureOnCommitCallbacks(execute=True):
+            registar_regras(regras, "ENSINO_BASICO_TIC", "3C")  # as mesmas: nada
+        self.assertEqual(recebidos, [("ENSINO_BASICO_TIC", "3C")])
+
+        self.assertNotEqual(cache_resultados.versao(self.turma.pk, 1), versao_antes)
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+        self.assertEqual(verificar_anuais(), [])
+        boletim = BoletimPeriodoTIC.objects.filter(turma=self.turma, periodo=1).first()
+        self.assertEqual(boletim.nota_cognitiva_80, (boletim.media_cognitiva_100 * Decimal("0.50")).quantize(Decimal("0.01"), ROUND_HALF_UP))
+        anual = self.turma.boletins_anuais_tic.get(aluno=boletim.aluno)
+        self.assertEqual(anual.nota_anual_100, ((anual.nota_p1 + 3 * anual.nota_p2) / 4).quantize(Decimal("0.01"), ROUND_HALF_UP))
+        self.assertEqual(
+            list(BoletimPeriodoTIC.objects.filter(turma=self.outra).values_list("pk", "atualizado_em")), outra_antes
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            remover_regras("ENSINO_BASICO_TIC", "3C")
+        self.assertEqual(len(recebidos), 2)
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+        self.assertEqual(verificar_anuais(), [])
+
+
+class ClassificacaoAnualTests(TestCase):
+    def setUp(self):
+        self.turma = criar_turma()
+        with self.captureOnCommitCallbacks(execute=True):
+            lancar_periodo(self.turma)
+            lancar_periodo(self.turma, periodo=2, seed=2)
+        self.pasta = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.pasta)
+
+    def test_ponderacao_dos_periodos(self):
+        regras = RegrasTIC(pesos_periodos=(Decimal("1"), Decimal("2"), Decimal("1")))
+        self.assertEqual(calcular_anual([Decimal("50"), Decimal("80"), None], regras), (Decimal("70.00"), "Bom", 4))
+        self.assertEqual(
+            calcular_anual([Decimal("50"), Decimal("80"), Decimal("100")], regras), (Decimal("77.50"), "Bom", 4)
+        )
+        so_p3 = RegrasTIC(pesos_periodos=(Decimal("0"), Decimal("0"), Decimal("1")))
+        self.assertEqual(calcular_anual([Decimal("50"), Decimal("80"), None], so_p3), (None, None, None))
+        self.assertEqual(calcular_anual([None, None, None], REGRAS_PADRAO), (None, None, None))
+
+    def test_recalcular_tic_reconstroi_anuais(self):
+        self.assertEqual(verificar_anuais(), [])
+        # Divergência só no anual: nenhum boletim de período muda.
+        self.turma.boletins_anuais_tic.update(nota_p2=None, nota_anual_100=Decimal("1.00"), nivel_sge=1)
+        with self.assertRaisesRegex(CommandError, "divergência"):
+            call_command("recalcular_tic", "--verificar", stdout=StringIO())
+
+        call_command("recalcular_tic", checkpoint=str(self.pasta / "checkpoint.json"), stdout=StringIO())
+        self.assertEqual(verificar_anuais(), [])
+        call_command("recalcular_tic", "--verificar", stdout=StringIO())
+
+    def test_pauta_anual(self):
+        saida = StringIO()
+        call_command("pauta_anual", ano_letivo=self.turma.ano_letivo.nome, stdout=saida)
+        linhas = saida.getvalue().splitlines()
+        self.assertEqual(linhas[0].split(",")[:4], ["ano_letivo", "turma", "numero", "aluno"])
+        self.assertEqual(len(linhas), 1 + self.turma.alunos.count())
+        anual = self.turma.boletins_anuais_tic.get(aluno__numero=1)
+        self.assertEqual(
+            linhas[1].split(","),
+            [self.turma.ano_letivo.nome, "7A", "1", "Aluno 7A-1", str(anual.nota_p1), str(anual.nota_p2), "",
+             str(anual.nota_anual_100), anual.mencao_qualitativa, str(anual.nivel_sge)],
+        )
+        with self.assertRaisesRegex(CommandError, "não existe"):
+            call_command("pauta_anual", ano_letivo="1999/2000", stdout=StringIO())
+
+
+class EstatisticasTurmaTests(TestCase):
+    def _estatistica(self, notas):
+        centimos = [int(Decimal(nota).scaleb(2)) for nota in notas]
+        distribuicao = {}
+        for nota_c in centimos:
+            distribuicao[str(nota_c)] = distribuicao.get(str(nota_c), 0) + 1
+        return EstatisticaTurmaPeriodoTIC(
+            n=len(centimos),
+            soma_c=sum(centimos),
+            soma_quadrados_c=sum(c * c for c in centimos),
+            distribuicao_notas=distribuicao,
+        )
+
+    def test_leituras_derivadas(self):
+        par = self._estatistica(["50.00", "70.00", "70.00", "90.00"])
+        self.assertEqual((par.media, par.mediana, par.minimo, par.maximo), (
+            Decimal("70.00"), Decimal("70.00"), Decimal("50.00"), Decimal("90.00"),
+        ))
+        self.assertEqual(par.desvio_padrao, Decimal("14.14"))
+
+        impar = self._estatistica(["80.00", "10.00", "30.55"])
+        self.assertEqual(impar.mediana, Decimal("30.55"))
+        self.assertEqual(impar.desvio_padrao, Decimal("29.38"))  # statistics.pstdev: 29.378...
+
+        dois = self._estatistica(["10.01", "20.00"])
+        self.assertEqual(dois.mediana, Decimal("15.01"))  # 15.005, ROUND_HALF_UP
+
+        vazia = self._estatistica([])
+        self.assertEqual((vazia.media, vazia.mediana, vazia.desvio_padrao, vazia.minimo), (None, None, None, None))
+
+    def test_incremental_igual_a_reconstrucao(self):
+        turma = criar_turma(n_alunos=6)
+        with self.captureOnCommitCallbacks(execute=True):
+            avaliacoes = lancar_periodo(turma)
+            lancar_periodo(turma, periodo=2, seed=2)
+        rng = random.Random(7)
+        notas = list(NotaAvaliacaoCognitivaTIC.objects.order_by("pk"))
+        for nota in rng.sample(notas, 8):
+            with self.captureOnCommitCallbacks(execute=True):
+                nota.nota_0a100 = Decimal(rng.randint(0, 10000)) / 100
+                nota.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            notas[0].delete()
+            avaliacoes[1].peso_percentual = Decimal("25.00")
+            avaliacoes[1].save()
+        with self.captureOnCommitCallbacks(execute=True):
+            atitudes = AtitudesPeriodoTIC.objects.order_by("pk").last()
+            atitudes.liberdade = Decimal("0.00")
+            atitudes.save()
+
+        incrementais = {
+            (e.turma_id, e.periodo): (e.n, e.soma_c, e.soma_quadrados_c, e.distribuicao_notas, e.histograma_nivel,
+                                      e.histograma_mencao)
+            for e in EstatisticaTurmaPeriodoTIC.objects.all()
+        }
+        self.assertEqual(verificar_estatisticas(), [])
+        self.assertEqual(reconstruir_estatisticas(), 2)
+        self.assertEqual(
+            {
+                (e.turma_id, e.periodo): (e.n, e.soma_c, e.soma_quadrados_c, e.distribuicao_notas,
+                                          e.histograma_nivel, e.histograma_mencao)
+                for e in EstatisticaTurmaPeriodoTIC.objects.all()
+            },
+            incrementais,
+        )
+
+        linha = EstatisticaTurmaPeriodoTIC.objects.get(turma=turma, periodo=1)
+        finais = list(BoletimPeriodoTIC.objects.filter(turma=turma, periodo=1).values_list("nota_final_100", flat=True))
+        self.assertEqual(linha.n, len(finais))
+        self.assertEqual(linha.mediana, Decimal(statistics.median(finais)).quantize(Decimal("0.01"), ROUND_HALF_UP))
+        self.assertEqual(linha.minimo, min(finais))
+        self.assertEqual(sum(linha.histograma_nivel.values()), len(finais))
+
+    def test_recalcular_tic_reconstroi_estatisticas(self):
+        turma = criar_turma()
+        with self.captureOnCommitCallbacks(execute=True):
+            lancar_periodo(turma)
+        EstatisticaTurmaPeriodoTIC.objects.filter(turma=turma).update(n=99, distribuicao_notas={})
+        with self.assertRaisesRegex(CommandError, "divergência"):
+            call_command("recalcular_tic", "--verificar", stdout=StringIO())
+
+        pasta = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, pasta)
+        call_command("recalcular_tic", checkpoint=str(pasta / "checkpoint.json"), stdout=StringIO())
+        self.assertEqual(verificar_estatisticas(), [])
+
+
+class RecalcularTicComandoTests(TestCase):
+    def setUp(self):
+        self.turmas = [criar_turma(nome, n_alunos=2) for nome in ("7A", "7B", "8A")]
+        with self.captureOnCommitCallbacks(execute=True):
+            for turma in self.turmas:
+                lancar_periodo(turma)
+        pasta = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, pasta)
+        self.checkpoint = pasta / "checkpoint.json"
+        BoletimPeriodoTIC.objects.update(nota_final_100=Decimal("0.00"))  # todos a corrigir
+
+    def _recalcular(self, *args, **kwargs):
+        saida = StringIO()
+        call_command("recalcular_tic", *args, checkpoint=str(self.checkpoint), stdout=saida, **kwargs)
+        return saida.getvalue()
+
+    def _interromper_depois_da_primeira(self):
+        """
+        Executa até a segunda turma falhar; retorna a turma concluída.
+        """
+        real = recalcular_tic._recalcular_turma
+        concluidas = []
+
+        def recalcular(turma_id, *args):
+            if concluidas:
+                raise RuntimeError("interrompido")
+            concluidas.append(turma_id)
+            return real(turma_id, *args)
+
+        with mock.patch.object(recalcular_tic, "_recalcular_turma", side_effect=recalcular):
+            with self.assertRaisesRegex(RuntimeError, "interrompido"):
+                self._recalcular()
+        return concluidas[0]
+
+    def _processadas(self, *args, **kwargs):
+        with mock.patch.object(
+            recalcular_tic, "_recalcular_turma", side_effect=recalcular_tic._recalcular_turma
+        ) as espiao:
+            saida = self._recalcular(*args, **kwargs)
+        return [chamada.args[0] for chamada in espiao.call_args_list], saida
+
+    def test_retoma_sem_repetir_as_turmas_concluidas(self):
+        primeira = self._interromper_depois_da_primeira()
+        self.assertEqual(json.loads(self.checkpoint.read_text())["turmas_concluidas"], [primeira])
+        self.assertFalse(BoletimPeriodoTIC.objects.filter(turma_id=primeira, nota_final_100=0).exists())
+
+        processadas, saida = self._processadas()
+        self.assertIn("A retomar: 1 turma(s)", saida)
+        self.assertEqual(processadas, sorted(t.pk for t in self.turmas if t.pk != primeira))
+        self.assertFalse(self.checkpoint.exists())  # execução completa
+        self.assertEqual(verificar_boletins(BoletimPeriodoTIC.objects.all()), [])
+
+    def test_recomecar_e_outro_ambito_ignoram_o_checkpoint(self):
+        self._interromper_depois_da_primeira()
+        processadas, _ = self._processadas("--recomecar")
+        self.assertEqual(processadas, sorted(t.pk for t in self.turmas))
+
+        self._interromper_depois_da_primeira()
+        processadas, _ = self._processadas(periodo=1)  # âmbito diferente do checkpoint
+        self.assertEqual(processadas, sorted(t.pk for t in self.turmas))
+
+    def test_dry_run_nao_grava(self):
+        saida = self._recalcular("--dry-run")
+        self.assertIn("Boletins encontrados: 6 em 3 turma(s)", saida)
+        self.assertIn("Dry-run", saida)
+        self.assertEqual(BoletimPeriodoTIC.objects.exclude(nota_final_100=0).count(), 0)
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_workers_recusados_em_sqlite(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("só em SQLite")
+        with self.assertRaisesRegex(CommandError, "SQLite"):
+            self._recalcular(workers=2)
+
+
+class PautaTests(TestCase):
+    """
+    Pauta da turma/período: uma linha por aluno da turma (só com o boletim
+    desta turma), em cache na versão da turma/período.
+    """
+
+    def setUp(self):
+        caches[cache_resultados.ALIAS].clear()
+        self.turma = criar_turma("7A", n_alunos=4)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.avaliacoes = lancar_periodo(self.turma, seed=3)
+
+    def _linha(self, pauta_, aluno):
+        return next(linha for linha in pauta_.linhas if linha[1] == aluno.nome_completo)
+
+    def test_linhas_e_boletim(self):
+        resultado = pauta.construir_pauta(self.turma, 1)
+        self.assertEqual(resultado.cabecalho[2:4], ["Teste (60.00%)", "Trabalho (40.00%)"])
+        self.assertEqual([linha[0] for linha in resultado.linhas], [1, 2, 3, 4])
+        for aluno in self.turma.alunos.all():
+            boletim = BoletimPeriodoTIC.objects.get(aluno=aluno, periodo=1)
+            self.assertEqual(
+                list(self._linha(resultado, aluno)[4:]),
+                [getattr(boletim, campo) for campo in pauta.CAMPOS_BOLETIM],
+            )
+
+    def test_aluno_transferido_nao_traz_o_boletim_da_outra_turma(self):
+        outra = criar_turma("7B", n_alunos=2)
+        transferido = self.turma.alunos.get(numero=1)
+        Aluno.objects.filter(pk=transferido.pk).update(turma=outra, numero=3)
+
+        resultado = pauta.construir_pauta(outra, 1)
+        self.assertEqual(len(resultado.linhas), 3)
+        self.assertEqual(self._linha(resultado, transferido)[2:], (None,) * len(pauta.CAMPOS_BOLETIM))
+
+    def test_cache_sem_queries_e_invalidada_por_uma_nota(self):
+        with self.assertNumQueries(3):  # período fechado?, avaliações, linhas
+            primeira = pauta.construir_pauta(self.turma, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(pauta.construir_pauta(self.turma, 1), primeira)
+
+        aluno = self.turma.alunos.get(numero=2)
+        nota = NotaAvaliacaoCognitivaTIC.objects.get(avaliacao=self.avaliacoes[0], aluno=aluno)
+        nota.nota_0a100 = Decimal("12.34")
+        with self.captureOnCommitCallbacks(execute=True):
+            nota.save()
+
+        segunda = pauta.construir_pauta(self.turma, 1)
+        self.assertNotEqual(segunda, primeira)
+        self.assertEqual(self._linha(segunda, aluno)[2], Decimal("12.34"))
+        boletim = BoletimPeriodoTIC.objects.get(aluno=aluno, periodo=1)
+        self.assertEqual(self._linha(segunda, aluno)[7], boletim.nota_final_100)
+
+    def test_view_csv(self):
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "x"))
+        resposta = self.client.get(reverse("tic:pauta", args=[self.turma.pk, 1]), {"formato": "csv"})
+        self.assertEqual(resposta.status_code, 200)
+        linhas = b"".join(resposta.streaming_content).decode().splitlines()
+        self.assertEqual(linhas[0].split(",")[:2], ["N.º", "Aluno"])
+        self.assertEqual(len(linhas), 5)
+        self.assertEqual(
+            self.client.get(reverse("tic:pauta", args=[self.turma.pk, 4])).status_code, 400
+        )
+
+
+class PaginacaoKeysetAdminTests(TestCase):
+    """
+    Changelist dos boletins (nucleo/utils/admin_paginacao.py): páginas keyset
+    com empates nas chaves de ordenação, nº fixo de queries por página e
+    contagem estimada/em cache.
+    """
+
+    POR_PAGINA = 3
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "x"))
+        self.url = reverse("admin:tic_boletimperiodotic_changelist")
+        # 7A: todos os alunos com o mesmo nome (empate em turma, período e
+        # nome; só o pk desempata); 8B com nomes distintos.
+        self.turma = criar_turma("7A", n_alunos=7)
+        self.turma.alunos.update(nome_completo="Aluno Repetido")
+        outra = criar_turma("8B", n_alunos=4)
+        with self.captureOnCommitCallbacks(execute=True):
+            lancar_periodo(self.turma, seed=1)
+            lancar_periodo(outra, seed=2)
+        admin_boletins = admin.site._registry[BoletimPeriodoTIC]
+        self.enterContext(mock.patch.object(admin_boletins, "list_per_page", self.POR_PAGINA))
+        self.ordenados = list(
+            BoletimPeriodoTIC.objects.order_by(*admin_boletins.ordering).values_list("pk", flat=True)
+        )
+
+    def _pagina(self, query_string=""):
+        resposta = self.client.get(self.url + query_string)
+        self.assertEqual(resposta.status_code, 200)
+        cl = resposta.context["cl"]
+        return [b.pk for b in cl.result_list], cl
+
+    def test_seguinte_e_anterior_com_empates(self):
+        paginas = []
+        pks, cl = self._pagina()
+        self.assertIsNone(cl.keyset["anterior"])
+        while True:
+            paginas.append(pks)
+            if cl.keyset["seguinte"] is None:
+                break
+            pks, cl = self._pagina(cl.keyset["seguinte"])
+        self.assertEqual([pk for pagina in paginas for pk in pagina], self.ordenados)
+        self.assertEqual(len(paginas), 4)  # 11 boletins, 3 por página
+
+        # Do fim para o início pelo "anterior": as mesmas páginas.
+        voltas = [pks]
+        while cl.keyset["anterior"] is not None:
+            pks, cl = self._pagina(cl.keyset["anterior"])
+            voltas.append(pks)
+        self.assertEqual(voltas[::-1], paginas)
+        self.assertIsNone(cl.keyset["anterior"])
+        self.assertIsNone(cl.keyset["primeira"])
+
+    def test_numero_de_queries_fixo_por_pagina(self):
+        _, cl = self._pagina()  # aquece a contagem em cache
+        contagens = []
+        query_string = ""
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                _, cl = self._pagina(query_string)
+            contagens.append(len(queries))
+            if cl.keyset["seguinte"] is None:
+                break
+            query_string = cl.keyset["seguinte"]
+        self.assertEqual(len(set(contagens)), 1, contagens)
+
+    def test_cursor_invalido(self):
+        resposta = self.client.get(self.url + "?apos=nao-e-um-cursor")
+        self.assertEqual(resposta.status_code, 302)  # IncorrectLookupParameters -> ?e=1
+        self.assertIn("e=1", resposta.url)
+
+    def test_contagem_em_cache_e_aproximada(self):
+        qs = BoletimPeriodoTIC.objects.all()
+        with self.assertNumQueries(1):
+            self.assertEqual(contagem_estimada(qs), (11, False))
+        BoletimPeriodoTIC.objects.filter(pk=self.ordenados[0]).delete()
+        with self.assertNumQueries(0):
+            self.assertEqual(contagem_estimada(qs), (11, True))
+        # Outro filtro é outra chave: contagem exata.
+        self.assertEqual(contagem_estimada(qs.filter(periodo=1)), (10, False))
+
+    def test_changelist_mostra_contagem_aproximada(self):
+        _, cl = self._pagina()
+        self.assertEqual((cl.result_count, cl.contagem_aproximada), (11, False))
+        BoletimPeriodoTIC.objects.filter(pk=self.ordenados[0]).delete()
+        _, cl = self._pagina()
+        self.assertEqual((cl.result_count, cl.contagem_aproximada), (11, True))
+
+    @skipUnless(connection.vendor == "postgresql", "estimativa do planner só em PostgreSQL")
+    def test_contagem_estimada_postgresql(self):
+        with mock.patch("apps.nucleo.utils.admin_paginacao.CONTAGEM_MINIMA_ESTIMADA", 0):
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {BoletimPeriodoTIC._meta.db_table}")
+            _, aproximada = contagem_estimada(BoletimPeriodoTIC.objects.all())
+        self.assertTrue(aproximada)
+
+
+class ExportacaoBoletinsTests(TestCase):
+    """
+    Exportação de boletins (services/exportacao.py) em CSV/JSON e a view em
+    streaming.
+    """
+
+    def setUp(self):
+        self.turma = criar_turma("7A", n_alunos=3)
+        self.outra = criar_turma("8B", n_alunos=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            lancar_periodo(self.turma, seed=4)
+            lancar_periodo(self.outra, seed=5)
+            lancar_periodo(self.outra, periodo=2, seed=6)
+            fechar_periodo(Turma.objects.filter(pk=self.outra.pk), 1)
+        self.cabecalho = [cabecalho for cabecalho, _ in COLUNAS_EXPORTACAO]
+
+    def _csv(self, **filtros):
+        return list(csv.reader(StringIO("".join(exportar_boletins("csv", **filtros)))))
+
+    def _json(self, **filtros):
+        return json.loads("".join(exportar_boletins("json", **filtros)))
+
+    def test_csv(self):
+        linhas = self._csv(chunk=2)
+        self.assertEqual(linhas[0], self.cabecalho)
+        self.assertEqual(len(linhas) - 1, BoletimPeriodoTIC.objects.count())
+        self.assertEqual([linha[1] for linha in linhas[1:]], ["7A"] * 3 + ["8B"] * 4)
+
+        boletim = BoletimPeriodoTIC.objects.select_related("aluno").get(aluno__numero=1, turma=self.turma)
+        primeira = dict(zip(self.cabecalho, linhas[1]))
+        self.assertEqual(primeira["aluno"], boletim.aluno.nome_completo)
+        self.assertEqual(primeira["nota_atitudes_20"], "16.25")  # duas casas decimais
+        self.assertEqual(primeira["nota_final_100"], f"{boletim.nota_final_100:.2f}")
+        self.assertEqual(primeira["nivel_sge"], str(boletim.nivel_sge))
+
+    def test_json(self):
+        objetos = self._json()
+        self.assertEqual(len(objetos), BoletimPeriodoTIC.objects.count())
+        self.assertEqual(list(objetos[0]), self.cabecalho)
+        self.assertEqual(objetos[0]["nota_atitudes_20"], "16.25")  # Decimal como texto, sem perder casas
+        self.assertIsInstance(objetos[0]["nivel_sge"], int)
+        # Os mesmos valores que o CSV, linha a linha.
+        self.assertEqual(
+            [["" if valor is None else str(valor) for valor in objeto.values()] for objeto in objetos],
+            self._csv()[1:],
+        )
+
+    def test_json_vazio(self):
+        self.assertEqual("".join(exportar_boletins("json", ano_letivo="1999/2000")), "[]\n")
+        self.assertEqual(self._csv(ano_letivo="1999/2000"), [self.cabecalho])
+
+    def test_filtros(self):
+        self.assertEqual(len(self._json(turma_id=self.outra.pk)), 4)
+        self.assertEqual(len(self._json(turma_id=self.outra.pk, periodo=2)), 2)
+        self.assertEqual({o["turma"] for o in self._json(estado="FECHADO")}, {"8B"})
+        self.assertEqual(len(self._json(ano_letivo=self.turma.ano_letivo.nome, periodo=1)), 5)
+
+    def test_view(self):
+        url = reverse("tic:exportar_boletins")
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "x"))
+
+        resposta = self.client.get(url, {"formato": "json", "turma": self.outra.pk, "periodo": 1})
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta.streaming)
+        self.assertEqual(resposta["Content-Type"], "application/json")
+        self.assertRegex(resposta["Content-Disposition"], r'attachment; filename="boletins_tic_\d{8}\.json"')
+        objetos = json.loads(b"".join(resposta.streaming_content))
+        self.assertEqual([(o["turma"], o["periodo"], o["estado"]) for o in objetos], [("8B", 1, "FECHADO")] * 2)
+
+        for parametros in ({"formato": "xml"}, {"turma": "x"}, {"periodo": "4"}, {"estado": "OUTRO"}):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(url, parametros).status_code, 400)
+
+        # Staff sem permissão de ver boletins.
+        self.client.force_login(get_user_model().objects.create_user("staff", is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class AutocompleteAlunosTurmaTests(TestCase):
+    """
+    Autocomplete de alunos do Admin (AtitudesPeriodoTICAdmin.alunos_turma_view):
+    lista da turma na cache "tic", invalidada quando os alunos mudam.
+    """
+
+    def setUp(self):
+        caches[cache_resultados.ALIAS].clear()
+        cache_resultados.repor_estatisticas_cache()
+        self.turma = criar_turma("7A", n_alunos=25)
+        self.url = reverse("admin:tic_atitudesperiodotic_alunos")
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "x"))
+
+    def _opcoes(self, **parametros):
+        resposta = self.client.get(self.url, {"turma": self.turma.pk, **parametros})
+        self.assertEqual(resposta.status_code, 200)
+        return resposta.json()
+
+    def test_paginas_e_pesquisa(self):
+        dados = self._opcoes()
+        self.assertEqual(len(dados["results"]), 20)
+        self.assertEqual(dados["results"][0]["text"], "1 - Aluno 7A-1")
+        self.assertTrue(dados["pagination"]["more"])
+
+        dados = self._opcoes(page="2")
+        self.assertEqual([o["text"] for o in dados["results"]], [f"{i} - Aluno 7A-{i}" for i in range(21, 26)])
+        self.assertFalse(dados["pagination"]["more"])
+
+        self.assertEqual([o["text"] for o in self._opcoes(term="7a-12")["results"]], ["12 - Aluno 7A-12"])
+        self.assertEqual(self._opcoes(turma="x"), {"results": [], "pagination": {"more": False}})
+
+    def test_cache_partilhada_e_invalidada_pelos_alunos(self):
+        self._opcoes()
+        with CaptureQueriesContext(connection) as queries:
+            self._opcoes(page="2")
+        self.assertFalse([q for q in queries if "nucleo_aluno" in q["sql"]])
+        self.assertEqual(cache_resultados.estatisticas_cache()["alunos_turma"], {"acertos": 1, "falhas": 1})
+
+        aluno = self.turma.alunos.get(numero=12)
+        aluno.nome_completo = "Renomeado"
+        with self.captureOnCommitCallbacks(execute=True):
+            aluno.save()
+        self.assertEqual([o["text"] for o in self._opcoes(term="renomeado")["results"]], ["12 - Renomeado"])
+
+        outra = criar_turma("8B", n_alunos=1)
+        aluno.turma, aluno.numero = outra, 2
+        with self.captureOnCommitCallbacks(execute=True):
+            aluno.save()
+        self.assertEqual(self._opcoes(term="renomeado")["results"], [])
+        self.assertEqual(
+            [o["id"] for o in self._opcoes(turma=outra.pk)["results"]],
+            list(outra.alunos.order_by("numero").values_list("pk", flat=True)),
+        )
+
+    def test_sem_permissao(self):
+        self.client.force_login(get_user_model().objects.create_user("staff", is_staff=True))
+        self.assertEqual(self.client.get(self.url, {"turma": self.turma.pk}).status_code, 403)
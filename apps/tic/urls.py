@@ -0,0 +1,10 @@
+from django.urls import path
+
+from apps.tic import views
+
+app_name = "tic"
+
+urlpatterns = [
+    path("boletins/exportar/", views.exportar_boletins_view, name="exportar_boletins"),
+    path("pauta/<int:turma_id>/<int:periodo>/", views.pauta_view, name="pauta"),
+]
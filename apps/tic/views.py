@@ -1,3 +1,76 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 
-# Create your views here.
+from apps.nucleo.models import Turma
+from apps.tic.models import BoletimPeriodoTIC, Periodo
+from apps.tic.services import pauta
+from apps.tic.services.exportacao import FORMATOS, exportar_boletins
+
+
+# -------------------------
+# Exportação de boletins (streaming)
+# -------------------------
+# GET /tic/boletins/exportar/?formato=csv|json&ano_letivo=2025/2026&turma=3&periodo=1&estado=FECHADO
+@staff_member_required
+def exportar_boletins_view(request):
+    if not request.user.has_perm("tic.view_boletimperiodotic"):
+        raise PermissionDenied
+
+    formato = request.GET.get("formato", "csv")
+    turma = request.GET.get("turma", "")
+    periodo = request.GET.get("periodo", "")
+    estado = request.GET.get("estado", "")
+
+    if formato not in FORMATOS:
+        return HttpResponseBadRequest("formato deve ser csv ou json.")
+    if turma and not turma.isdigit():
+        return HttpResponseBadRequest("turma deve ser o id da turma.")
+    if periodo and periodo not in {str(p) for p in Periodo.values}:
+        return HttpResponseBadRequest("periodo deve ser 1, 2 ou 3.")
+    if estado and estado not in BoletimPeriodoTIC.Estado.values:
+        return HttpResponseBadRequest("estado deve ser ABERTO ou FECHADO.")
+
+    resposta = StreamingHttpResponse(
+        exportar_boletins(
+            formato,
+            ano_letivo=request.GET.get("ano_letivo") or None,
+            turma_id=int(turma) if turma else None,
+            periodo=int(periodo) if periodo else None,
+            estado=estado or None,
+        ),
+        content_type=FORMATOS[formato],
+    )
+    nome = f"boletins_tic_{timezone.localdate():%Y%m%d}.{formato}"
+    resposta["Content-Disposition"] = f'attachment; filename="{nome}"'
+    return resposta
+
+
+# -------------------------
+# Pauta da turma/período (alunos × avaliações)
+# -------------------------
+# GET /tic/pauta/<turma_id>/<periodo>/?formato=html|csv|xlsx
+@staff_member_required
+def pauta_view(request, turma_id: int, periodo: int):
+    if not request.user.has_perm("tic.view_boletimperiodotic"):
+        raise PermissionDenied
+
+    formato = request.GET.get("formato", "html")
+    if formato not in pauta.FORMATOS:
+        return HttpResponseBadRequest("formato deve ser html, csv ou xlsx.")
+    if periodo not in Periodo.values:
+        return HttpResponseBadRequest("periodo deve ser 1, 2 ou 3.")
+    if formato == "xlsx" and pauta.openpyxl is None:
+        return HttpResponseBadRequest("O formato xlsx requer openpyxl instalado.")
+
+    turma = get_object_or_404(Turma.objects.select_related("ano_letivo"), pk=turma_id)
+    resposta = StreamingHttpResponse(
+        pauta.GERADORES[formato](pauta.construir_pauta(turma, periodo)),
+        content_type=pauta.FORMATOS[formato],
+    )
+    if formato != "html":
+        nome = f"pauta_tic_{turma.nome}_P{periodo}.{formato}".replace(" ", "_")
+        resposta["Content-Disposition"] = f'attachment; filename="{nome}"'
+    return resposta
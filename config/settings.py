@@ -120,6 +120,51 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Recálculo dos boletins TIC
+# False: recalcula logo após o commit (no próprio pedido).
+# True: enfileira em RecalculoPendente; é preciso correr `python manage.py tic_worker`.
+TIC_RECALCULO_EM_FILA = False
+
+# Regras de classificação TIC por contexto (apps/tic/services/tic_rules.py).
+# Chave: tipo de contexto da turma, ou (tipo de contexto, ciclo); valor: campos
+# de RegrasTIC a alterar. Ex.:
+#   {"ENSINO_SECUNDARIO": {"fator_cognitivo": "0.70", "pesos_periodos": ["1", "1", "2"]}}
+# Contextos sem entrada usam as regras padrão. Depois de alterar, correr
+# `python manage.py recalcular_tic` (os boletins gravados não mudam sozinhos).
+TIC_REGRAS = {}
+
+# Pasta dos arquivos de anos letivos fechados (comando arquivar_ano_letivo).
+TIC_ARQUIVO_DIR = BASE_DIR / 'arquivo'
+
+# Cache
+# "tic": resultados calculados (pauta, boletins) com versão por turma/período
+# (apps/tic/services/cache_resultados.py). Tem de ser partilhada por todos os
+# processos (workers do servidor, tic_worker): a versão incrementada por um
+# processo tem de ser vista pelos outros. Por isso não pode ser LocMemCache
+# (por processo); o tic_worker e o modo fila recusam-na (check tic.E001).
+# Por omissão é FileBasedCache: ao atingir MAX_ENTRIES descarta uma fração das
+# entradas ao acaso (CULL_FREQUENCY), não pela ordem LRU. Para LRU use Redis
+# ("django.core.cache.backends.redis.RedisCache", maxmemory-policy allkeys-lru).
+# As versões usam um namespace renovado a cada migrate/flush: a pasta cache/
+# pode sobreviver a uma base de dados recriada sem servir resultados antigos.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'tic': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'tic',
+        'TIMEOUT': 24 * 3600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 2000,
+            'CULL_FREQUENCY': 10,  # ao atingir o limite, descarta 1/10 das entradas
+        },
+    },
+}
+
+# Testes: cache "tic" numa pasta temporária (config/test_runner.py).
+TEST_RUNNER = 'config.test_runner.ExecutorTestes'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
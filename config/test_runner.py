@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class ExecutorTestes(DiscoverRunner):
+    """
+    Os testes usam uma cache "tic" própria, numa pasta temporária apagada no
+    fim: não leem nem invalidam a cache da instalação (BASE_DIR/cache).
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._pasta_cache = tempfile.mkdtemp(prefix="tic-cache-testes-")
+        self._caches = override_settings(CACHES={
+            **settings.CACHES,
+            "tic": {**settings.CACHES["tic"], "LOCATION": self._pasta_cache},
+        })
+        self._caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.disable()
+        shutil.rmtree(self._pasta_cache, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)